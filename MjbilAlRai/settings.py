@@ -39,6 +39,8 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    # بحث نصي وتشابه trigram على Postgres (search.py)
+    'django.contrib.postgres',
     'MjbilAlRai_App',
     'widget_tweaks',
     'import_export',
@@ -46,6 +48,8 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    # قياس عدد الاستعلامات والأزمنة لكل طلب (يجب أن يبقى أولًا ليشمل بقية الطبقات)
+    'MjbilAlRai_App.instrumentation.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,10 +63,17 @@ ROOT_URLCONF = 'MjbilAlRai.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # محرك القوالب الافتراضي مع قياس زمن العرض (instrumentation.PerformanceMiddleware)
+        'BACKEND': 'MjbilAlRai_App.instrumentation.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # القوالب تُحلل مرة واحدة لكل عملية (يعيد Django تحميلها تلقائيًا عند تعديلها مع runserver)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -74,12 +85,33 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'MjbilAlRai.wsgi.application'
+ASGI_APPLICATION = 'MjbilAlRai.asgi.application'
+
+# صفحات البحث العامة غير المتزامنة (home و customer_reservations) عند التشغيل تحت ASGI/uvicorn
+# تحت gunicorn المتزامن تبقى العروض المتزامنة أسرع لأنها لا تحتاج إلى حلقة أحداث لكل طلب
+ASYNC_PUBLIC_VIEWS = os.getenv('ASYNC_PUBLIC_VIEWS', '0') == '1'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
 
+# اتصالات قاعدة البيانات:
+# DB_CONN_MAX_AGE: مدة إبقاء الاتصال مفتوحًا بين الطلبات بالثواني (0 = اتصال جديد لكل طلب)
+# DB_POOL=1: مجمع اتصالات psycopg 3 المدمج في Django 5.1 (مناسب لـ ASGI؛ يلغي DB_CONN_MAX_AGE)
+# DB_STATEMENT_TIMEOUT_MS: الحد الأقصى لزمن أي استعلام قبل أن يلغيه الخادم (0 = بدون حد)
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 60))
+DB_POOL = os.getenv('DB_POOL', '0') == '1'
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 2))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))
+
+# تحت ASGI تنفذ العروض المتزامنة في خيوط مختلفة، والاتصال الدائم لكل خيط لا يُغلق في نهاية الطلب
+# فتتراكم الاتصالات المفتوحة حتى حد الخادم: بدون مجمع الاتصالات يُفتح اتصال جديد لكل طلب
+if ASYNC_PUBLIC_VIEWS and not DB_POOL:
+    DB_CONN_MAX_AGE = 0
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -88,9 +120,30 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', '8dzSXv0QwuQdXpoEISAY6IQWNi0qojrf'),
         'HOST': os.getenv('DB_HOST', 'dpg-cs5681g8fa8c73agka70-a.frankfurt-postgres.render.com'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        # الاتصال المحفوظ يُفحص قبل إعادة استخدامه في طلب جديد (بدلاً من فشل الطلب إذا انقطع)
+        'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}',
+        },
     }
 }
 
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': DB_POOL_MIN_SIZE,
+        'max_size': DB_POOL_MAX_SIZE,
+        'timeout': DB_POOL_TIMEOUT,
+    }
+
+# قاعدة SQLite محلية للتطوير والقياس دون خادم Postgres (DB_ENGINE=sqlite)
+if os.getenv('DB_ENGINE') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('SQLITE_PATH', str(BASE_DIR / 'db.sqlite3')),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+    }
+
 
 
 
@@ -138,6 +191,105 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'MjbilAlRai_App/static'),
 ]
 
+# مفتاح تبديل أرقام الحجز (يجب أن يبقى ثابتًا بعد بدء التشغيل وإلا قد تتكرر الأرقام)
+RESERVATION_NUMBER_KEY = os.getenv('RESERVATION_NUMBER_KEY', SECRET_KEY)
+
+# مجلد ملفات التصدير التي يولدها عامل الخلفية (manage.py run_export_worker)
+EXPORTS_ROOT = os.getenv('EXPORTS_ROOT', os.path.join(BASE_DIR, 'exports'))
+
+# ذاكرة التخزين المؤقت لنتائج البحث العامة برقم الهاتف ورقم الحجز وأسعار النقل وأرقام الحجز القديمة
+# LOOKUP_CACHE_URL: خادم مشترك بين جميع العمليات والخوادم، مثل redis://host:6379/2 أو memcached://host:11211
+# (يجب أن تكون قاعدة Redis أو خادم Memcached مخصصًا لهذه الذاكرة لأن مسحها بعد الإدخال الجماعي يمسحه كاملاً،
+#  ومع maxmemory-policy allkeys-lru تُزال الأقدم استخدامًا عند امتلائها)
+# بدون LOOKUP_CACHE_URL تُستخدم locmem لكل عملية (التطوير والاختبارات)
+LOOKUP_CACHE_URL = os.getenv('LOOKUP_CACHE_URL', '')
+LOOKUP_CACHE_TIMEOUT = int(os.getenv('LOOKUP_CACHE_TIMEOUT', 300))
+LOOKUP_CACHE_MAX_ENTRIES = int(os.getenv('LOOKUP_CACHE_MAX_ENTRIES', 5000))
+
+# صفوف جداول لوحة المحاسب وإدارة الحجوزات المعروضة مسبقًا (fragments.py)
+# المفتاح يتضمن آخر تعديل للحجز، لذلك تكفي ذاكرة locmem لكل عملية دون إبطال مشترك
+FRAGMENT_CACHE_TIMEOUT = int(os.getenv('FRAGMENT_CACHE_TIMEOUT', 3600))
+FRAGMENT_CACHE_MAX_ENTRIES = int(os.getenv('FRAGMENT_CACHE_MAX_ENTRIES', 20000))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'template_fragments',
+        'TIMEOUT': FRAGMENT_CACHE_TIMEOUT,
+        'OPTIONS': {
+            'MAX_ENTRIES': FRAGMENT_CACHE_MAX_ENTRIES,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+}
+
+if LOOKUP_CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES['lookups'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': LOOKUP_CACHE_URL,
+        'TIMEOUT': LOOKUP_CACHE_TIMEOUT,
+    }
+elif LOOKUP_CACHE_URL.startswith('memcached://'):
+    CACHES['lookups'] = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': LOOKUP_CACHE_URL.removeprefix('memcached://'),
+        'TIMEOUT': LOOKUP_CACHE_TIMEOUT,
+    }
+else:
+    CACHES['lookups'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'lookups',
+        'TIMEOUT': LOOKUP_CACHE_TIMEOUT,
+        'OPTIONS': {
+            'MAX_ENTRIES': LOOKUP_CACHE_MAX_ENTRIES,
+            'CULL_FREQUENCY': 4,
+        },
+    }
+
+# حدود الأداء لكل اسم مسار (queries، db_ms، render_ms، total_ms، response_bytes)
+# "اسم_المسار:POST" حدود خاصة بالحفظ، وإلا تُطبق حدود اسم المسار على جميع الطلبات
+# queries لا تشمل أوامر نقاط الحفظ (تُسجل في savepoints)، والحدود مقاسة على الشيفرة الحالية مع هامش صغير
+# (كل حفظ يعدّل ملخص الدفتر والملخص اليومي للتقارير، ويضيف استعلامين عند إنشاء صف جديد في أي منهما؛
+#  التأكيد مع الاكتمال حفظان متتاليان)
+# عند تجاوزها يُسجل تحذير، أو يُرفع استثناء إذا كان PERFORMANCE_BUDGET_MODE = 'raise' (للاختبارات)
+PERFORMANCE_BUDGET_MODE = os.getenv('PERFORMANCE_BUDGET_MODE', 'warn')
+PERFORMANCE_BUDGETS = {
+    'home': {'queries': 4, 'total_ms': 500},
+    'customer_reservations': {'queries': 4, 'total_ms': 500},
+    'new_reservation': {'queries': 5, 'total_ms': 500},
+    'new_reservation:POST': {'queries': 10, 'total_ms': 500},
+    'manage_reservations': {'queries': 6, 'total_ms': 500},
+    'confirm_reservations': {'queries': 5, 'total_ms': 500},
+    'confirm_reservations:POST': {'queries': 18, 'total_ms': 500},
+    'accountant_dashboard': {'queries': 7, 'total_ms': 500},
+    'update_financial_details': {'queries': 7, 'total_ms': 500},
+    'update_financial_details:POST': {'queries': 15, 'total_ms': 500},
+    'customer_statement': {'queries': 5, 'total_ms': 500},
+    'reports': {'queries': 6, 'total_ms': 500},
+    'export_reservations': {'queries': 4},
+}
+
+# سطر سجل JSON لكل طلب على مستوى INFO (يمكن رفعه إلى WARNING لإظهار تجاوز الحدود فقط)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'MjbilAlRai_App.performance': {
+            'handlers': ['console'],
+            'level': os.getenv('PERFORMANCE_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
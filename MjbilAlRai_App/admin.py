@@ -1,99 +1,160 @@
 # MjbilAlRai_App/admin.py
 
 from django.contrib import admin
-from django.http import HttpResponse
-from .models import Reservation
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from django.contrib.admin.views.main import ChangeList
+from import_export.admin import ImportMixin
+from .models import DistanceSurcharge, Payment, PriceList, PriceListRate, Reservation, Truck
+from .bulk import bulk_approve, bulk_confirm, bulk_reject
+from .exports import RESERVATIONS_EXPORT, export_response
+from .ledger import delete_reservations
+from .pagination import EstimatedCountPaginator
+from .resources import ReservationResource
+from .search import search_reservations
+from .tariffs import reprice_pending
+
+# سجل الدفعات للعرض فقط (الدفعات تُسجل من صفحة المحاسب)
+class PaymentInline(admin.TabularInline):
+    model = Payment
+    extra = 0
+    can_delete = False
+    fields = ('created_at', 'amount', 'method', 'created_by', 'note')
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+# قائمة الحجوزات تقرأ أعمدة الجدول المعروضة فقط (النموذج الكامل يُقرأ في صفحة التعديل)
+class ReservationChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        return queryset.only('id', *self.model_admin.list_display)
+
+
+class ReservationAdmin(ImportMixin, admin.ModelAdmin):
+    # استيراد الحجوزات التاريخية من ملفات Excel/CSV (تجربة أولًا ثم تأكيد، انظر resources.py)
+    resource_classes = [ReservationResource]
 
-class ReservationAdmin(admin.ModelAdmin):
     # الحقول التي سيتم عرضها في صفحة إدارة Django Admin
-    list_display = ('reservation_number', 'customer_name', 'carpenter_name', 'reservation_date', 'is_approved', 'is_rejected', 'is_completed', 'status')
+    list_display = ('reservation_number', 'customer_name', 'carpenter_name', 'reservation_date', 'status')
+
+    # إضافة خيارات الفلترة على البيانات (الحالة عمود واحد مفهرس بدلاً من الحقول المنطقية)
+    list_filter = ('status', 'reservation_date')
+
+    # نفس ترتيب فهارس (reservation_date, id) و (status, reservation_date, id)
+    ordering = ('-reservation_date', '-id')
+
+    # عدد تقديري للجدول الكامل، ودون استعلام COUNT(*) إضافي لإجمالي الحجوزات مع كل فلتر
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
-    # إضافة خيارات الفلترة على البيانات
-    list_filter = ('is_approved', 'is_rejected', 'is_completed', 'reservation_date', 'status')
+    # لا توجد علاقات في أعمدة القائمة
+    list_select_related = False
 
-    # إضافة البحث باستخدام الحقول
-    search_fields = ('customer_name', 'reservation_number', 'carpenter_name')
+    # إضافة البحث باستخدام الحقول (التنفيذ الفعلي في get_search_results عبر فهارس البحث)
+    search_fields = ('customer_name', 'reservation_number', 'carpenter_name', 'site_location', 'phone_number')
+
+    # مجموع الدفعات والرصيد المتبقي محسوبان من سجل الدفعات ولا يُعدلان يدويًا
+    readonly_fields = ('payments', 'remaining_balance')
+    inlines = [PaymentInline]
+
+    # البحث النصي وتشابه الأسماء بدلاً من icontains على كل حقل (لا يحتاج إلى distinct: لا علاقات)
+    def get_search_results(self, request, queryset, search_term):
+        return search_reservations(queryset, search_term), False
+
+    def get_changelist(self, request, **kwargs):
+        return ReservationChangeList
+
+    # قائمة الحجوزات محمّلة جزئيًا: الحذف الجماعي يقرأ الحالة المخزنة مع الصفوف ويعدّل الملخص مرة لكل مجموعة
+    # (بدلاً من استعلام قراءة وتحديث للملخص لكل حجز في إشارات الحذف)
+    def delete_queryset(self, request, queryset):
+        delete_reservations(queryset)
 
     # إضافة الإجراءات المتاحة مثل التصدير كملف Excel
-    actions = ['export_as_excel']
+    actions = ['export_as_excel', 'export_as_csv', 'approve_selected', 'reject_selected', 'confirm_selected', 'reprice_selected']
 
-    # دالة مخصصة لتصدير البيانات كملف Excel
+    # دالة مخصصة لتصدير البيانات كملف Excel (عبر مسار التصدير المشترك)
     def export_as_excel(self, request, queryset):
-        # إنشاء ملف إكسل جديد
-        workbook = Workbook()
-        worksheet = workbook.active
-        worksheet.title = 'الحجوزات'
-
-        headers = [
-            'رقم الحجز', 'اسم العميل', 'اسم النجار', 'نوع الخرسانة',
-            'كمية الخرسانة', 'موقع الصب', 'المسافة التقديرية',
-            'تاريخ الحجز', 'تاريخ الموافقة', 'رسالة الموافقة',
-            'السعر للوحدة', 'الخصم', 'إجمالي التكلفة', 'ملاحظات المحاسب',
-            'مجموع الدفعات المدفوعة', 'المبلغ المتبقي', 'اكتمال الحجز', 'تاريخ اكتمال الحجز', 'الحالة'
-        ]
-        worksheet.append(headers)
-
-        # تنسيق العناوين
-        header_font = Font(bold=True, color="FFFFFF")
-        header_alignment = Alignment(horizontal='center', vertical='center')
-        header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-
-        for cell in worksheet[1]:
-            cell.font = header_font
-            cell.alignment = header_alignment
-            cell.fill = header_fill
-
-        # إعداد حدود الخلايا
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-
-        # كتابة بيانات الحجوزات
-        for obj in queryset:
-            row = [
-                obj.reservation_number,
-                obj.customer_name,
-                obj.carpenter_name,
-                obj.concrete_type,
-                obj.concrete_quantity,
-                obj.site_location,
-                obj.estimated_distance,
-                obj.reservation_date.strftime('%Y-%m-%d') if obj.reservation_date else '',
-                obj.approval_date.strftime('%Y-%m-%d') if obj.approval_date else '',
-                obj.approval_message,
-                obj.price_per_unit,
-                obj.discount,
-                obj.total_cost,
-                obj.accountant_notes,
-                obj.payments,
-                obj.remaining_balance,
-                'نعم' if obj.is_completed else 'لا',
-                obj.completion_date.strftime('%Y-%m-%d') if obj.completion_date else '',
-                obj.status,  # إضافة الحقل الجديد للحالة
-            ]
-            worksheet.append(row)
-
-        # تنسيق الصفوف
-        for row in worksheet.iter_rows(min_row=2, max_row=worksheet.max_row, min_col=1, max_col=19):
-            for cell in row:
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-                cell.border = thin_border
-
-        # إعداد الاستجابة وإرسال الملف للمستخدم
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = 'attachment; filename=الحجوزات.xlsx'
-        workbook.save(response)
-        return response
+        return export_response(queryset, RESERVATIONS_EXPORT, 'xlsx', 'الحجوزات')
 
     # تحديد الوصف لزر الإجراء في صفحة الإدارة
     export_as_excel.short_description = "تصدير مختار كملف Excel"
 
+    # تصدير سريع كملف CSV دون تنسيقات
+    def export_as_csv(self, request, queryset):
+        return export_response(queryset, RESERVATIONS_EXPORT, 'csv', 'الحجوزات')
+
+    export_as_csv.short_description = "تصدير مختار كملف CSV"
+
+    # إجراءات جماعية بتحديث واحد بدلاً من حفظ كل حجز على حدة
+    def approve_selected(self, request, queryset):
+        updated = bulk_approve(queryset.values_list('id', flat=True))
+        self.message_user(request, f"تم قبول {len(updated)} حجز.")
+
+    approve_selected.short_description = "قبول الحجوزات المختارة"
+
+    def reject_selected(self, request, queryset):
+        updated = bulk_reject(queryset.values_list('id', flat=True))
+        self.message_user(request, f"تم رفض {len(updated)} حجز.")
+
+    reject_selected.short_description = "رفض الحجوزات المختارة"
+
+    def confirm_selected(self, request, queryset):
+        updated = bulk_confirm(queryset.values_list('id', flat=True))
+        self.message_user(request, f"تم تأكيد {len(updated)} حجز.")
+
+    confirm_selected.short_description = "تأكيد الحجوزات المختارة (المسددة بالكامل تكتمل)"
+
+    # الحجوزات المعلقة فقط تُسعّر من جديد (المقبولة والمؤكدة تحتفظ بسعرها)
+    def reprice_selected(self, request, queryset):
+        repriced = reprice_pending(Reservation.objects.filter(id__in=queryset.values('id')))
+        self.message_user(request, f"تمت إعادة تسعير {repriced} حجز معلق حسب التعرفة.")
+
+    reprice_selected.short_description = "إعادة تسعير الحجوزات المعلقة المختارة حسب التعرفة"
+
+
+class PaymentAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'reservation', 'phone_number', 'amount', 'method', 'created_by')
+    list_filter = ('method', 'created_at')
+    search_fields = ('phone_number', 'reservation__reservation_number')
+    list_select_related = ('reservation', 'created_by')
+
+    # السجل للإضافة فقط
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+class PriceListRateInline(admin.TabularInline):
+    model = PriceListRate
+    extra = 0
+
+
+class DistanceSurchargeInline(admin.TabularInline):
+    model = DistanceSurcharge
+    extra = 0
+    ordering = ('from_distance',)
+
+
+# قوائم الأسعار مع أسعار العيارات وشرائح المسافات (أي تعديل يبطل التعرفة المحملة، انظر signals.py)
+class PriceListAdmin(admin.ModelAdmin):
+    list_display = ('name', 'valid_from', 'valid_to', 'is_active', 'updated_at')
+    list_filter = ('is_active',)
+    inlines = [PriceListRateInline, DistanceSurchargeInline]
+
+
+# الشاحنات الخلاطة المستخدمة في جدول التسليم (الشاحنات خارج الخدمة لا تُجدول)
+class TruckAdmin(admin.ModelAdmin):
+    list_display = ('name', 'capacity', 'is_active')
+    list_filter = ('is_active',)
+    search_fields = ('name',)
+
 # تسجيل النموذج داخل صفحة Django Admin مع الخيارات المخصصة
 admin.site.register(Reservation, ReservationAdmin)
+admin.site.register(Payment, PaymentAdmin)
+admin.site.register(PriceList, PriceListAdmin)
+admin.site.register(Truck, TruckAdmin)
@@ -0,0 +1,65 @@
+# MjbilAlRai_App/aggregates.py
+
+from decimal import Decimal
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+# نوع الحقل الناتج لجميع المبالغ المحسوبة في قاعدة البيانات
+MONEY_FIELD = DecimalField(max_digits=20, decimal_places=2)
+ZERO = Value(Decimal(0), output_field=MONEY_FIELD)
+CENT = Decimal('0.01')
+
+
+# التكلفة الإجمالية قبل الخصم = السعر للوحدة × الكمية (مطابقة لـ calculate_total_cost)
+def gross_amount_expression():
+    return ExpressionWrapper(
+        Coalesce(F('price_per_unit'), ZERO) * Coalesce(F('concrete_quantity'), ZERO),
+        output_field=MONEY_FIELD,
+    )
+
+
+# المبلغ المتبقي = التكلفة الإجمالية - الخصم - المدفوعات (مطابقة لـ calculate_remaining_balance)
+def remaining_amount_expression():
+    return ExpressionWrapper(
+        gross_amount_expression() - Coalesce(F('discount'), ZERO) - Coalesce(F('payments'), ZERO),
+        output_field=MONEY_FIELD,
+    )
+
+
+def _totals_aggregates():
+    return {
+        'reservations_count': Count('id'),
+        'total_gross_amount_sum': Coalesce(Sum(gross_amount_expression()), ZERO),
+        'total_discount_sum': Coalesce(Sum('discount', output_field=MONEY_FIELD), ZERO),
+        'total_payments_sum': Coalesce(Sum('payments', output_field=MONEY_FIELD), ZERO),
+        'total_remaining_sum': Coalesce(Sum(remaining_amount_expression()), ZERO),
+    }
+
+
+# توحيد الدقة إلى خانتين عشريتين بغض النظر عن محرك قاعدة البيانات
+def _quantize_totals(totals):
+    for key, value in totals.items():
+        if key != 'reservations_count':
+            totals[key] = Decimal(value).quantize(CENT)
+    return totals
+
+
+# حساب جميع الإجماليات المالية لمجموعة حجوزات في استعلام SQL واحد
+def financial_totals(queryset):
+    return _quantize_totals(queryset.order_by().aggregate(**_totals_aggregates()))
+
+
+# نفس الإجماليات للعروض غير المتزامنة (async)
+async def afinancial_totals(queryset):
+    return _quantize_totals(await queryset.order_by().aaggregate(**_totals_aggregates()))
+
+
+# إجماليات فارغة تُستخدم عندما لا يوجد بحث بعد
+def empty_totals():
+    return {
+        'reservations_count': 0,
+        'total_gross_amount_sum': 0,
+        'total_discount_sum': 0,
+        'total_payments_sum': 0,
+        'total_remaining_sum': 0,
+    }
@@ -1,8 +1,25 @@
 # MjbilAlRai_App/apps.py
 
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+# جدول البحث FTS5 ومشغلاته في SQLite (التطوير المحلي) بعد كل migrate
+def install_search_index(sender, using, **kwargs):
+    from django.db import connections
+    from .search import install_sqlite_search
+
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        install_sqlite_search(connection)
+
 
 class MjbilAlRaiAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'MjbilAlRai_App'
     verbose_name = "MjbilAlRai App"
+
+    def ready(self):
+        # تسجيل الإشارات (ملخص الدفتر)
+        from . import signals  # noqa: F401
+        post_migrate.connect(install_search_index, sender=self)
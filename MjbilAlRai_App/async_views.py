@@ -0,0 +1,67 @@
+# MjbilAlRai_App/async_views.py
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render
+from .aggregates import empty_totals
+from .lookup_cache import aphone_lookup, areservation_number_lookup, normalize_phone, normalize_reservation_number
+
+# عرض القالب في خيط منفصل: القالب الأساسي يقرأ المستخدم والصلاحيات من الجلسة (استعلامات متزامنة)
+arender = sync_to_async(render)
+
+
+# النسخ غير المتزامنة من صفحات البحث العامة (تعمل تحت ASGI دون حجز عامل كامل أثناء انتظار قاعدة البيانات)
+# يتم اختيارها بدلاً من views.home و views.customer_reservations عند تفعيل ASYNC_PUBLIC_VIEWS
+
+# الصفحة الرئيسية
+async def home(request):
+    reservations = []
+    totals = empty_totals()
+    error = None
+
+    if request.method == 'POST':
+        phone_number = normalize_phone(request.POST.get('phone_number'))
+        reservation_number = normalize_reservation_number(request.POST.get('reservation_number'))
+
+        if phone_number:
+            reservations, totals = await aphone_lookup(phone_number)
+            if not totals['reservations_count']:
+                error = "لا توجد حجوزات مسجلة لهذا الرقم."
+        elif reservation_number:
+            reservation = await areservation_number_lookup(reservation_number)
+            if reservation:
+                return await arender(request, 'MjbilAlRai_App/reservation_status.html', {'reservation': reservation})
+            else:
+                error = "رقم الحجز غير موجود أو الحجز مكتمل."
+        else:
+            error = "يرجى إدخال رقم الهاتف أو رقم الحجز."
+
+    context = {
+        'reservations': reservations,
+        'error': error,
+        **totals,
+    }
+    return await arender(request, 'MjbilAlRai_App/home.html', context)
+
+
+# حجوزات العميل برقم الهاتف
+async def customer_reservations(request):
+    reservations = []
+    totals = empty_totals()
+    error = None
+
+    if request.method == 'POST':
+        phone_number = normalize_phone(request.POST.get('phone_number'))
+
+        if phone_number:
+            reservations, totals = await aphone_lookup(phone_number)
+            if not totals['reservations_count']:
+                error = "لا توجد حجوزات بهذا الرقم."
+        else:
+            error = "يرجى إدخال رقم الهاتف."
+
+    context = {
+        'reservations': reservations,
+        'error': error,
+        **totals,
+    }
+    return await arender(request, 'MjbilAlRai_App/customer_reservations.html', context)
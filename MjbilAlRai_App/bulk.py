@@ -0,0 +1,77 @@
+# MjbilAlRai_App/bulk.py
+
+from datetime import date
+from django.db import transaction
+from django.db.models import Case, DateField, Q, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .ledger import apply_ledger_groups, ledger_groups
+from .lookup_cache import invalidate_lookups
+from .models import Reservation
+from .reporting import apply_report_groups, report_groups
+
+# عدد الحجوزات في كل دفعة UPDATE (للبقاء ضمن حدود عدد المعاملات في الاستعلام)
+BULK_BATCH_SIZE = 500
+
+# الحجوزات التي يمكن قبولها أو رفضها (قيد الانتظار)
+PENDING_FILTER = Q(status=Reservation.STATUS_PENDING)
+
+# الحجوزات التي تنتظر التأكيد (نفس فلتر صفحة التأكيد)
+CONFIRMABLE_FILTER = Q(status=Reservation.STATUS_APPROVED)
+
+# الحجز المسعّر المسدد بالكامل (نفس Reservation.is_fully_paid؛ المتبقي NULL لا يطابق)
+FULLY_PAID = Q(remaining_balance__lte=0)
+
+
+# تحديث جماعي لمجموعة حجوزات مع تعديل ملخص الدفتر والملخص اليومي بفرق المجموعات
+# (بديل عن حفظ كل حجز على حدة؛ لا تُرسل إشارات post_save)
+# الحالة الجديدة جزء من changes، والانتقال مضمون لأن الاستعلام يختار الحالة السابقة الوحيدة المسموحة
+def _apply(queryset, changes):
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().order_by('id').values_list('id', 'phone_number', 'reservation_number'))
+        ids = [row[0] for row in rows]
+        # التحديث الجماعي لا يرسل إشارات، لذلك يتم إبطال نتائج البحث صراحة
+        invalidate_lookups(phones=(row[1] for row in rows), numbers=(row[2] for row in rows))
+        for start in range(0, len(ids), BULK_BATCH_SIZE):
+            batch = ids[start:start + BULK_BATCH_SIZE]
+            before, reports_before = ledger_groups(batch), report_groups(batch)
+            rows = Reservation.objects.filter(id__in=batch)
+            rows.update(updated_at=now, **changes)
+            apply_ledger_groups(before, ledger_groups(batch))
+            apply_report_groups(reports_before, report_groups(batch))
+    return ids
+
+
+# قبول مجموعة حجوزات قيد الانتظار دفعة واحدة
+def bulk_approve(ids, approval_date=None, approval_message='', pour_date=None):
+    queryset = Reservation.objects.filter(PENDING_FILTER, id__in=ids)
+    return _apply(queryset, {
+        'status': Reservation.STATUS_APPROVED,
+        'is_approved': True,
+        'is_rejected': False,
+        'approval_date': approval_date or date.today(),
+        'approval_message': approval_message,
+        'pour_date': pour_date,
+    })
+
+
+# رفض مجموعة حجوزات قيد الانتظار دفعة واحدة
+def bulk_reject(ids):
+    queryset = Reservation.objects.filter(PENDING_FILTER, id__in=ids)
+    return _apply(queryset, {'status': Reservation.STATUS_REJECTED, 'is_approved': False, 'is_rejected': True})
+
+
+# تأكيد مجموعة حجوزات مقبولة بالكمية والعيار المسجلين حاليًا، بنفس قاعدة التأكيد الفردي:
+# الحجز المسدد بالكامل يكتمل بعد تأكيده في نفس التحديث، والبقية تبقى مؤكدة حتى تسجيل آخر دفعة (payments.record_payment)
+def bulk_confirm(ids):
+    queryset = Reservation.objects.filter(CONFIRMABLE_FILTER, id__in=ids)
+    return _apply(queryset, {
+        'status': Case(When(FULLY_PAID, then=Value(Reservation.STATUS_COMPLETED)), default=Value(Reservation.STATUS_CONFIRMED)),
+        'is_confirmed': True,
+        'is_completed': Case(When(FULLY_PAID, then=Value(True)), default=Value(False)),
+        'completion_date': Case(
+            When(FULLY_PAID, then=Coalesce('completion_date', Value(date.today()))),
+            default=Value(None, output_field=DateField()),
+        ),
+    })
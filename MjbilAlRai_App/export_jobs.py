@@ -0,0 +1,148 @@
+# MjbilAlRai_App/export_jobs.py
+
+import hashlib
+import logging
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from .exports import EXPORT_EXTENSIONS, RESERVATIONS_EXPORT, write_export
+from .models import REUSABLE_EXPORT_JOBS, ExportJob, Reservation
+
+logger = logging.getLogger(__name__)
+
+# أنواع التصدير المتاحة في الخلفية: مصدر البيانات ومواصفات الأعمدة واسم الملف
+EXPORT_KINDS = {
+    'reservations': (lambda: Reservation.objects.all(), RESERVATIONS_EXPORT, 'reservations'),
+}
+
+# مدة الاحتفاظ بملفات التصدير القديمة
+EXPORT_RETENTION = timedelta(days=7)
+
+
+def exports_root():
+    return getattr(settings, 'EXPORTS_ROOT', os.path.join(settings.BASE_DIR, 'exports'))
+
+
+# إصدار البيانات: يتغير عند إضافة أو حذف أو تعديل أي حجز (استعلام تجميعي واحد)
+def current_data_version():
+    state = Reservation.objects.order_by().aggregate(
+        rows=Count('id'),
+        last_id=Max('id'),
+        last_update=Max('updated_at'),
+    )
+    last_update = state['last_update'].isoformat() if state['last_update'] else ''
+    return f"{state['rows']}:{state['last_id'] or 0}:{last_update}"
+
+
+def export_fingerprint(kind, export_format, data_version):
+    return hashlib.sha256(f"{kind}|{export_format}|{data_version}".encode('utf-8')).hexdigest()
+
+
+# طلب تصدير: إعادة استخدام مهمة مطابقة لنفس إصدار البيانات أو إنشاء مهمة جديدة
+# قيد exportjob_reusable_unique يسمح بمهمة واحدة قابلة لإعادة الاستخدام لكل صيغة وبصمة،
+# فالطلبان المتزامنان لنفس البيانات ينتهيان بنفس المهمة (الثاني يقرأ مهمة الأول بعد فشل الإدراج)
+def request_export(kind, export_format, user=None):
+    fingerprint = export_fingerprint(kind, export_format, current_data_version())
+    reusable = ExportJob.objects.filter(REUSABLE_EXPORT_JOBS, export_format=export_format, fingerprint=fingerprint)
+    with transaction.atomic():
+        existing = reusable.select_for_update().first()
+        if existing and existing.status == ExportJob.STATUS_DONE and not os.path.exists(existing.file_path):
+            # الملف حُذف من القرص: المهمة لم تعد قابلة لإعادة الاستخدام وتُنشأ مهمة جديدة مكانها
+            existing.file_path = ''
+            existing.save(update_fields=['file_path'])
+            existing = None
+        if existing:
+            return existing, False
+        try:
+            with transaction.atomic():
+                job = ExportJob.objects.create(
+                    kind=kind,
+                    export_format=export_format,
+                    fingerprint=fingerprint,
+                    requested_by=user if user is not None and user.is_authenticated else None,
+                )
+        except IntegrityError:
+            return reusable.get(), False
+    return job, True
+
+
+# حجز المهمة التالية في قائمة الانتظار (SKIP LOCKED على Postgres لتعدد العمال)
+def claim_next_job():
+    with transaction.atomic():
+        job = (
+            ExportJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ExportJob.STATUS_QUEUED)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = ExportJob.STATUS_RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+        return job
+
+
+# توليد ملف المهمة على القرص ثم نقله إلى مساره النهائي
+def run_job(job):
+    queryset_factory, spec, basename = EXPORT_KINDS[job.kind]
+    data_version = current_data_version()
+    fingerprint = export_fingerprint(job.kind, job.export_format, data_version)
+    directory = exports_root()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{basename}-{job.pk}-{fingerprint[:12]}.{EXPORT_EXTENSIONS[job.export_format]}")
+    partial_path = f"{path}.part"
+
+    try:
+        with open(partial_path, 'wb') as output:
+            rows_count = write_export(queryset_factory(), spec, job.export_format, output)
+        os.replace(partial_path, path)
+    except Exception as e:
+        logger.exception(f"Export job {job.pk} failed")
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        job.status = ExportJob.STATUS_FAILED
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return job
+
+    # تخزين البصمة حسب إصدار البيانات وقت التوليد حتى تُعاد الاستفادة من الملف بشكل صحيح
+    # (إذا طُلبت مهمة أخرى لنفس الإصدار في هذه الأثناء تبقى البصمة الأصلية، فالقيد يمنع تكرارها)
+    job.status = ExportJob.STATUS_DONE
+    job.data_version = data_version
+    job.file_path = path
+    job.rows_count = rows_count
+    job.finished_at = timezone.now()
+    fields = ['status', 'data_version', 'file_path', 'rows_count', 'finished_at']
+    original_fingerprint, job.fingerprint = job.fingerprint, fingerprint
+    try:
+        with transaction.atomic():
+            job.save(update_fields=fields + ['fingerprint'])
+    except IntegrityError:
+        job.fingerprint = original_fingerprint
+        job.save(update_fields=fields)
+    return job
+
+
+# إعادة المهام العالقة (بعد توقف العامل فجأة) إلى قائمة الانتظار
+def requeue_stale_jobs(timeout):
+    return ExportJob.objects.filter(
+        status=ExportJob.STATUS_RUNNING,
+        started_at__lt=timezone.now() - timeout,
+    ).update(status=ExportJob.STATUS_QUEUED, started_at=None)
+
+
+# حذف الملفات القديمة من القرص
+def purge_old_exports(retention=EXPORT_RETENTION):
+    removed = 0
+    for job in ExportJob.objects.filter(status=ExportJob.STATUS_DONE, finished_at__lt=timezone.now() - retention).exclude(file_path=''):
+        if os.path.exists(job.file_path):
+            os.remove(job.file_path)
+        job.file_path = ''
+        job.save(update_fields=['file_path'])
+        removed += 1
+    return removed
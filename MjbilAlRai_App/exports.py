@@ -0,0 +1,264 @@
+# MjbilAlRai_App/exports.py
+
+import csv
+import json
+import tempfile
+from collections import namedtuple
+from decimal import Decimal
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from .aggregates import remaining_amount_expression
+from .models import Reservation
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_CONTENT_TYPE = 'text/csv; charset=utf-8'
+JSONL_CONTENT_TYPE = 'application/x-ndjson; charset=utf-8'
+
+# صيغ التصدير المدعومة
+EXPORT_FORMATS = ('xlsx', 'csv', 'jsonl')
+EXPORT_EXTENSIONS = {'xlsx': 'xlsx', 'csv': 'csv', 'jsonl': 'jsonl'}
+
+# عدد الصفوف التي تُقرأ من قاعدة البيانات في كل دفعة
+EXPORT_CHUNK_SIZE = 2000
+
+# حجم كتل البيانات المرسلة إلى المستخدم
+STREAM_BLOCK_SIZE = 64 * 1024
+
+HEADER_STYLE = 'reservation_header'
+CELL_STYLE = 'reservation_cell'
+TOTAL_STYLE = 'reservation_total'
+
+TOTAL_LABEL = 'إجمالي:'
+
+
+# تنسيق التاريخ كما في ملفات التصدير السابقة
+def format_date(value):
+    return value.strftime('%Y-%m-%d') if value else ''
+
+
+def format_bool(value):
+    return 'نعم' if value else 'لا'
+
+
+def format_status(value):
+    return dict(Reservation.STATUS_CHOICES).get(value, value)
+
+
+# تعريف عمود تصدير: العنوان، اسم الحقل، دالة التنسيق، وهل يُجمع في صف الإجماليات
+Column = namedtuple('Column', ['header', 'field', 'formatter', 'total'], defaults=[None, False])
+
+# تعريف ملف تصدير: الأعمدة، اسم الورقة، والحقل الذي يُكتب تحته عنوان الإجماليات
+ExportSpec = namedtuple('ExportSpec', ['columns', 'sheet_title', 'total_label_field'], defaults=['total_cost'])
+
+# حقول محسوبة داخل قاعدة البيانات يمكن استخدامها في الأعمدة
+COMPUTED_FIELDS = {
+    'computed_remaining': remaining_amount_expression,
+}
+
+RESERVATION_COLUMNS = [
+    Column('رقم الحجز', 'reservation_number'),
+    Column('اسم العميل', 'customer_name'),
+    Column('اسم النجار', 'carpenter_name'),
+    Column('نوع الخرسانة', 'concrete_type'),
+    Column('كمية الخرسانة', 'concrete_quantity'),
+    Column('موقع الصب', 'site_location'),
+    Column('المسافة التقديرية', 'estimated_distance'),
+    Column('تاريخ الحجز', 'reservation_date', format_date),
+    Column('تاريخ الموافقة', 'approval_date', format_date),
+    Column('رسالة الموافقة', 'approval_message'),
+    Column('السعر للوحدة', 'price_per_unit'),
+    Column('الخصم', 'discount'),
+    Column('إجمالي التكلفة', 'total_cost'),
+    Column('ملاحظات المحاسب', 'accountant_notes'),
+    Column('مجموع الدفعات المدفوعة', 'payments', total=True),
+    Column('المبلغ المتبقي', 'computed_remaining', total=True),
+    Column('اكتمال الحجز', 'is_completed', format_bool),
+    Column('تاريخ اكتمال الحجز', 'completion_date', format_date),
+    Column('الحالة', 'status', format_status),
+]
+
+CUSTOMER_COLUMNS = [
+    Column('رقم الحجز', 'reservation_number'),
+    Column('اسم العميل', 'customer_name'),
+    Column('اسم النجار', 'carpenter_name'),
+    Column('عيار الخرسانة', 'concrete_type'),
+    Column('كمية الخرسانة', 'concrete_quantity'),
+    Column('السعر للوحدة', 'price_per_unit'),
+    Column('الخصم', 'discount'),
+    Column('إجمالي التكلفة', 'total_cost'),
+    Column('ملاحظات المحاسب', 'accountant_notes'),
+    Column('مجموع الدفعات المدفوعة', 'payments', total=True),
+    Column('المبلغ المتبقي', 'computed_remaining', total=True),
+    Column('اكتمال الحجز', 'is_completed', format_bool),
+    Column('تاريخ اكتمال الحجز', 'completion_date', format_date),
+    Column('الحالة', 'status', format_status),
+]
+
+RESERVATIONS_EXPORT = ExportSpec(RESERVATION_COLUMNS, 'الحجوزات')
+CUSTOMER_EXPORT = ExportSpec(CUSTOMER_COLUMNS, 'حجوزات العميل')
+
+
+# مصدر الصفوف: قراءة القيم فقط على دفعات مع حساب الحقول المحسوبة داخل قاعدة البيانات
+def iter_rows(queryset, spec, chunk_size=EXPORT_CHUNK_SIZE):
+    fields = [column.field for column in spec.columns]
+    annotations = {name: COMPUTED_FIELDS[name]() for name in fields if name in COMPUTED_FIELDS}
+    if annotations:
+        queryset = queryset.annotate(**annotations)
+    if not queryset.query.order_by:
+        queryset = queryset.order_by('id')
+    yield from queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def _format_row(spec, row):
+    return [
+        column.formatter(value) if column.formatter else value
+        for column, value in zip(spec.columns, row)
+    ]
+
+
+# تجميع أعمدة الإجماليات أثناء المرور على الصفوف
+class _Totals:
+    def __init__(self, spec):
+        self.spec = spec
+        self.sums = {index: Decimal(0) for index, column in enumerate(spec.columns) if column.total}
+
+    def add(self, row):
+        for index in self.sums:
+            self.sums[index] += row[index] or Decimal(0)
+        return row
+
+    def row(self):
+        values = []
+        for index, column in enumerate(self.spec.columns):
+            if index in self.sums:
+                values.append(self.sums[index])
+            elif column.field == self.spec.total_label_field:
+                values.append(TOTAL_LABEL)
+            else:
+                values.append('')
+        return values
+
+
+# إنشاء الأنماط المسماة مرة واحدة لكل ملف بدلاً من إنشاء Border/Alignment لكل خلية
+def _register_styles(workbook):
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    center = Alignment(horizontal='center', vertical='center')
+
+    header = NamedStyle(name=HEADER_STYLE)
+    header.font = Font(bold=True, color="FFFFFF")
+    header.alignment = center
+    header.fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+    header.border = border
+
+    cell = NamedStyle(name=CELL_STYLE)
+    cell.alignment = center
+    cell.border = border
+
+    total = NamedStyle(name=TOTAL_STYLE)
+    total.font = Font(bold=True, color="FF0000")
+    total.alignment = center
+    total.fill = PatternFill(start_color="D9EAD3", end_color="D9EAD3", fill_type="solid")
+    total.border = border
+
+    for style in (header, cell, total):
+        workbook.add_named_style(style)
+
+
+def _styled_row(worksheet, values, style):
+    row = []
+    for value in values:
+        cell = WriteOnlyCell(worksheet, value=value)
+        cell.style = style
+        row.append(cell)
+    return row
+
+
+# كتابة الصفوف في ورقة عمل بوضع الكتابة فقط (ذاكرة ثابتة) مع صف الإجماليات
+def write_xlsx(spec, rows, output):
+    workbook = Workbook(write_only=True)
+    _register_styles(workbook)
+    worksheet = workbook.create_sheet(title=spec.sheet_title)
+    totals = _Totals(spec)
+
+    worksheet.append(_styled_row(worksheet, [column.header for column in spec.columns], HEADER_STYLE))
+    for row in rows:
+        worksheet.append(_styled_row(worksheet, _format_row(spec, totals.add(row)), CELL_STYLE))
+
+    if totals.sums:
+        worksheet.append([])
+        worksheet.append(_styled_row(worksheet, totals.row(), TOTAL_STYLE))
+
+    workbook.save(output)
+
+
+# كائن وهمي يعيد السطر المكتوب بدلاً من تخزينه (للكتابة المتدفقة)
+class _Echo:
+    def write(self, value):
+        return value
+
+
+# توليد ملف CSV سطرًا بسطر دون تنسيقات (أسرع مسار للاستخراجات الكبيرة)
+def iter_csv(spec, rows):
+    writer = csv.writer(_Echo())
+    # علامة BOM ليتعرف Excel على الترميز العربي
+    yield '\ufeff'.encode('utf-8') + writer.writerow([column.header for column in spec.columns]).encode('utf-8')
+    for row in rows:
+        yield writer.writerow(_format_row(spec, row)).encode('utf-8')
+
+
+# توليد سطر JSON لكل حجز بأسماء الحقول والقيم الخام
+def iter_jsonl(spec, rows):
+    fields = [column.field for column in spec.columns]
+    for row in rows:
+        yield (json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+STREAM_WRITERS = {
+    'csv': (iter_csv, CSV_CONTENT_TYPE),
+    'jsonl': (iter_jsonl, JSONL_CONTENT_TYPE),
+}
+
+
+# كتابة ملف تصدير كامل إلى كائن ملف ثنائي (للاستخدام خارج طلبات HTTP) وإرجاع عدد الصفوف
+def write_export(queryset, spec, fmt, output):
+    written = [0]
+
+    def rows():
+        for row in iter_rows(queryset, spec):
+            written[0] += 1
+            yield row
+
+    if fmt == 'xlsx':
+        write_xlsx(spec, rows(), output)
+    else:
+        writer, _ = STREAM_WRITERS[fmt]
+        for chunk in writer(spec, rows()):
+            output.write(chunk)
+    return written[0]
+
+
+# إنشاء استجابة تصدير متدفقة بالصيغة المطلوبة
+def export_response(queryset, spec, fmt, filename):
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'xlsx'
+    filename = f"{filename}.{EXPORT_EXTENSIONS[fmt]}"
+    rows = iter_rows(queryset, spec)
+
+    if fmt == 'xlsx':
+        # ملف XLSX أرشيف zip لا يكتمل إلا بعد كتابة جميع الصفوف، لذا يُكتب إلى ملف مؤقت ثم يُرسل على دفعات
+        output = tempfile.TemporaryFile()
+        write_xlsx(spec, rows, output)
+        output.seek(0)
+        response = FileResponse(output, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+        response.block_size = STREAM_BLOCK_SIZE
+        return response
+
+    writer, content_type = STREAM_WRITERS[fmt]
+    response = StreamingHttpResponse(writer(spec, rows), content_type=content_type)
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
@@ -1,7 +1,8 @@
 # MjbilAlRai_App/forms.py
 
 from django import forms
-from .models import Reservation
+from .models import Payment, Reservation
+from .tariffs import quote_price
 from decimal import Decimal
 
 class ReservationForm(forms.ModelForm):
@@ -101,6 +102,13 @@ class FinancialDetailsForm(forms.ModelForm):
             'concrete_quantity': forms.NumberInput(attrs={'class': 'form-control'}),
         }
 
+    # حجز غير مسعّر: السعر المقترح من التعرفة حسب العيار والمسافة وتاريخ الحجز
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        instance = self.instance
+        if not self.is_bound and instance.pk and instance.price_per_unit is None:
+            self.initial['price_per_unit'] = quote_price(instance.concrete_type, instance.estimated_distance, instance.reservation_date)
+
     def clean(self):
         cleaned_data = super().clean()
         discount = cleaned_data.get('discount', Decimal(0))
@@ -126,6 +134,13 @@ class PaymentForm(forms.Form):
         min_value=0,  # لضمان أن الدفعة لا تكون سالبة
     )
 
+    method = forms.ChoiceField(
+        choices=[(value, label) for value, label in Payment.METHOD_CHOICES if value in (Payment.METHOD_CASH, Payment.METHOD_TRANSFER, Payment.METHOD_CHEQUE)],
+        initial=Payment.METHOD_CASH,
+        label="طريقة الدفع",
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+
     def __init__(self, *args, **kwargs):
         self.remaining_balance = kwargs.pop('remaining_balance', None)
         super(PaymentForm, self).__init__(*args, **kwargs)
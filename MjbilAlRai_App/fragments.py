@@ -0,0 +1,47 @@
+# MjbilAlRai_App/fragments.py
+
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from .models import Reservation
+
+FRAGMENT_CACHE_ALIAS = 'template_fragments'
+
+# الحقول اللازمة لتقسيم الصفحة وبناء مفاتيح الأجزاء المخزنة (بقية الحقول تُقرأ للصفوف غير المخزنة فقط)
+ROW_KEY_FIELDS = ('id', 'reservation_date', 'updated_at', 'status')
+
+
+def fragment_cache():
+    return caches[FRAGMENT_CACHE_ALIAS]
+
+
+# مفتاح صف الجدول: رقم الحجز وختم آخر تعديل (updated_at يتغير مع كل حفظ أو تحديث جماعي أو دفعة)
+# فلا حاجة إلى إبطال: أي تعديل ينتج مفتاحًا جديدًا والقديم يُحذف عند امتلاء الذاكرة أو انتهاء صلاحيته
+def fragment_key(template_name, reservation):
+    stamp = reservation.updated_at.timestamp() if reservation.updated_at else 0
+    return f"fragment:{template_name}:{reservation.id}:{stamp}"
+
+
+# HTML كل صف في row.fragment: من الذاكرة المؤقتة باستعلام واحد، والصفوف الناقصة تُقرأ بحقولها
+# المطلوبة في استعلام واحد وتُعرض ثم تُخزن
+def render_reservation_rows(rows, template_name, fields):
+    cache = fragment_cache()
+    keys = {row.id: fragment_key(template_name, row) for row in rows}
+    fragments = cache.get_many(keys.values())
+
+    missing = [row.id for row in rows if keys[row.id] not in fragments]
+    if missing:
+        rendered = {
+            keys[reservation.id]: render_to_string(template_name, {'reservation': reservation})
+            for reservation in Reservation.objects.filter(id__in=missing).only(*fields)
+        }
+        cache.set_many(rendered)
+        fragments.update(rendered)
+
+    for row in rows:
+        row.fragment = mark_safe(fragments.get(keys[row.id], ''))
+    return rows
+
+
+def clear_fragment_cache():
+    fragment_cache().clear()
@@ -0,0 +1,177 @@
+# MjbilAlRai_App/instrumentation.py
+
+import json
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+logger = logging.getLogger('MjbilAlRai_App.performance')
+
+# أوامر نقاط الحفظ (transaction.atomic المتداخلة) تُعد منفصلة عن الاستعلامات: عددها يختلف بين الاختبارات
+# (كل اختبار داخل معاملة) والتشغيل الفعلي، ولا تقرأ أو تكتب بيانات
+SAVEPOINT_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+# مقاييس الطلب الحالي (متاحة لمحرك القوالب دون تمريرها عبر الدوال)
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.savepoints = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+
+    # غلاف تنفيذ الاستعلامات (connection.execute_wrapper) لعد الاستعلامات وقياس زمنها
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if sql.lstrip().upper().startswith(SAVEPOINT_STATEMENTS):
+                self.savepoints += 1
+            else:
+                self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+
+# قالب يقيس زمن العرض للقالب الرئيسي فقط (القوالب المضمنة تُحسب ضمنه)
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics = current_metrics.get()
+            if metrics is not None:
+                metrics.render_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def _response_size(response):
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length else None
+    return len(response.content)
+
+
+# تسجيل عدد الاستعلامات وزمن قاعدة البيانات وزمن العرض وحجم الاستجابة لكل طلب،
+# مع ترويسة Server-Timing وسطر سجل بصيغة JSON وحدود (budgets) لكل اسم مسار
+class PerformanceMiddleware:
+    # يعمل تحت WSGI و ASGI (طبقة متزامنة فقط كانت ستجبر العروض غير المتزامنة على العمل في خيط)
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            with self._wrap_connections(metrics):
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self._finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        # اتصالات قاعدة البيانات خاصة بكل خيط، والاستعلامات غير المتزامنة تُنفذ في خيط الطلب
+        # (sync_to_async)، لذلك يُثبت الغلاف ويُزال داخل ذلك الخيط وليس في حلقة الأحداث
+        stack = await sync_to_async(self._wrap_connections)(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            current_metrics.reset(token)
+        # request.user قد يحتاج إلى قراءة الجلسة من قاعدة البيانات (غير مسموح داخل حلقة الأحداث)
+        return await sync_to_async(self._finish)(request, response, metrics, started)
+
+    def _wrap_connections(self, metrics):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        return stack
+
+    def _finish(self, request, response, metrics, started):
+        total_time = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.url_name if match else None
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'url_name': url_name,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'savepoints': metrics.savepoints,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'render_ms': round(metrics.render_time * 1000, 2),
+            'total_ms': round(total_time * 1000, 2),
+            'response_bytes': _response_size(response),
+        }
+        logger.info(json.dumps(record, ensure_ascii=False))
+
+        if self._show_timing(request):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={record["db_ms"]};desc="{metrics.queries} queries"',
+                f'render;dur={record["render_ms"]}',
+                f'total;dur={record["total_ms"]}',
+            ])
+
+        self._check_budget(url_name, request.method, record)
+        return response
+
+    # ترويسة Server-Timing في وضع التطوير أو للموظفين فقط
+    def _show_timing(self, request):
+        if settings.DEBUG:
+            return True
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_staff)
+
+    # مقارنة القياسات بحدود المسار: تحذير في السجل، أو استثناء في وضع raise (للاختبارات)
+    # حدود "اسم_المسار:POST" تسبق حدود اسم المسار نفسه (الحفظ يحتاج استعلامات أكثر من العرض)
+    def _check_budget(self, url_name, method, record):
+        budgets = settings.PERFORMANCE_BUDGETS
+        budget = budgets.get(f"{url_name}:{method}", budgets.get(url_name))
+        if not budget:
+            return
+        exceeded = [
+            f"{metric}={record[metric]} > {limit}"
+            for metric, limit in budget.items()
+            if record.get(metric) is not None and record[metric] > limit
+        ]
+        if not exceeded:
+            return
+        message = f"Performance budget exceeded for {url_name}: {', '.join(exceeded)}"
+        if settings.PERFORMANCE_BUDGET_MODE == 'raise':
+            raise BudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,155 @@
+# MjbilAlRai_App/ledger.py
+
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.deletion import Collector
+from .aggregates import CENT, gross_amount_expression, remaining_amount_expression
+from .models import CONFIRMED_STATUSES, STORED_STATE_FIELDS, LedgerSummary, Reservation
+from .reporting import REPORT_FIELDS, apply_report_groups
+
+# الحقول التراكمية في ملخص الدفتر
+LEDGER_FIELDS = ('reservations_count', 'gross_amount', 'discount', 'payments', 'remaining')
+
+# عدد المعرفات في كل استعلام تجميع (للبقاء ضمن حدود عدد المعاملات في الاستعلام)
+GROUPS_BATCH_SIZE = 500
+
+
+# إضافة (أو طرح) قيم إلى صف الملخص الخاص بالحالة ونوع الخرسانة بتحديث ذري F()
+def _add_to_ledger(key, values, sign=1):
+    status, concrete_type = key
+    changes = {field: F(field) + sign * values[field] for field in LEDGER_FIELDS}
+    rows = LedgerSummary.objects.filter(status=status, concrete_type=concrete_type)
+    if rows.update(**changes):
+        return
+    try:
+        # إنشاء الصف لأول مرة داخل نقطة حفظ حتى لا تفشل المعاملة الخارجية عند التزامن
+        with transaction.atomic():
+            LedgerSummary.objects.create(
+                status=status,
+                concrete_type=concrete_type,
+                **{field: sign * values[field] for field in LEDGER_FIELDS},
+            )
+    except IntegrityError:
+        rows.update(**changes)
+
+
+# تطبيق الفرق بين المساهمة القديمة والجديدة لحجز واحد
+def apply_ledger_delta(old, new):
+    if old == new:
+        return
+    if old is not None:
+        _add_to_ledger(old[0], old[1], sign=-1)
+    if new is not None:
+        _add_to_ledger(new[0], new[1], sign=1)
+
+
+# مساهمات مجموعة حجوزات (بالمعرفات) في ملخص الدفتر مجمعة حسب (الحالة، نوع الخرسانة)
+def ledger_groups(ids):
+    groups = {}
+    for start in range(0, len(ids), GROUPS_BATCH_SIZE):
+        rows = (
+            Reservation.objects.filter(id__in=ids[start:start + GROUPS_BATCH_SIZE], status__in=CONFIRMED_STATUSES)
+            .order_by()
+            .values('status', 'concrete_type')
+            .annotate(
+                total_reservations_count=Count('id'),
+                total_gross_amount=Sum(gross_amount_expression()),
+                total_discount=Sum('discount'),
+                total_payments=Sum('payments'),
+                total_remaining=Sum(remaining_amount_expression()),
+            )
+        )
+        for row in rows:
+            values = groups.setdefault((row['status'], row['concrete_type']), dict.fromkeys(LEDGER_FIELDS, 0))
+            for field in LEDGER_FIELDS:
+                values[field] += row[f'total_{field}'] or 0
+    return groups
+
+
+# تعديل الملخص بفرق مساهمات مجموعة حجوزات قبل تحديثها جماعيًا وبعده (UPDATE لا يرسل إشارات post_save)
+def apply_ledger_groups(before, after):
+    empty = dict.fromkeys(LEDGER_FIELDS, 0)
+    for key in before.keys() | after.keys():
+        old, new = before.get(key, empty), after.get(key, empty)
+        delta = {field: new[field] - old[field] for field in LEDGER_FIELDS}
+        if any(delta.values()):
+            _add_to_ledger(key, delta)
+
+
+# جمع مساهمات (مفتاح، قيم) حسب المفتاح
+def _add_contribution(groups, contribution, fields):
+    if contribution is not None:
+        key, values = contribution
+        totals = groups.setdefault(key, dict.fromkeys(fields, 0))
+        for field in fields:
+            totals[field] += values[field]
+
+
+# حذف مجموعة حجوزات مع طرح مساهماتها من ملخص الدفتر والملخص اليومي مجمعة حسب المفتاح
+# (الحالة المخزنة تُقرأ مع الصفوف، ولا تحديث للملخصين لكل حجز في إشارة الحذف)
+def delete_reservations(queryset):
+    with transaction.atomic():
+        reservations = list(queryset.select_for_update().only(*STORED_STATE_FIELDS))
+        removed, removed_reports = {}, {}
+        for reservation in reservations:
+            _add_contribution(removed, reservation._ledger_state, LEDGER_FIELDS)
+            _add_contribution(removed_reports, reservation._report_state, REPORT_FIELDS)
+            # المساهمة تُطرح مجمعة بعد الحذف
+            reservation._ledger_state = None
+            reservation._report_state = None
+        collector = Collector(using=queryset.db, origin=queryset)
+        collector.collect(reservations)
+        deleted = collector.delete()
+        apply_ledger_groups(removed, {})
+        apply_report_groups(removed_reports, {})
+    return deleted
+
+
+# الإجماليات العامة للحجوزات المؤكدة من الملخص (عدد صفوف ثابت بدلاً من مسح الجدول)
+def ledger_totals():
+    totals = LedgerSummary.objects.aggregate(
+        reservations_count=Sum('reservations_count'),
+        total_gross_amount_sum=Sum('gross_amount'),
+        total_discount_sum=Sum('discount'),
+        total_payments_sum=Sum('payments'),
+        total_remaining_sum=Sum('remaining'),
+    )
+    for key, value in totals.items():
+        if key == 'reservations_count':
+            totals[key] = value or 0
+        else:
+            totals[key] = Decimal(value or 0).quantize(CENT)
+    return totals
+
+
+# إعادة بناء الملخص بالكامل من جدول الحجوزات
+@transaction.atomic
+def rebuild_ledger():
+    rows = (
+        Reservation.objects.filter(status__in=CONFIRMED_STATUSES)
+        .order_by()
+        .values('status', 'concrete_type')
+        .annotate(
+            total_count=Count('id'),
+            total_gross=Sum(gross_amount_expression()),
+            total_discount=Sum('discount'),
+            total_payments=Sum('payments'),
+            total_remaining=Sum(remaining_amount_expression()),
+        )
+    )
+    LedgerSummary.objects.all().delete()
+    summaries = [
+        LedgerSummary(
+            status=row['status'],
+            concrete_type=row['concrete_type'],
+            reservations_count=row['total_count'],
+            gross_amount=row['total_gross'] or Decimal(0),
+            discount=row['total_discount'] or Decimal(0),
+            payments=row['total_payments'] or Decimal(0),
+            remaining=row['total_remaining'] or Decimal(0),
+        )
+        for row in rows
+    ]
+    LedgerSummary.objects.bulk_create(summaries)
+    return len(summaries)
@@ -0,0 +1,166 @@
+# MjbilAlRai_App/lookup_cache.py
+
+import hashlib
+import uuid
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from .aggregates import afinancial_totals, financial_totals
+from .models import Reservation
+
+LOOKUP_CACHE_ALIAS = 'lookups'
+
+# لا يتم تخزين نتائج الأرقام التي تملك عددًا كبيرًا جدًا من الحجوزات (حجم العنصر في الذاكرة)
+LOOKUP_CACHE_MAX_ROWS = 1000
+
+# قيمة تمثل "رقم حجز غير موجود" حتى لا تتكرر الاستعلامات عن الأرقام الخاطئة
+MISSING = 'missing'
+
+# نتائج البحث تُحفظ كنسخ من نموذج الحجز، لذلك يتضمن مفتاحها بصمة حقول النموذج وإصدار Django:
+# بعد نشر يضيف حقلاً أو يحذفه لا تُقرأ من الذاكرة المشتركة نسخ محفوظة بالبنية القديمة
+LOOKUP_SCHEMA = hashlib.md5(
+    ','.join([django.get_version()] + [field.attname for field in Reservation._meta.concrete_fields]).encode()
+).hexdigest()[:8]
+
+# تحويل الأرقام العربية والفارسية إلى أرقام لاتينية
+DIGITS_TABLE = str.maketrans('٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹', '01234567890123456789')
+
+
+def lookup_cache():
+    return caches[LOOKUP_CACHE_ALIAS]
+
+
+# توحيد رقم الهاتف: أرقام لاتينية دون مسافات أو شرطات مع الإبقاء على + في البداية
+def normalize_phone(value):
+    value = (value or '').strip().translate(DIGITS_TABLE)
+    digits = ''.join(ch for ch in value if ch.isdigit())
+    return f"+{digits}" if value.startswith('+') and digits else digits
+
+
+def normalize_reservation_number(value):
+    return ''.join((value or '').split()).translate(DIGITS_TABLE)
+
+
+# كل مساحة مفاتيح لها إصدار عشوائي يتغير عند الإبطال، والقيم تُخزن تحت المفتاح "المساحة:الإصدار"
+# القارئ يقرأ الإصدار قبل الاستعلام، فلا يمكن لنتيجة قديمة أن تُكتب تحت الإصدار الجديد بعد التعديل
+# الإصدار المفقود (بعد مسح الذاكرة أو إزالته عند امتلائها) يُستبدل بإصدار جديد لم يُستخدم من قبل،
+# فلا يطابق أي قيمة محفوظة سابقًا وتُقرأ البيانات من قاعدة البيانات من جديد
+def _version_key(namespace):
+    return f"{namespace}:version"
+
+
+def versioned_key(namespace):
+    cache = lookup_cache()
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        # عملية أخرى أنشأت الإصدار في نفس اللحظة: نستخدم إصدارها
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key) or version
+    return f"{namespace}:{version}"
+
+
+async def aversioned_key(namespace):
+    cache = lookup_cache()
+    key = _version_key(namespace)
+    version = await cache.aget(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not await cache.aadd(key, version, timeout=None):
+            version = await cache.aget(key) or version
+    return f"{namespace}:{version}"
+
+
+# إبطال جميع القيم المحفوظة تحت مساحات المفاتيح المعطاة فورًا (إصدار جديد لكل منها)
+def bump(*namespaces):
+    versions = {_version_key(namespace): uuid.uuid4().hex for namespace in namespaces}
+    if versions:
+        lookup_cache().set_many(versions, timeout=None)
+
+
+def _namespace(kind, value):
+    return f"lookup:{LOOKUP_SCHEMA}:{kind}:{value}"
+
+
+def _cached(kind, value, compute, cacheable=lambda result: True):
+    cache = lookup_cache()
+    key = versioned_key(_namespace(kind, value))
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        if cacheable(result):
+            cache.set(key, result, timeout=settings.LOOKUP_CACHE_TIMEOUT)
+    return result
+
+
+async def _acached(kind, value, compute, cacheable=lambda result: True):
+    cache = lookup_cache()
+    key = await aversioned_key(_namespace(kind, value))
+    result = await cache.aget(key)
+    if result is None:
+        result = await compute()
+        if cacheable(result):
+            await cache.aset(key, result, timeout=settings.LOOKUP_CACHE_TIMEOUT)
+    return result
+
+
+# حجوزات رقم هاتف مع إجمالياتها: (قائمة الحجوزات، الإجماليات)
+def phone_lookup(phone_number):
+    def compute():
+        queryset = Reservation.objects.filter(phone_number=phone_number)
+        totals = financial_totals(queryset)
+        return (list(queryset) if totals['reservations_count'] else []), totals
+
+    return _cached('phone', phone_number, compute, lambda result: len(result[0]) <= LOOKUP_CACHE_MAX_ROWS)
+
+
+# الحجز برقم الحجز أو None إذا لم يكن موجودًا
+def reservation_number_lookup(reservation_number):
+    if not reservation_number.isdigit():
+        return Reservation.objects.filter(reservation_number=reservation_number).first()
+
+    def compute():
+        return Reservation.objects.filter(reservation_number=reservation_number).first() or MISSING
+
+    result = _cached('number', reservation_number, compute)
+    return None if result == MISSING else result
+
+
+# النسخ غير المتزامنة من البحث (async_views) بنفس مفاتيح التخزين المؤقت ونفس الإبطال
+async def aphone_lookup(phone_number):
+    async def compute():
+        queryset = Reservation.objects.filter(phone_number=phone_number)
+        totals = await afinancial_totals(queryset)
+        return ([reservation async for reservation in queryset] if totals['reservations_count'] else []), totals
+
+    return await _acached('phone', phone_number, compute, lambda result: len(result[0]) <= LOOKUP_CACHE_MAX_ROWS)
+
+
+async def areservation_number_lookup(reservation_number):
+    if not reservation_number.isdigit():
+        return await Reservation.objects.filter(reservation_number=reservation_number).afirst()
+
+    async def compute():
+        return await Reservation.objects.filter(reservation_number=reservation_number).afirst() or MISSING
+
+    result = await _acached('number', reservation_number, compute)
+    return None if result == MISSING else result
+
+
+def _invalidate_now(phones, numbers):
+    namespaces = [_namespace('phone', phone) for phone in phones if phone]
+    namespaces += [_namespace('number', number) for number in numbers if number]
+    bump(*namespaces)
+
+
+# إبطال نتائج البحث لأرقام الهواتف وأرقام الحجز المعطاة بعد نجاح المعاملة الحالية
+def invalidate_lookups(phones=(), numbers=()):
+    phones, numbers = set(phones), set(numbers)
+    transaction.on_commit(lambda: _invalidate_now(phones, numbers))
+
+
+# مسح جميع نتائج البحث (بعد الإدخال الجماعي الذي لا يرسل إشارات)
+def clear_lookup_cache():
+    lookup_cache().clear()
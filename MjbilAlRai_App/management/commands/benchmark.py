@@ -0,0 +1,175 @@
+# MjbilAlRai_App/management/commands/benchmark.py
+
+import json
+import logging
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from MjbilAlRai_App.fragments import clear_fragment_cache
+from MjbilAlRai_App.lookup_cache import clear_lookup_cache
+from MjbilAlRai_App.models import Reservation
+from MjbilAlRai_App.seeding import seed_reservations
+
+DEFAULT_SIZES = '1000,10000,100000'
+
+BENCHMARK_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-default'},
+    'lookups': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-lookups'},
+    'template_fragments': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-fragments'},
+}
+
+# نسبة التباطؤ التي تعتبر تراجعًا في الأداء عند المقارنة مع نتائج سابقة
+REGRESSION_RATIO = 1.2
+
+
+class Command(BaseCommand):
+    help = "قياس زمن الصفحات الرئيسية والتصدير على قاعدة اختبار مولدة بأحجام مختلفة وحفظ النتائج بصيغة JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default=DEFAULT_SIZES, help="أحجام البيانات مفصولة بفواصل (مثال: 1000,10000,100000)")
+        parser.add_argument('--repeat', type=int, default=5, help="عدد مرات تنفيذ كل صفحة لكل حجم")
+        parser.add_argument('--seed', type=int, default=2024, help="بذرة توليد البيانات")
+        parser.add_argument('--output', default=None, help="مسار ملف JSON للنتائج")
+        parser.add_argument('--compare', default=None, help="ملف نتائج سابق للمقارنة وإظهار التراجعات")
+        parser.add_argument('--warm-cache', action='store_true', help="عدم مسح ذاكرة التخزين المؤقت للبحث وصفوف الجداول بين التكرارات")
+        parser.add_argument('--keepdb', action='store_true', help="الإبقاء على قاعدة الاختبار بعد الانتهاء")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted({int(size) for size in options['sizes'].split(',') if size.strip()})
+        except ValueError:
+            raise CommandError("صيغة --sizes غير صحيحة.")
+        if not sizes or options['repeat'] <= 0:
+            raise CommandError("يجب تحديد حجم واحد على الأقل وعدد تكرارات أكبر من صفر.")
+
+        # سطور سجل الأداء لكل طلب غير مطلوبة أثناء القياس
+        logging.getLogger('MjbilAlRai_App.performance').setLevel(logging.ERROR)
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            # ذاكرة تخزين مؤقت منفصلة حتى لا تختلط نتائج قاعدة الاختبار بذاكرة الإنتاج المشتركة
+            with override_settings(CACHES=BENCHMARK_CACHES):
+                results = self._run(sizes, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'vendor': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'repeat': options['repeat'],
+                'warm_cache': options['warm_cache'],
+            },
+            'results': results,
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                handle.write(output)
+            self.stdout.write(self.style.SUCCESS(f"تم حفظ النتائج في {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self._compare(options['compare'], results)
+
+    def _run(self, sizes, options):
+        client = Client()
+        user = User.objects.create_superuser('benchmark', password='benchmark')
+        client.force_login(user)
+
+        results = []
+        seeded = 0
+        for size in sizes:
+            # التوليد تراكمي: كل حجم يضيف الفرق فقط على الحجم السابق
+            seed_reservations(size - seeded, seed=options['seed'] + size)
+            seeded = size
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {size} حجز"))
+            for name, method, path, data in self._scenarios():
+                timings, queries, response_bytes = [], 0, 0
+                for _ in range(options['repeat']):
+                    if not options['warm_cache']:
+                        clear_lookup_cache()
+                        clear_fragment_cache()
+                    elapsed, queries, response_bytes = self._measure(client, method, path, data)
+                    timings.append(elapsed)
+                result = {
+                    'size': size,
+                    'view': name,
+                    'median_ms': round(statistics.median(timings), 2),
+                    'min_ms': round(min(timings), 2),
+                    'max_ms': round(max(timings), 2),
+                    'queries': queries,
+                    'response_bytes': response_bytes,
+                }
+                results.append(result)
+                self.stdout.write(f"{name:<28} {result['median_ms']:>10.2f} ms  {queries:>3} استعلام")
+        return results
+
+    # الصفحات المقاسة بأكثر البيانات تمثيلًا (رقم الهاتف الأكثر حجوزات، وآخر حجز مؤكد)
+    def _scenarios(self):
+        busiest = Reservation.objects.values('phone_number').annotate(total=Count('id')).order_by('-total').first()
+        phone_number = busiest['phone_number'] if busiest else ''
+        confirmed = Reservation.objects.filter(is_confirmed=True).order_by('-id').values_list('id', flat=True).first() or 0
+        customer_name = Reservation.objects.order_by('-id').values_list('customer_name', flat=True).first() or ''
+        return [
+            ('home', 'post', '/', {'phone_number': phone_number}),
+            ('customer_reservations', 'post', '/customer_reservations/', {'phone_number': phone_number}),
+            ('manage_reservations', 'get', '/manage/', {}),
+            ('manage_reservations_search', 'get', '/manage/', {'q': customer_name}),
+            ('accountant_dashboard', 'get', '/accountant_dashboard/', {}),
+            ('accountant_dashboard_200', 'get', '/accountant_dashboard/', {'per_page': 200}),
+            ('update_financial_details', 'get', f'/update_financial_details/{confirmed}/', {}),
+            ('export_reservations', 'get', '/export_reservations/', {}),
+            ('export_customer_reservations', 'post', '/export_customer_reservations/', {'phone_number': phone_number}),
+        ]
+
+    # زمن الطلب كاملًا بما في ذلك قراءة محتوى الاستجابات المتدفقة (ملفات التصدير)
+    def _measure(self, client, method, path, data):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = getattr(client, method)(path, data)
+            if response.streaming:
+                body = b''.join(response.streaming_content)
+            else:
+                body = response.content
+            elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            raise CommandError(f"{path} أعاد الحالة {response.status_code}")
+        return elapsed, len(captured.captured_queries), len(body)
+
+    def _compare(self, path, results):
+        try:
+            with open(path, encoding='utf-8') as handle:
+                previous = json.load(handle)['results']
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"تعذر قراءة ملف المقارنة: {exc}")
+
+        baseline = {(row['size'], row['view']): row for row in previous}
+        regressions = 0
+        self.stdout.write(self.style.MIGRATE_HEADING("\n== المقارنة مع النتائج السابقة"))
+        for row in results:
+            old = baseline.get((row['size'], row['view']))
+            if not old or not old['median_ms']:
+                continue
+            ratio = row['median_ms'] / old['median_ms']
+            line = f"{row['size']:>7} {row['view']:<28} {old['median_ms']:>10.2f} -> {row['median_ms']:>10.2f} ms (x{ratio:.2f})"
+            if ratio > REGRESSION_RATIO or row['queries'] > old['queries']:
+                regressions += 1
+                self.stdout.write(self.style.WARNING(line))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            raise CommandError(f"تم اكتشاف {regressions} تراجع في الأداء.")
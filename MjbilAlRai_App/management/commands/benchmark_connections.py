@@ -0,0 +1,86 @@
+# MjbilAlRai_App/management/commands/benchmark_connections.py
+
+import json
+import statistics
+import time
+from datetime import datetime, timezone
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.db.backends.signals import connection_created
+from MjbilAlRai_App.models import Reservation
+
+
+class Command(BaseCommand):
+    help = "قياس زمن الطلب الناتج عن فتح اتصال قاعدة البيانات حسب الإعدادات الحالية (DB_CONN_MAX_AGE و DB_POOL)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help="عدد الطلبات المحاكاة")
+        parser.add_argument('--label', default='', help="وصف التشغيل في النتائج (مثال: per-request أو pool)")
+        parser.add_argument('--output', default=None, help="مسار ملف JSON للنتائج")
+        parser.add_argument('--compare', default=None, help="ملف نتائج سابق للمقارنة")
+
+    def handle(self, *args, **options):
+        if options['requests'] <= 0:
+            raise CommandError("يجب أن يكون عدد الطلبات أكبر من صفر.")
+
+        created = []
+
+        def on_connection_created(sender, connection, **kwargs):
+            created.append(connection.alias)
+
+        # كل طلب محاكى يرسل نفس إشارات بداية ونهاية الطلب التي تغلق الاتصالات القديمة أو تعيدها إلى المجمع
+        connection.close()
+        connection_created.connect(on_connection_created)
+        timings = []
+        try:
+            for _ in range(options['requests']):
+                started = time.perf_counter()
+                request_started.send(sender=self.__class__)
+                Reservation.objects.values_list('id', flat=True).first()
+                request_finished.send(sender=self.__class__)
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection_created.disconnect(on_connection_created)
+
+        settings_dict = connection.settings_dict
+        result = {
+            'label': options['label'],
+            'vendor': connection.vendor,
+            'host': settings_dict.get('HOST') or '',
+            'conn_max_age': settings_dict.get('CONN_MAX_AGE'),
+            'conn_health_checks': settings_dict.get('CONN_HEALTH_CHECKS'),
+            'pool': bool(settings_dict.get('OPTIONS', {}).get('pool')),
+            'requests': options['requests'],
+            'connections_opened': len(created),
+            # الطلب الأول يفتح الاتصال في جميع الأوضاع، لذلك يُعرض منفصلًا
+            'first_ms': round(timings[0], 2),
+            'median_ms': round(statistics.median(timings), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'max_ms': round(max(timings), 2),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+        }
+
+        output = json.dumps(result, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                handle.write(output)
+            self.stdout.write(self.style.SUCCESS(f"تم حفظ النتائج في {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self._compare(options['compare'], result)
+
+    def _compare(self, path, result):
+        try:
+            with open(path, encoding='utf-8') as handle:
+                previous = json.load(handle)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"تعذر قراءة ملف المقارنة: {exc}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n== المقارنة مع النتائج السابقة"))
+        for metric in ('connections_opened', 'median_ms', 'mean_ms', 'max_ms'):
+            old, new = previous.get(metric), result[metric]
+            ratio = f" (x{new / old:.2f})" if old else ''
+            self.stdout.write(f"{metric:<20} {previous.get('label') or '-'}: {old} -> {result['label'] or '-'}: {new}{ratio}")
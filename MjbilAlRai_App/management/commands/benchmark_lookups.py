@@ -0,0 +1,126 @@
+# MjbilAlRai_App/management/commands/benchmark_lookups.py
+
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from urllib.error import URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+from django.core.management.base import BaseCommand, CommandError
+from MjbilAlRai_App.models import Reservation
+
+# المسارات المقاسة (نفس نموذج البحث المستخدم في الصفحة الرئيسية وصفحة حجوزات العميل)
+LOOKUP_PATHS = {
+    'home': '/',
+    'customer_reservations': '/customer_reservations/',
+}
+
+
+class Command(BaseCommand):
+    help = "قياس معدل البحث المتزامن برقم الهاتف على خادم قيد التشغيل (للمقارنة بين gunicorn المتزامن و uvicorn)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="عنوان الخادم المقاس")
+        parser.add_argument('--view', choices=sorted(LOOKUP_PATHS), default='home', help="الصفحة المقاسة")
+        parser.add_argument('--phone', default=None, help="رقم الهاتف المستخدم في البحث (الافتراضي: رقم هاتف آخر حجز)")
+        parser.add_argument('--concurrency', type=int, default=32, help="عدد الطلبات المتزامنة")
+        parser.add_argument('--requests', type=int, default=500, help="العدد الكلي للطلبات")
+        parser.add_argument('--timeout', type=float, default=30, help="مهلة كل طلب بالثواني")
+        parser.add_argument('--label', default='', help="وصف التشغيل في النتائج (مثال: wsgi-sync أو asgi-uvicorn)")
+        parser.add_argument('--output', default=None, help="مسار ملف JSON للنتائج")
+        parser.add_argument('--compare', default=None, help="ملف نتائج سابق للمقارنة")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] <= 0 or options['requests'] <= 0:
+            raise CommandError("يجب أن يكون عدد الطلبات والتزامن أكبر من صفر.")
+
+        base_url = options['url'].rstrip('/')
+        url = base_url + LOOKUP_PATHS[options['view']]
+        phone_number = options['phone'] or self._recent_phone()
+        token = self._csrf_token(url, options['timeout'])
+        body = urlencode({'phone_number': phone_number, 'csrfmiddlewaretoken': token}).encode()
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Cookie': f'csrftoken={token}',
+            'Referer': url,
+        }
+
+        def lookup(_):
+            started = time.perf_counter()
+            try:
+                with urlopen(Request(url, data=body, headers=headers), timeout=options['timeout']) as response:
+                    response.read()
+                    ok = response.status == 200
+            except (URLError, OSError):
+                ok = False
+            return ok, (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            outcomes = list(executor.map(lookup, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        timings = sorted(duration for ok, duration in outcomes if ok)
+        errors = len(outcomes) - len(timings)
+        if not timings:
+            raise CommandError("فشلت جميع الطلبات.")
+        result = {
+            'label': options['label'],
+            'url': url,
+            'phone_number': phone_number,
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'errors': errors,
+            'requests_per_second': round(len(timings) / elapsed, 2),
+            'median_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(timings[int(len(timings) * 0.95) - 1 if len(timings) > 1 else 0], 2),
+            'max_ms': round(timings[-1], 2),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+        }
+
+        output = json.dumps(result, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                handle.write(output)
+            self.stdout.write(self.style.SUCCESS(f"تم حفظ النتائج في {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self._compare(options['compare'], result)
+
+    # رقم هاتف آخر حجز (عميل عادي؛ الرقم الأكثر حجوزات يقيس العرض وليس التزامن)
+    def _recent_phone(self):
+        phone_number = Reservation.objects.order_by('-id').values_list('phone_number', flat=True).first()
+        if not phone_number:
+            raise CommandError("لا توجد حجوزات؛ حدد --phone أو استخدم seed_reservations.")
+        return phone_number
+
+    # رمز CSRF من ملف تعريف الارتباط للصفحة (النموذج يُرسل بنفس الرمز في جميع الطلبات)
+    def _csrf_token(self, url, timeout):
+        try:
+            with urlopen(url, timeout=timeout) as response:
+                cookies = SimpleCookie()
+                for header in response.headers.get_all('Set-Cookie') or []:
+                    cookies.load(header)
+        except (URLError, OSError) as exc:
+            raise CommandError(f"تعذر الاتصال بالخادم {url}: {exc}")
+        if 'csrftoken' not in cookies:
+            raise CommandError("لم يُرجع الخادم رمز CSRF.")
+        return cookies['csrftoken'].value
+
+    def _compare(self, path, result):
+        try:
+            with open(path, encoding='utf-8') as handle:
+                previous = json.load(handle)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"تعذر قراءة ملف المقارنة: {exc}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n== المقارنة مع النتائج السابقة"))
+        for metric in ('requests_per_second', 'median_ms', 'p95_ms', 'errors'):
+            old, new = previous.get(metric), result[metric]
+            ratio = f" (x{new / old:.2f})" if old else ''
+            self.stdout.write(f"{metric:<22} {previous.get('label') or '-'}: {old} -> {result['label'] or '-'}: {new}{ratio}")
@@ -0,0 +1,107 @@
+# MjbilAlRai_App/management/commands/explain_queries.py
+
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from MjbilAlRai_App import views
+from MjbilAlRai_App.models import Reservation
+from MjbilAlRai_App.seeding import seed_reservations
+
+RESERVATION_TABLE = Reservation._meta.db_table
+
+
+class Command(BaseCommand):
+    help = "تشغيل EXPLAIN ANALYZE على استعلامات كل صفحة وعرض خطط التنفيذ (مع إمكانية توليد بيانات تجريبية)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help="توليد هذا العدد من الحجوزات قبل التحليل (لا تستخدمه على قاعدة الإنتاج)")
+        parser.add_argument('--no-analyze', action='store_true', help="عرض الخطة فقط دون تنفيذ الاستعلام (Postgres)")
+        parser.add_argument('--verbose-plans', action='store_true', help="عرض الخطة كاملة لكل استعلام")
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            created = seed_reservations(options['seed'])
+            self.stdout.write(self.style.SUCCESS(f"تم توليد {created} حجز."))
+            self._analyze_table()
+
+        self.analyze = not options['no_analyze']
+        self.verbose_plans = options['verbose_plans']
+        for name, view, method, data, kwargs in self._view_calls():
+            self._explain_view(name, view, method, data, kwargs)
+
+    # تحديث إحصاءات الجدول ليستخدم المخطط الفهارس الجديدة
+    def _analyze_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE "{RESERVATION_TABLE}"')
+
+    # الاستدعاءات الممثلة لكل صفحة بالبيانات الأكثر تكرارًا في الجدول
+    def _view_calls(self):
+        busiest = (
+            Reservation.objects.values('phone_number').annotate(total=Count('id')).order_by('-total').first()
+        )
+        phone_number = busiest['phone_number'] if busiest else '0999999999'
+        sample = Reservation.objects.order_by('-id').values('id', 'reservation_number', 'reservation_date').first() or {}
+        reservation_date = sample.get('reservation_date')
+
+        return [
+            ('home (phone)', views.home, 'post', {'phone_number': phone_number}, {}),
+            ('home (reservation number)', views.home, 'post', {'reservation_number': sample.get('reservation_number', '')}, {}),
+            ('customer_reservations', views.customer_reservations, 'post', {'phone_number': phone_number}, {}),
+            ('manage_reservations', views.manage_reservations, 'get', {}, {}),
+            ('manage_reservations (معلق)', views.manage_reservations, 'get', {'status': Reservation.STATUS_PENDING}, {}),
+            ('manage_reservations (مقبول + date)', views.manage_reservations, 'get', {'status': Reservation.STATUS_APPROVED, 'reservation_date': reservation_date or ''}, {}),
+            ('confirm_reservations', views.confirm_reservations, 'get', {}, {}),
+            ('accountant_dashboard', views.accountant_dashboard, 'get', {}, {}),
+            ('accountant_dashboard (remaining)', views.accountant_dashboard, 'get', {'financial_status': 'remaining'}, {}),
+            ('update_financial_details', views.update_financial_details, 'get', {}, {'reservation_id': sample.get('id', 0)}),
+        ]
+
+    def _request(self, method, data):
+        factory = RequestFactory()
+        request = factory.post('/', data) if method == 'post' else factory.get('/', data)
+        # مستخدم مدير غير محفوظ لتجاوز الصلاحيات دون إنشاء حسابات في قاعدة البيانات
+        request.user = User(username='explain', is_superuser=True, is_staff=True, is_active=True)
+        request._dont_enforce_csrf_checks = True
+        return request
+
+    def _explain_view(self, name, view, method, data, kwargs):
+        request = self._request(method, data)
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as captured:
+            view(request, **kwargs)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        queries = [q['sql'] for q in captured.captured_queries if RESERVATION_TABLE in q['sql'] and q['sql'].lstrip().upper().startswith('SELECT')]
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {name}: {len(captured.captured_queries)} استعلام، {elapsed:.1f} ms"))
+        for sql in queries:
+            plan = self._plan(sql)
+            full_scan = self._has_full_scan(plan)
+            marker = self.style.WARNING('SEQ SCAN') if full_scan else self.style.SUCCESS('index')
+            self.stdout.write(f"[{marker}] {sql[:160]}")
+            if self.verbose_plans or full_scan:
+                for line in plan:
+                    self.stdout.write(f"    {line}")
+
+    def _plan(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                options = 'ANALYZE, BUFFERS' if self.analyze else 'COSTS'
+                cursor.execute(f"EXPLAIN ({options}) {sql}")
+                return [row[0] for row in cursor.fetchall()]
+            if connection.vendor == 'sqlite':
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute(f"EXPLAIN {sql}")
+            return [' '.join(str(col) for col in row) for row in cursor.fetchall()]
+
+    def _has_full_scan(self, plan):
+        for line in plan:
+            if f'Seq Scan on "{RESERVATION_TABLE}"' in line or f'Seq Scan on {RESERVATION_TABLE}' in line:
+                return True
+            if line.startswith(f'SCAN {RESERVATION_TABLE}') and 'USING' not in line:
+                return True
+        return False
@@ -0,0 +1,82 @@
+# MjbilAlRai_App/management/commands/import_reservations.py
+
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from import_export.formats.base_formats import CSV, XLSX
+from MjbilAlRai_App.resources import ReservationResource
+
+IMPORT_FORMATS = {
+    'xlsx': XLSX,
+    'csv': CSV,
+}
+
+# عدد أخطاء الأسطر المعروضة افتراضيًا
+DEFAULT_MAX_ERRORS = 50
+
+
+class Command(BaseCommand):
+    help = "استيراد الحجوزات التاريخية من ملف Excel أو CSV (بعناوين ملفات التصدير) على دفعات مع تقرير أخطاء لكل سطر"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="مسار الملف")
+        parser.add_argument('--format', choices=sorted(IMPORT_FORMATS), default=None, help="صيغة الملف (افتراضيًا من امتداده)")
+        parser.add_argument('--dry-run', action='store_true', help="التحقق من الملف دون حفظ أي حجز")
+        parser.add_argument('--skip-invalid', action='store_true', help="حفظ الأسطر الصحيحة حتى لو وُجدت أسطر غير صالحة")
+        parser.add_argument('--max-errors', type=int, default=DEFAULT_MAX_ERRORS, help="أقصى عدد من أخطاء الأسطر المعروضة")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in IMPORT_FORMATS:
+            raise CommandError(f"صيغة غير مدعومة: {fmt}")
+        import_format = IMPORT_FORMATS[fmt]()
+
+        try:
+            with open(path, import_format.get_read_mode()) as handle:
+                content = handle.read()
+        except OSError as exc:
+            raise CommandError(f"تعذر قراءة الملف: {exc}")
+        if not import_format.is_binary() and content.startswith('\ufeff'):
+            content = content[1:]
+
+        started = time.perf_counter()
+        dataset = import_format.create_dataset(content)
+        result = ReservationResource().import_data(
+            dataset,
+            dry_run=options['dry_run'],
+            use_transactions=True,
+            rollback_on_validation_errors=not options['skip_invalid'],
+        )
+        elapsed = time.perf_counter() - started
+
+        self._report_errors(result, options['max_errors'])
+
+        totals = result.totals
+        summary = f"{len(dataset)} سطر، {totals['new']} صالح، {totals['invalid']} غير صالح، {totals['error']} خطأ ({elapsed:.1f} ثانية)"
+        if result.has_errors():
+            raise CommandError(f"فشل الاستيراد ولم يُحفظ أي حجز: {summary}")
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"تجربة فقط دون حفظ: {summary}"))
+        elif result.has_validation_errors() and not options['skip_invalid']:
+            raise CommandError(f"لم يُحفظ أي حجز بسبب الأسطر غير الصالحة (استخدم --skip-invalid لحفظ الأسطر الصحيحة): {summary}")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"تم الاستيراد: {summary}"))
+
+    def _report_errors(self, result, max_errors):
+        shown = 0
+        for error in result.base_errors:
+            self.stderr.write(f"خطأ عام: {error.error}")
+        for number, errors in result.row_errors():
+            for error in errors:
+                if shown < max_errors:
+                    self.stderr.write(f"السطر {number}: {error.error}")
+                shown += 1
+        for invalid in result.invalid_rows:
+            for field, messages in invalid.error_dict.items():
+                if shown < max_errors:
+                    label = ReservationResource.fields[field].column_name if field in ReservationResource.fields else field
+                    self.stderr.write(f"السطر {invalid.number}: {label}: {' '.join(str(message) for message in messages)}")
+                shown += 1
+        if shown > max_errors:
+            self.stderr.write(f"... و{shown - max_errors} خطأ آخر")
@@ -0,0 +1,83 @@
+# MjbilAlRai_App/management/commands/payment_load_test.py
+
+import threading
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+from MjbilAlRai_App.aggregates import financial_totals
+from MjbilAlRai_App.ledger import ledger_totals
+from MjbilAlRai_App.models import CONFIRMED_STATUSES, Reservation
+from MjbilAlRai_App.payments import record_payment
+
+
+class Command(BaseCommand):
+    help = "اختبار حمل لتسجيل الدفعات المتزامنة على حجز واحد والتحقق من عدم ضياع أي دفعة"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help="عدد المحاسبين المتزامنين")
+        parser.add_argument('--payments', type=int, default=25, help="عدد الدفعات لكل خيط")
+        parser.add_argument('--amount', type=Decimal, default=Decimal('1.00'), help="قيمة كل دفعة")
+        parser.add_argument('--keep', action='store_true', help="الإبقاء على الحجز التجريبي بعد الاختبار")
+
+    def handle(self, *args, **options):
+        threads_count = options['threads']
+        payments_count = options['payments']
+        amount = options['amount']
+
+        # حجز تجريبي مؤكد برصيد يكفي جميع الدفعات
+        expected_total = amount * threads_count * payments_count
+        reservation = Reservation.objects.create(
+            customer_name='اختبار الحمل',
+            carpenter_name='اختبار الحمل',
+            concrete_type='250',
+            concrete_quantity=Decimal('100'),
+            site_location='اختبار',
+            estimated_distance=Decimal('1'),
+            phone_number='0900000000',
+            is_approved=True,
+            is_confirmed=True,
+            price_per_unit=(expected_total / 100) + 1,
+        )
+
+        results = {'ok': 0, 'failed': 0}
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                for _ in range(payments_count):
+                    try:
+                        record_payment(reservation.id, amount)
+                        outcome = 'ok'
+                    except DatabaseError:
+                        # على SQLite قد يُرفض الكتابة المتزامنة (database is locked)، وهذا ليس ضياعًا للدفعة
+                        outcome = 'failed'
+                    with lock:
+                        results[outcome] += 1
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker) for _ in range(threads_count)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        reservation.refresh_from_db()
+        recorded = amount * results['ok']
+        lost = recorded - reservation.payments
+        ledger_matches = ledger_totals() == financial_totals(Reservation.objects.filter(status__in=CONFIRMED_STATUSES))
+
+        self.stdout.write(f"الدفعات الناجحة: {results['ok']}، المرفوضة: {results['failed']}، الزمن: {elapsed:.2f} ثانية")
+        self.stdout.write(f"مجموع الدفعات المسجل: {reservation.payments} (المتوقع: {recorded})")
+        self.stdout.write(f"الرصيد المتبقي: {reservation.remaining_balance}")
+        self.stdout.write(f"ملخص الدفتر مطابق: {'نعم' if ledger_matches else 'لا'}")
+
+        if not options['keep']:
+            reservation.delete()
+
+        if lost or not ledger_matches:
+            raise CommandError(f"تم اكتشاف دفعات ضائعة: {lost}")
+        self.stdout.write(self.style.SUCCESS("لا توجد دفعات ضائعة."))
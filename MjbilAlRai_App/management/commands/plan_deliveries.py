@@ -0,0 +1,31 @@
+# MjbilAlRai_App/management/commands/plan_deliveries.py
+
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from MjbilAlRai_App.scheduling import schedule_day
+
+
+class Command(BaseCommand):
+    help = "إعداد جدول تسليم الصبّات المقبولة أو المؤكدة حسب تاريخ الصب على الشاحنات الخلاطة ليوم محدد (افتراضيًا يوم الغد)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--day', default=None, help="يوم التسليم (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        day = date.today() + timedelta(days=1)
+        if options['day']:
+            try:
+                day = parse_date(options['day'])
+            except ValueError:
+                day = None
+            if day is None:
+                raise CommandError(f"تاريخ غير صحيح: {options['day']}")
+
+        started = time.perf_counter()
+        trips, unscheduled = schedule_day(day)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"تم إعداد جدول يوم {day}: {trips} رحلة ({elapsed:.2f} ثانية)."))
+        if unscheduled:
+            self.stdout.write(self.style.WARNING(f"{len(unscheduled)} حجز لم يتسع له دوام الشاحنات."))
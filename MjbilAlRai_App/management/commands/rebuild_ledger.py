@@ -0,0 +1,15 @@
+# MjbilAlRai_App/management/commands/rebuild_ledger.py
+
+from django.core.management.base import BaseCommand
+from MjbilAlRai_App.ledger import ledger_totals, rebuild_ledger
+
+
+class Command(BaseCommand):
+    help = "إعادة بناء ملخص الدفتر للحجوزات المؤكدة من جدول الحجوزات بالكامل"
+
+    def handle(self, *args, **options):
+        rows = rebuild_ledger()
+        totals = ledger_totals()
+        self.stdout.write(self.style.SUCCESS(f"تمت إعادة بناء ملخص الدفتر ({rows} صف)."))
+        for key, value in totals.items():
+            self.stdout.write(f"{key}: {value}")
@@ -0,0 +1,62 @@
+# MjbilAlRai_App/management/commands/recalculate_reservations.py
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from MjbilAlRai_App.models import Reservation
+from MjbilAlRai_App.recalculation import recalculate_reservations, stale_reservations, stale_report
+
+# عدد الحجوزات المختلفة المعروضة افتراضيًا في وضع التحقق
+DEFAULT_MAX_ROWS = 50
+
+
+class Command(BaseCommand):
+    help = "إعادة حساب التكلفة الإجمالية والمبلغ المتبقي والحالة وتواريخ الاكتمال لجميع الحجوزات باستعلام UPDATE واحد (أو التحقق منها فقط)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help="عرض الحجوزات التي تختلف قيمها المخزنة عن المحسوبة دون تعديلها")
+        parser.add_argument('--from', dest='start', default=None, help="أول تاريخ حجز (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='end', default=None, help="آخر تاريخ حجز (YYYY-MM-DD)")
+        parser.add_argument('--max-rows', type=int, default=DEFAULT_MAX_ROWS, help="أقصى عدد من الحجوزات المعروضة في وضع التحقق")
+
+    def handle(self, *args, **options):
+        queryset = Reservation.objects.all()
+        start = self._parse(options['start'])
+        end = self._parse(options['end'])
+        if start:
+            queryset = queryset.filter(reservation_date__gte=start)
+        if end:
+            queryset = queryset.filter(reservation_date__lte=end)
+
+        if options['verify']:
+            self._verify(queryset, options['max_rows'])
+            return
+
+        started = time.perf_counter()
+        updated = recalculate_reservations(queryset)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"تمت إعادة حساب {updated} حجز ({elapsed:.1f} ثانية)."))
+
+    def _verify(self, queryset, max_rows):
+        count = stale_reservations(queryset).count()
+        if not count:
+            self.stdout.write(self.style.SUCCESS("القيم المخزنة مطابقة للقيم المحسوبة لجميع الحجوزات."))
+            return
+        labels = {field.name: field.verbose_name for field in Reservation._meta.fields}
+        for number, differences in stale_report(queryset, limit=max_rows):
+            details = '، '.join(f"{labels[field]}: المخزن {stored}، المحسوب {expected}" for field, stored, expected in differences)
+            self.stdout.write(f"{number}: {details}")
+        if count > max_rows:
+            self.stdout.write(f"... و{count - max_rows} حجز آخر")
+        self.stdout.write(self.style.WARNING(f"{count} حجز غير مطابق (شغّل الأمر دون --verify لإعادة الحساب)."))
+
+    def _parse(self, value):
+        if value is None:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise CommandError(f"تاريخ غير صحيح: {value}")
+        return parsed
@@ -0,0 +1,38 @@
+# MjbilAlRai_App/management/commands/reconcile_payments.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from MjbilAlRai_App.models import Payment
+from MjbilAlRai_App.payments import payment_mismatches
+
+
+class Command(BaseCommand):
+    help = "مقارنة مجموع الدفعات المخزن لكل حجز مع سجل الدفعات (مع إمكانية إضافة دفعات تعديل للفروقات)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="إضافة دفعة تعديل لكل فرق حتى يطابق السجل الحقل المخزن")
+
+    def handle(self, *args, **options):
+        mismatches = list(payment_mismatches().values('id', 'reservation_number', 'phone_number', 'payments', 'entries_total'))
+        for row in mismatches:
+            self.stdout.write(f"{row['reservation_number']}: المخزن {row['payments']}، السجل {row['entries_total']}")
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("سجل الدفعات مطابق لجميع الحجوزات."))
+            return
+
+        if options['fix']:
+            with transaction.atomic():
+                Payment.objects.bulk_create([
+                    Payment(
+                        reservation_id=row['id'],
+                        phone_number=row['phone_number'],
+                        amount=row['payments'] - row['entries_total'],
+                        method=Payment.METHOD_ADJUSTMENT,
+                        note="تسوية فرق بين مجموع الدفعات المخزن وسجل الدفعات",
+                    )
+                    for row in mismatches
+                ])
+            self.stdout.write(self.style.SUCCESS(f"تمت إضافة {len(mismatches)} دفعة تسوية."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(mismatches)} حجز غير مطابق (استخدم --fix للتسوية)."))
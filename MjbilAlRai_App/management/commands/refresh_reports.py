@@ -0,0 +1,38 @@
+# MjbilAlRai_App/management/commands/refresh_reports.py
+
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from MjbilAlRai_App.reporting import refresh_daily_summary
+
+
+class Command(BaseCommand):
+    help = "تحديث ملخص التقارير اليومي (بالكامل أو لنطاق تواريخ محدد)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', default=None, help="بداية النطاق (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='end', default=None, help="نهاية النطاق (YYYY-MM-DD)")
+        parser.add_argument('--days', type=int, default=None, help="تحديث آخر N يومًا فقط (للتشغيل الدوري)")
+
+    def handle(self, *args, **options):
+        start = self._parse(options['start'])
+        end = self._parse(options['end'])
+        if options['days'] is not None:
+            start = date.today() - timedelta(days=options['days'])
+        if start and end and start > end:
+            raise CommandError("تاريخ البداية بعد تاريخ النهاية.")
+
+        rows = refresh_daily_summary(start, end)
+        scope = f"من {start or 'البداية'} إلى {end or 'النهاية'}"
+        self.stdout.write(self.style.SUCCESS(f"تم تحديث ملخص التقارير {scope} ({rows} صف)."))
+
+    def _parse(self, value):
+        if value is None:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise CommandError(f"تاريخ غير صحيح: {value}")
+        return parsed
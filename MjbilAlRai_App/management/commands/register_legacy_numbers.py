@@ -0,0 +1,17 @@
+# MjbilAlRai_App/management/commands/register_legacy_numbers.py
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from MjbilAlRai_App.numbering import register_legacy_numbers
+
+
+class Command(BaseCommand):
+    help = "ترحيل أرقام الحجز القديمة: تسجيل الأرقام المستخدمة حتى يتخطاها مولد الأرقام (يُشغل مرة بعد الترقية ويمكن تكراره)"
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with transaction.atomic():
+            registered = register_legacy_numbers()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"تم تسجيل {registered} رقم حجز قديم سيتخطاها التسلسل ({elapsed:.1f} ثانية)."))
@@ -0,0 +1,18 @@
+# MjbilAlRai_App/management/commands/reprice_pending.py
+
+import time
+from django.core.management.base import BaseCommand
+from MjbilAlRai_App.tariffs import price_lists, reprice_pending
+
+
+class Command(BaseCommand):
+    help = "إعادة تسعير جميع الحجوزات المعلقة حسب قوائم الأسعار السارية في تواريخها (باستعلام UPDATE واحد)"
+
+    def handle(self, *args, **options):
+        if not price_lists():
+            self.stdout.write(self.style.WARNING("لا توجد قوائم أسعار مفعلة."))
+            return
+        started = time.perf_counter()
+        repriced = reprice_pending()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"تمت إعادة تسعير {repriced} حجز معلق ({elapsed:.1f} ثانية)."))
@@ -0,0 +1,17 @@
+# MjbilAlRai_App/management/commands/reservation_numbers.py
+
+from django.core.management.base import BaseCommand
+from MjbilAlRai_App.numbering import EXHAUSTION_WARNING_RATIO, allocator_status
+
+
+class Command(BaseCommand):
+    help = "عرض حالة استهلاك أرقام الحجز المتاحة"
+
+    def handle(self, *args, **options):
+        status = allocator_status()
+        self.stdout.write(f"الأرقام المستخدمة: {status['used']} من {status['capacity']} ({status['ratio']:.1%})")
+        self.stdout.write(f"الأرقام المتبقية: {status['remaining']}")
+        self.stdout.write(f"عدد الحجوزات: {status['reservations']}")
+        self.stdout.write(f"الأرقام القديمة التي سيتخطاها التسلسل: {status['legacy']}")
+        if status['ratio'] >= EXHAUSTION_WARNING_RATIO:
+            self.stdout.write(self.style.WARNING("تحذير: أرقام الحجز على وشك النفاد."))
@@ -0,0 +1,36 @@
+# MjbilAlRai_App/management/commands/run_export_worker.py
+
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from MjbilAlRai_App.export_jobs import claim_next_job, purge_old_exports, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "تشغيل عامل محلي ينفذ مهام التصدير من قائمة الانتظار في قاعدة البيانات"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="تنفيذ المهام المنتظرة ثم الخروج")
+        parser.add_argument('--sleep', type=float, default=2.0, help="مدة الانتظار (بالثواني) عند فراغ القائمة")
+        parser.add_argument('--stale-minutes', type=int, default=30, help="إعادة المهام العالقة بعد هذه المدة")
+
+    def handle(self, *args, **options):
+        stale_timeout = timedelta(minutes=options['stale_minutes'])
+        requeued = requeue_stale_jobs(stale_timeout)
+        if requeued:
+            self.stdout.write(f"تمت إعادة {requeued} مهمة عالقة إلى قائمة الانتظار.")
+        purge_old_exports()
+
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            job = run_job(job)
+            if job.status == job.STATUS_DONE:
+                self.stdout.write(self.style.SUCCESS(f"المهمة {job.pk}: {job.rows_count} صف -> {job.file_path}"))
+            else:
+                self.stdout.write(self.style.ERROR(f"المهمة {job.pk} فشلت: {job.error}"))
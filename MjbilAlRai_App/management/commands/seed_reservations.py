@@ -0,0 +1,30 @@
+# MjbilAlRai_App/management/commands/seed_reservations.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from MjbilAlRai_App.ledger import rebuild_ledger
+from MjbilAlRai_App.models import Reservation
+from MjbilAlRai_App.seeding import seed_reservations
+
+
+class Command(BaseCommand):
+    help = "توليد حجوزات تجريبية واقعية عبر bulk_create (توزيع منحرف لأرقام الهواتف وحالات وقيم مالية متنوعة)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, help="عدد الحجوزات المطلوب توليدها")
+        parser.add_argument('--seed', type=int, default=None, help="بذرة المولد العشوائي للحصول على بيانات قابلة للتكرار")
+        parser.add_argument('--phones', type=int, default=None, help="عدد أرقام الهواتف المختلفة (افتراضيًا خمس عدد الحجوزات)")
+        parser.add_argument('--clear', action='store_true', help="حذف جميع الحجوزات الحالية قبل التوليد (لا تستخدمه على قاعدة الإنتاج)")
+
+    def handle(self, *args, **options):
+        if options['count'] <= 0:
+            raise CommandError("يجب أن يكون عدد الحجوزات أكبر من صفر.")
+
+        if options['clear']:
+            with transaction.atomic():
+                deleted, _ = Reservation.objects.all().delete()
+                rebuild_ledger()
+            self.stdout.write(f"تم حذف {deleted} سجل.")
+
+        created = seed_reservations(options['count'], seed=options['seed'], phones_count=options['phones'])
+        self.stdout.write(self.style.SUCCESS(f"تم توليد {created} حجز."))
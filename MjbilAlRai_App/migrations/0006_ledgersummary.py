@@ -0,0 +1,66 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:48
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def build_ledger(apps, schema_editor):
+    Reservation = apps.get_model('MjbilAlRai_App', 'Reservation')
+    LedgerSummary = apps.get_model('MjbilAlRai_App', 'LedgerSummary')
+    money = DecimalField(max_digits=20, decimal_places=4)
+    zero = Value(Decimal(0), output_field=money)
+    gross = ExpressionWrapper(Coalesce(F('price_per_unit'), zero) * Coalesce(F('concrete_quantity'), zero), output_field=money)
+    rows = (
+        Reservation.objects.filter(is_confirmed=True)
+        .order_by()
+        .values('status', 'concrete_type')
+        .annotate(
+            total_count=Count('id'),
+            total_gross=Sum(gross),
+            total_discount=Sum(Coalesce(F('discount'), zero)),
+            total_payments=Sum('payments'),
+        )
+    )
+    LedgerSummary.objects.bulk_create([
+        LedgerSummary(
+            status=row['status'],
+            concrete_type=row['concrete_type'],
+            reservations_count=row['total_count'],
+            gross_amount=row['total_gross'] or Decimal(0),
+            discount=row['total_discount'] or Decimal(0),
+            payments=row['total_payments'] or Decimal(0),
+            remaining=(row['total_gross'] or Decimal(0)) - (row['total_discount'] or Decimal(0)) - (row['total_payments'] or Decimal(0)),
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MjbilAlRai_App', '0005_alter_reservation_options_reservation_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('معلق', 'معلق'), ('مقبول', 'مقبول'), ('مكتمل', 'مكتمل'), ('مرفوض', 'مرفوض')], max_length=20, verbose_name='حالة الحجز')),
+                ('concrete_type', models.CharField(choices=[('150', 'عيار 150 كغ'), ('200', 'عيار 200 كغ'), ('250', 'عيار 250 كغ'), ('300', 'عيار 300 كغ'), ('350', 'عيار 350 كغ'), ('400', 'عيار 400 كغ'), ('450', 'عيار 450 كغ'), ('500', 'عيار 500 كغ')], max_length=100, verbose_name='نوع الخرسانة')),
+                ('reservations_count', models.IntegerField(default=0, verbose_name='عدد الحجوزات')),
+                ('gross_amount', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=20, verbose_name='إجمالي التكلفة قبل الخصم')),
+                ('discount', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=20, verbose_name='إجمالي الخصومات')),
+                ('payments', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=20, verbose_name='إجمالي المدفوعات')),
+                ('remaining', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=20, verbose_name='إجمالي الرصيد المتبقي')),
+            ],
+            options={
+                'verbose_name': 'ملخص الدفتر',
+                'verbose_name_plural': 'ملخصات الدفتر',
+                'constraints': [models.UniqueConstraint(fields=('status', 'concrete_type'), name='ledger_status_concrete_type_unique')],
+            },
+        ),
+        migrations.RunPython(build_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MjbilAlRai_App', '0006_ledgersummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True, verbose_name='آخر تعديل'),
+        ),
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(default='reservations', max_length=50, verbose_name='نوع التصدير')),
+                ('export_format', models.CharField(choices=[('xlsx', 'Excel'), ('csv', 'CSV'), ('jsonl', 'JSON Lines')], default='xlsx', max_length=10, verbose_name='صيغة الملف')),
+                ('status', models.CharField(choices=[('queued', 'في قائمة الانتظار'), ('running', 'قيد التنفيذ'), ('done', 'جاهز'), ('failed', 'فشل')], default='queued', max_length=10, verbose_name='الحالة')),
+                ('data_version', models.CharField(blank=True, max_length=100, verbose_name='إصدار البيانات')),
+                ('fingerprint', models.CharField(db_index=True, max_length=64, verbose_name='بصمة التصدير')),
+                ('file_path', models.CharField(blank=True, max_length=500, verbose_name='مسار الملف')),
+                ('rows_count', models.PositiveIntegerField(default=0, verbose_name='عدد الصفوف')),
+                ('error', models.TextField(blank=True, verbose_name='الخطأ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الطلب')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='بدء التنفيذ')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='انتهاء التنفيذ')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='طلب بواسطة')),
+            ],
+            options={
+                'verbose_name': 'مهمة تصدير',
+                'verbose_name_plural': 'مهام التصدير',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='exportjob_status_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MjbilAlRai_App', '0007_exportjob_reservation_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['phone_number', 'reservation_date'], name='res_phone_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['reservation_date', 'id'], name='res_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'reservation_date'], name='res_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['updated_at'], name='res_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('is_approved', False), ('is_confirmed', False), ('is_rejected', False)), fields=['reservation_date'], name='res_pending_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('is_approved', True), ('is_confirmed', False)), fields=['reservation_date'], name='res_approved_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('is_rejected', True)), fields=['reservation_date'], name='res_rejected_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('is_completed', True)), fields=['reservation_date'], name='res_completed_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('is_confirmed', True)), fields=['remaining_balance'], name='res_confirmed_balance_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:55
+
+from django.db import migrations, models
+
+
+# تسلسل Postgres لأرقام الحجز (غير مرتبط بالمعاملات، لذا لا يسبب انتظارًا بين الطلبات المتزامنة)
+def create_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("CREATE SEQUENCE IF NOT EXISTS reservation_number_seq MINVALUE 0 START WITH 0 NO CYCLE")
+
+
+def drop_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP SEQUENCE IF EXISTS reservation_number_seq")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MjbilAlRai_App', '0008_reservation_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='اسم التسلسل')),
+                ('next_value', models.BigIntegerField(default=0, verbose_name='القيمة التالية')),
+            ],
+            options={
+                'verbose_name': 'تسلسل أرقام',
+                'verbose_name_plural': 'تسلسلات الأرقام',
+            },
+        ),
+        migrations.RunPython(create_sequence, drop_sequence),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+OPENING_BATCH_SIZE = 2000
+
+
+# تحويل مجموع الدفعات الحالي لكل حجز إلى دفعة "رصيد افتتاحي" حتى يطابق السجل الحقل المخزن
+def create_opening_balances(apps, schema_editor):
+    Reservation = apps.get_model('MjbilAlRai_App', 'Reservation')
+    Payment = apps.get_model('MjbilAlRai_App', 'Payment')
+    now = django.utils.timezone.now()
+    rows = (
+        Reservation.objects.exclude(payments=0)
+        .values_list('id', 'phone_number', 'payments', 'updated_at')
+        .order_by('id')
+        .iterator(chunk_size=OPENING_BATCH_SIZE)
+    )
+    batch = []
+    for reservation_id, phone_number, amount, updated_at in rows:
+        batch.append(Payment(
+            reservation_id=reservation_id,
+            phone_number=phone_number,
+            amount=amount,
+            method='opening',
+            note='رصيد افتتاحي عند إنشاء سجل الدفعات',
+            created_at=updated_at or now,
+        ))
+        if len(batch) >= OPENING_BATCH_SIZE:
+            Payment.objects.bulk_create(batch)
+            batch = []
+    Payment.objects.bulk_create(batch)
+
+
+def remove_opening_balances(apps, schema_editor):
+    Payment = apps.get_model('MjbilAlRai_App', 'Payment')
+    Payment.objects.filter(method='opening').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MjbilAlRai_App', '0009_numbersequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone_number', models.CharField(max_length=15, verbose_name='رقم الهاتف')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15, verbose_name='المبلغ')),
+                ('method', models.CharField(choices=[('cash', 'نقدًا'), ('transfer', 'حوالة'), ('cheque', 'شيك'), ('adjustment', 'تعديل من المحاسب'), ('opening', 'رصيد افتتاحي')], default='cash', max_length=20, verbose_name='طريقة الدفع')),
+                ('note', models.CharField(blank=True, default='', max_length=255, verbose_name='ملاحظة')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='تاريخ التسجيل')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='سجلها')),
+                ('reservation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payment_entries', to='MjbilAlRai_App.reservation', verbose_name='الحجز')),
+            ],
+            options={
+                'verbose_name': 'دفعة',
+                'verbose_name_plural': 'الدفعات',
+                'indexes': [models.Index(fields=['reservation', 'created_at'], name='payment_res_created_idx'), models.Index(fields=['phone_number', 'created_at'], name='payment_phone_created_idx')],
+            },
+        ),
+        migrations.RunPython(create_opening_balances, remove_opening_balances),
+    ]
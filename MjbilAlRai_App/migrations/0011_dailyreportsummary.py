@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:06
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MjbilAlRai_App', '0010_payment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyReportSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='اليوم')),
+                ('concrete_type', models.CharField(choices=[('150', 'عيار 150 كغ'), ('200', 'عيار 200 كغ'), ('250', 'عيار 250 كغ'), ('300', 'عيار 300 كغ'), ('350', 'عيار 350 كغ'), ('400', 'عيار 400 كغ'), ('450', 'عيار 450 كغ'), ('500', 'عيار 500 كغ')], max_length=100, verbose_name='نوع الخرسانة')),
+                ('status', models.CharField(choices=[('معلق', 'معلق'), ('مقبول', 'مقبول'), ('مكتمل', 'مكتمل'), ('مرفوض', 'مرفوض')], max_length=20, verbose_name='حالة الحجز')),
+                ('reservations_count', models.IntegerField(default=0, verbose_name='عدد الحجوزات')),
+                ('volume', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14, verbose_name='الكمية (متر مكعب)')),
+                ('gross_amount', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=20, verbose_name='إجمالي التكلفة قبل الخصم')),
+                ('discount', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=20, verbose_name='إجمالي الخصومات')),
+                ('payments', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=20, verbose_name='إجمالي المدفوعات')),
+                ('remaining', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=20, verbose_name='إجمالي الرصيد المتبقي')),
+                ('refreshed_at', models.DateTimeField(verbose_name='تاريخ آخر تحديث')),
+            ],
+            options={
+                'verbose_name': 'ملخص تقرير يومي',
+                'verbose_name_plural': 'ملخصات التقارير اليومية',
+                'constraints': [models.UniqueConstraint(fields=('day', 'concrete_type', 'status'), name='daily_report_unique')],
+            },
+        ),
+    ]
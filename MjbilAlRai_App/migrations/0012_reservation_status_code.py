@@ -0,0 +1,52 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:40
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+# أسماء الحالات النصية السابقة لكل رمز (للتراجع عن الترحيل)
+LEGACY_LABELS = {0: 'معلق', 1: 'مقبول', 2: 'معلق', 3: 'مكتمل', 4: 'مرفوض'}
+
+
+# نفس قواعد models.derive_status كتعبير SQL (تحديث واحد لكامل الجدول)
+def backfill_status(apps, schema_editor):
+    Reservation = apps.get_model('MjbilAlRai_App', 'Reservation')
+    # الحجز المكتمل مؤكد دائمًا في النظام الجديد
+    Reservation.objects.filter(is_completed=True, is_confirmed=False).update(is_confirmed=True)
+    Reservation.objects.update(status_code=Case(
+        When(is_rejected=True, then=Value(4)),
+        When(is_completed=True, then=Value(3)),
+        When(is_confirmed=True, then=Value(2)),
+        When(is_approved=True, then=Value(1)),
+        default=Value(0),
+    ))
+
+
+def restore_legacy_status(apps, schema_editor):
+    Reservation = apps.get_model('MjbilAlRai_App', 'Reservation')
+    for code, label in LEGACY_LABELS.items():
+        Reservation.objects.filter(status_code=code).update(status=label)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MjbilAlRai_App', '0011_dailyreportsummary'),
+    ]
+
+    # عمود الحالة الرقمي يُملأ هنا، واستبدال العمود النصي في 0013 (معاملة منفصلة بعد تحديث كامل الجدول)
+    operations = [
+        # فهارس الحقول المنطقية لم تعد مستخدمة: جميع الفلاتر على عمود الحالة
+        migrations.RemoveIndex(model_name='reservation', name='res_status_date_idx'),
+        migrations.RemoveIndex(model_name='reservation', name='res_pending_date_idx'),
+        migrations.RemoveIndex(model_name='reservation', name='res_approved_date_idx'),
+        migrations.RemoveIndex(model_name='reservation', name='res_rejected_date_idx'),
+        migrations.RemoveIndex(model_name='reservation', name='res_completed_date_idx'),
+        migrations.RemoveIndex(model_name='reservation', name='res_confirmed_balance_idx'),
+
+        migrations.AddField(
+            model_name='reservation',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_status, restore_legacy_status),
+    ]
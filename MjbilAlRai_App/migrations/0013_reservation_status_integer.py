@@ -0,0 +1,133 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:41
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+STATUS_CHOICES = [(0, 'معلق'), (1, 'مقبول'), (2, 'مؤكد'), (3, 'مكتمل'), (4, 'مرفوض')]
+CONFIRMED_STATUSES = (2, 3)
+
+
+# نسخة ثابتة من تعبيرات aggregates.py كما كانت عند كتابة الترحيل (لا يستورد الترحيل كود التطبيق الحالي)
+def _money_expressions():
+    money = DecimalField(max_digits=20, decimal_places=2)
+    zero = Value(Decimal(0), output_field=money)
+    gross = ExpressionWrapper(Coalesce(F('price_per_unit'), zero) * Coalesce(F('concrete_quantity'), zero), output_field=money)
+    remaining = ExpressionWrapper(gross - Coalesce(F('discount'), zero) - Coalesce(F('payments'), zero), output_field=money)
+    return gross, remaining
+
+
+def _summary_groups(queryset, fields):
+    gross_amount, remaining_amount = _money_expressions()
+    return (
+        queryset.order_by()
+        .values(*fields)
+        .annotate(
+            total_count=Count('id'),
+            total_volume=Sum('concrete_quantity'),
+            total_gross=Sum(gross_amount),
+            total_discount=Sum('discount'),
+            total_payments=Sum('payments'),
+            total_remaining=Sum(remaining_amount),
+        )
+    )
+
+
+# صفوف الملخصات القديمة مفاتيحها أسماء الحالات النصية ولا يمكن تحويلها (الحجز المؤكد كان "معلق")
+def clear_summaries(apps, schema_editor):
+    apps.get_model('MjbilAlRai_App', 'LedgerSummary').objects.all().delete()
+    apps.get_model('MjbilAlRai_App', 'DailyReportSummary').objects.all().delete()
+
+
+# ملخص الدفتر والملخص اليومي مفاتيحهما الحالة، لذلك يُعاد بناؤهما بالرموز الجديدة
+def rebuild_summaries(apps, schema_editor):
+    Reservation = apps.get_model('MjbilAlRai_App', 'Reservation')
+    LedgerSummary = apps.get_model('MjbilAlRai_App', 'LedgerSummary')
+    DailyReportSummary = apps.get_model('MjbilAlRai_App', 'DailyReportSummary')
+
+    LedgerSummary.objects.all().delete()
+    LedgerSummary.objects.bulk_create([
+        LedgerSummary(
+            status=row['status'],
+            concrete_type=row['concrete_type'],
+            reservations_count=row['total_count'],
+            gross_amount=row['total_gross'] or Decimal(0),
+            discount=row['total_discount'] or Decimal(0),
+            payments=row['total_payments'] or Decimal(0),
+            remaining=row['total_remaining'] or Decimal(0),
+        )
+        for row in _summary_groups(Reservation.objects.filter(status__in=CONFIRMED_STATUSES), ('status', 'concrete_type'))
+    ])
+
+    refreshed_at = timezone.now()
+    DailyReportSummary.objects.all().delete()
+    DailyReportSummary.objects.bulk_create([
+        DailyReportSummary(
+            day=row['reservation_date'],
+            concrete_type=row['concrete_type'],
+            status=row['status'],
+            reservations_count=row['total_count'],
+            volume=row['total_volume'] or Decimal(0),
+            gross_amount=row['total_gross'] or Decimal(0),
+            discount=row['total_discount'] or Decimal(0),
+            payments=row['total_payments'] or Decimal(0),
+            remaining=row['total_remaining'] or Decimal(0),
+            refreshed_at=refreshed_at,
+        )
+        for row in _summary_groups(Reservation.objects.filter(reservation_date__isnull=False), ('reservation_date', 'concrete_type', 'status'))
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MjbilAlRai_App', '0012_reservation_status_code'),
+    ]
+
+    operations = [
+        migrations.RemoveField(model_name='reservation', name='status'),
+        migrations.RenameField(model_name='reservation', old_name='status_code', new_name='status'),
+        migrations.AlterField(
+            model_name='reservation',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=0, verbose_name='حالة الحجز'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'reservation_date', 'id'], name='res_status_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=Q(('status__in', CONFIRMED_STATUSES)), fields=['remaining_balance'], name='res_confirmed_balance_idx'),
+        ),
+
+        # الملخصات: استبدال عمود الحالة النصي بالرمز ثم إعادة البناء
+        migrations.RemoveConstraint(model_name='ledgersummary', name='ledger_status_concrete_type_unique'),
+        migrations.RemoveConstraint(model_name='dailyreportsummary', name='daily_report_unique'),
+        migrations.RunPython(clear_summaries, migrations.RunPython.noop),
+        migrations.RemoveField(model_name='ledgersummary', name='status'),
+        migrations.RemoveField(model_name='dailyreportsummary', name='status'),
+        migrations.AddField(
+            model_name='ledgersummary',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=0, verbose_name='حالة الحجز'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='dailyreportsummary',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=0, verbose_name='حالة الحجز'),
+            preserve_default=False,
+        ),
+        migrations.AddConstraint(
+            model_name='ledgersummary',
+            constraint=models.UniqueConstraint(fields=('status', 'concrete_type'), name='ledger_status_concrete_type_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyreportsummary',
+            constraint=models.UniqueConstraint(fields=('day', 'concrete_type', 'status'), name='daily_report_unique'),
+        ),
+        migrations.RunPython(rebuild_summaries, clear_summaries),
+    ]
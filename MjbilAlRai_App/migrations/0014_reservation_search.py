@@ -0,0 +1,48 @@
+# Generated by Django 5.1.1 on 2026-10-18 15:10
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# فهارس GIN للبحث في الحجوزات (Postgres فقط): متجه البحث النصي، و trigram لكل حقل نصي ولرقم الهاتف
+# في SQLite يُستخدم جدول FTS5 بدلاً منها (ينشئه search.install_sqlite_search بعد كل migrate)
+SEARCH_FIELDS = ('customer_name', 'carpenter_name', 'site_location')
+TRIGRAM_FIELDS = SEARCH_FIELDS + ('phone_number',)
+
+
+def search_indexes():
+    from django.contrib.postgres.indexes import GinIndex, OpClass
+    from django.contrib.postgres.search import SearchVector
+
+    # يجب أن يطابق التعبير search.search_vector() حرفيًا حتى يستخدمه Postgres
+    indexes = [GinIndex(SearchVector(*SEARCH_FIELDS, config='simple'), name='res_search_vector_idx')]
+    for field in TRIGRAM_FIELDS:
+        indexes.append(GinIndex(OpClass(field, name='gin_trgm_ops'), name=f'res_{field}_trgm_idx'))
+    return indexes
+
+
+def add_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Reservation = apps.get_model('MjbilAlRai_App', 'Reservation')
+    for index in search_indexes():
+        schema_editor.add_index(Reservation, index)
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Reservation = apps.get_model('MjbilAlRai_App', 'Reservation')
+    for index in search_indexes():
+        schema_editor.remove_index(Reservation, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MjbilAlRai_App', '0013_reservation_status_integer'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MjbilAlRai_App', '0014_reservation_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceList',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='اسم القائمة')),
+                ('valid_from', models.DateField(verbose_name='سارية من')),
+                ('valid_to', models.DateField(blank=True, null=True, verbose_name='سارية حتى')),
+                ('is_active', models.BooleanField(default=True, verbose_name='مفعلة')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تعديل')),
+            ],
+            options={
+                'verbose_name': 'قائمة أسعار',
+                'verbose_name_plural': 'قوائم الأسعار',
+                'ordering': ['-valid_from', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DistanceSurcharge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_distance', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='من مسافة (كم)')),
+                ('surcharge_per_unit', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='الإضافة على سعر الوحدة (دولار أمريكي)')),
+                ('price_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='surcharges', to='MjbilAlRai_App.pricelist', verbose_name='قائمة الأسعار')),
+            ],
+            options={
+                'verbose_name': 'شريحة مسافة',
+                'verbose_name_plural': 'شرائح المسافات',
+                'constraints': [models.UniqueConstraint(fields=('price_list', 'from_distance'), name='surcharge_list_distance_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceListRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('concrete_type', models.CharField(choices=[('150', 'عيار 150 كغ'), ('200', 'عيار 200 كغ'), ('250', 'عيار 250 كغ'), ('300', 'عيار 300 كغ'), ('350', 'عيار 350 كغ'), ('400', 'عيار 400 كغ'), ('450', 'عيار 450 كغ'), ('500', 'عيار 500 كغ')], max_length=100, verbose_name='نوع الخرسانة')),
+                ('price_per_unit', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='السعر للوحدة (دولار أمريكي)')),
+                ('price_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rates', to='MjbilAlRai_App.pricelist', verbose_name='قائمة الأسعار')),
+            ],
+            options={
+                'verbose_name': 'سعر عيار',
+                'verbose_name_plural': 'أسعار العيارات',
+                'constraints': [models.UniqueConstraint(fields=('price_list', 'concrete_type'), name='price_rate_list_type_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MjbilAlRai_App', '0015_price_lists'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Truck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='الشاحنة (الاسم أو رقم اللوحة)')),
+                ('capacity', models.DecimalField(decimal_places=2, max_digits=6, verbose_name='السعة (متر مكعب)')),
+                ('is_active', models.BooleanField(default=True, verbose_name='في الخدمة')),
+            ],
+            options={
+                'verbose_name': 'شاحنة خلاطة',
+                'verbose_name_plural': 'الشاحنات الخلاطة',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DeliveryTrip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='يوم التسليم')),
+                ('load_number', models.PositiveSmallIntegerField(verbose_name='رقم الحمولة')),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=6, verbose_name='الكمية (متر مكعب)')),
+                ('departure', models.TimeField(verbose_name='الانطلاق من المجبل')),
+                ('arrival', models.TimeField(verbose_name='الوصول إلى الموقع')),
+                ('return_time', models.TimeField(verbose_name='العودة إلى المجبل')),
+                ('reservation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_trips', to='MjbilAlRai_App.reservation', verbose_name='الحجز')),
+                ('truck', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trips', to='MjbilAlRai_App.truck', verbose_name='الشاحنة')),
+            ],
+            options={
+                'verbose_name': 'رحلة تسليم',
+                'verbose_name_plural': 'رحلات التسليم',
+                'indexes': [models.Index(fields=['day', 'truck', 'departure'], name='trip_day_truck_departure_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MjbilAlRai_App', '0016_delivery_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='pour_date',
+            field=models.DateField(blank=True, null=True, verbose_name='تاريخ الصب'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['pour_date', 'status'], name='res_pour_date_status_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MjbilAlRai_App', '0017_reservation_pour_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LegacyNumberIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence_index', models.BigIntegerField(unique=True, verbose_name='فهرس التسلسل')),
+            ],
+            options={
+                'verbose_name': 'رقم حجز قديم',
+                'verbose_name_plural': 'أرقام الحجز القديمة',
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.1 on 2026-10-18 15:10
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+# إعادة بناء الملخص اليومي تحت يوم الصب (أو تاريخ الحجز إذا لم يُحدد يوم الصب) بدلاً من تاريخ الحجز
+def rebuild_daily_summary(apps, schema_editor):
+    Reservation = apps.get_model('MjbilAlRai_App', 'Reservation')
+    DailyReportSummary = apps.get_model('MjbilAlRai_App', 'DailyReportSummary')
+    money = DecimalField(max_digits=20, decimal_places=2)
+    zero = Value(Decimal(0), output_field=money)
+    gross = ExpressionWrapper(Coalesce(F('price_per_unit'), zero) * Coalesce(F('concrete_quantity'), zero), output_field=money)
+    remaining = ExpressionWrapper(gross - Coalesce(F('discount'), zero) - Coalesce(F('payments'), zero), output_field=money)
+    rows = (
+        Reservation.objects.order_by()
+        .annotate(report_day=Coalesce(F('pour_date'), F('reservation_date')))
+        .filter(report_day__isnull=False)
+        .values('report_day', 'concrete_type', 'status')
+        .annotate(
+            total_count=Count('id'),
+            total_volume=Sum('concrete_quantity'),
+            total_gross=Sum(gross),
+            total_discount=Sum('discount'),
+            total_payments=Sum('payments'),
+            total_remaining=Sum(remaining),
+        )
+    )
+    refreshed_at = timezone.now()
+    DailyReportSummary.objects.all().delete()
+    DailyReportSummary.objects.bulk_create([
+        DailyReportSummary(
+            day=row['report_day'],
+            concrete_type=row['concrete_type'],
+            status=row['status'],
+            reservations_count=row['total_count'],
+            volume=row['total_volume'] or Decimal(0),
+            gross_amount=row['total_gross'] or Decimal(0),
+            discount=row['total_discount'] or Decimal(0),
+            payments=row['total_payments'] or Decimal(0),
+            remaining=row['total_remaining'] or Decimal(0),
+            refreshed_at=refreshed_at,
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MjbilAlRai_App', '0018_legacy_number_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyreportsummary',
+            name='day',
+            field=models.DateField(verbose_name='يوم الصب'),
+        ),
+        migrations.RunPython(rebuild_daily_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-18 15:30
+
+from django.db import migrations, models
+
+
+# المهام المكررة لنفس الصيغة والبصمة (قبل القيد): الأحدث تبقى، والأقدم تُعلّم كفاشلة حتى لا يُعاد استخدامها
+def fail_duplicate_jobs(apps, schema_editor):
+    ExportJob = apps.get_model('MjbilAlRai_App', 'ExportJob')
+    reusable = ExportJob.objects.exclude(status='failed').exclude(status='done', file_path='')
+    seen = set()
+    duplicates = []
+    for job_id, export_format, fingerprint in reusable.order_by('-created_at', '-id').values_list('id', 'export_format', 'fingerprint'):
+        if (export_format, fingerprint) in seen:
+            duplicates.append(job_id)
+        seen.add((export_format, fingerprint))
+    ExportJob.objects.filter(id__in=duplicates).update(status='failed', error='مهمة مكررة لنفس البيانات')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MjbilAlRai_App', '0019_daily_report_pour_day'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='exportjob',
+            constraint=models.UniqueConstraint(condition=models.Q(models.Q(('status', 'failed'), _negated=True), models.Q(('file_path', ''), ('status', 'done'), _negated=True)), fields=('export_format', 'fingerprint'), name='exportjob_reusable_unique'),
+        ),
+    ]
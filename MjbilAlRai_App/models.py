@@ -1,11 +1,71 @@
 # MjbilAlRai_App/models.py
 
-from django.db import models
-import uuid
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q
 from datetime import date
+from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
+from django.utils import timezone
 from decimal import Decimal
 
+# عدد محاولات تجاوز أرقام الحجز القديمة المتصادمة قبل إظهار الخطأ
+LEGACY_NUMBER_RETRIES = 10
+
+
+# رموز حالة الحجز (عمود واحد مفهرس هو مصدر الحالة لجميع الصفحات والفلاتر)
+STATUS_PENDING = 0
+STATUS_APPROVED = 1
+STATUS_CONFIRMED = 2
+STATUS_COMPLETED = 3
+STATUS_REJECTED = 4
+
+# الحالات التي تدخل في ملخص الدفتر وصفحات المحاسب
+CONFIRMED_STATUSES = (STATUS_CONFIRMED, STATUS_COMPLETED)
+
+# الانتقالات المسموحة بين الحالات (الحجز المؤكد أو المكتمل لا يعود إلى الانتظار أو الرفض)
+# الاكتمال من التأكيد فقط: التأكيد يسجل الكميات النهائية بعد الصب، فلا يكتمل حجز مقبول قبل تأكيده
+STATUS_TRANSITIONS = {
+    STATUS_PENDING: {STATUS_APPROVED, STATUS_REJECTED},
+    STATUS_APPROVED: {STATUS_PENDING, STATUS_REJECTED, STATUS_CONFIRMED},
+    STATUS_REJECTED: {STATUS_PENDING, STATUS_APPROVED},
+    STATUS_CONFIRMED: {STATUS_COMPLETED},
+    STATUS_COMPLETED: {STATUS_CONFIRMED},
+}
+
+
+class InvalidStatusTransition(ValueError):
+    pass
+
+
+# اشتقاق حالة الحجز من حقول الموافقة والرفض والتأكيد والاكتمال
+# (نفس القواعد مطبقة في SQL عند ترحيل البيانات في 0012_reservation_status_code)
+# الرفض أولًا حتى يفشل رفض حجز مؤكد عند التحقق من الانتقال بدلاً من تجاهله
+def derive_status(is_approved, is_rejected, is_confirmed, is_completed):
+    if is_rejected:
+        return STATUS_REJECTED
+    if is_completed:
+        return STATUS_COMPLETED
+    if is_confirmed:
+        return STATUS_CONFIRMED
+    if is_approved:
+        return STATUS_APPROVED
+    return STATUS_PENDING
+
+
+def check_status_transition(old, new):
+    if old is not None and old != new and new not in STATUS_TRANSITIONS.get(old, ()):
+        labels = dict(Reservation.STATUS_CHOICES)
+        raise InvalidStatusTransition(f"لا يمكن تغيير حالة الحجز من '{labels.get(old, old)}' إلى '{labels.get(new, new)}'.")
+
+
+# الحقول التي تُحسب منها الحالة المخزنة للحجز (مساهمة الدفتر، الحالة، مفاتيح البحث)
+STORED_STATE_FIELDS = (
+    'status', 'concrete_type', 'price_per_unit', 'concrete_quantity', 'discount', 'payments',
+    'phone_number', 'reservation_number', 'pour_date', 'reservation_date',
+)
+
+
 class Reservation(models.Model):
     CONCRETE_CHOICES = [
         ('150', 'عيار 150 كغ'),
@@ -18,11 +78,18 @@ class Reservation(models.Model):
         ('500', 'عيار 500 كغ'),
     ]
 
+    STATUS_PENDING = STATUS_PENDING
+    STATUS_APPROVED = STATUS_APPROVED
+    STATUS_CONFIRMED = STATUS_CONFIRMED
+    STATUS_COMPLETED = STATUS_COMPLETED
+    STATUS_REJECTED = STATUS_REJECTED
+
     STATUS_CHOICES = [
-        ('معلق', 'معلق'),
-        ('مقبول', 'مقبول'),
-        ('مكتمل', 'مكتمل'),
-        ('مرفوض', 'مرفوض'),
+        (STATUS_PENDING, 'معلق'),
+        (STATUS_APPROVED, 'مقبول'),
+        (STATUS_CONFIRMED, 'مؤكد'),
+        (STATUS_COMPLETED, 'مكتمل'),
+        (STATUS_REJECTED, 'مرفوض'),
     ]
 
     customer_name = models.CharField(max_length=100, verbose_name="اسم العميل")
@@ -45,6 +112,8 @@ class Reservation(models.Model):
     reservation_date = models.DateField(blank=True, null=True, verbose_name="تاريخ الحجز")
     approval_date = models.DateField(blank=True, null=True, verbose_name="تاريخ الموافقة")
     approval_message = models.TextField(blank=True, null=True, verbose_name="رسالة الموافقة")
+    # يوم الصب المتفق عليه مع العميل (يُحدد عند القبول ويُبنى عليه جدول التسليم)
+    pour_date = models.DateField(blank=True, null=True, verbose_name="تاريخ الصب")
 
     # الحقول المالية الجديدة
     price_per_unit = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, verbose_name="السعر للوحدة (دولار أمريكي)")
@@ -61,7 +130,10 @@ class Reservation(models.Model):
     is_completed = models.BooleanField(default=False, verbose_name="الحجز مكتمل")
 
     # حقل الحالة
-    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='معلق', verbose_name="حالة الحجز")
+    status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="حالة الحجز")
+
+    # وقت آخر تعديل (يُستخدم لمعرفة تغيّر البيانات وإبطال الملفات المخزنة مؤقتًا)
+    updated_at = models.DateTimeField(auto_now=True, null=True, verbose_name="آخر تعديل")
 
     class Meta:
         permissions = [
@@ -69,20 +141,60 @@ class Reservation(models.Model):
             ("can_confirm_reservations", "يمكنه تأكيد الحجوزات"),
             ("can_manage_accountant", "يمكنه إدارة صفحات المحاسب"),
         ]
+        # فهارس لأنماط الاستعلام المتكررة في الصفحات (البحث بالهاتف، فلاتر الحالة، لوحة المحاسب)
+        indexes = [
+            models.Index(fields=['phone_number', 'reservation_date'], name='res_phone_date_idx'),
+            models.Index(fields=['reservation_date', 'id'], name='res_date_id_idx'),
+            models.Index(fields=['status', 'reservation_date', 'id'], name='res_status_date_id_idx'),
+            models.Index(fields=['updated_at'], name='res_updated_at_idx'),
+            models.Index(fields=['pour_date', 'status'], name='res_pour_date_status_idx'),
+            models.Index(fields=['remaining_balance'], condition=Q(status__in=CONFIRMED_STATUSES), name='res_confirmed_balance_idx'),
+        ]
+
+    # التحقق من انتقال الحالة في النماذج وصفحة الإدارة (نفس التحقق في save() ولكن كخطأ نموذج)
+    def clean(self):
+        if self._state.adding:
+            return
+        status = derive_status(self.is_approved, self.is_rejected, self.is_confirmed or self.is_completed, self.is_completed)
+        try:
+            check_status_transition(getattr(self, '_loaded_status', None), status)
+        except InvalidStatusTransition as e:
+            raise ValidationError(str(e))
 
     def save(self, *args, **kwargs):
-        # توليد رقم الحجز الفريد إذا لم يكن موجودًا
-        if not self.reservation_number:
-            while True:
-                reservation_number = str(uuid.uuid4().int)[:6]
-                if not reservation_number.startswith('0') and not Reservation.objects.filter(reservation_number=reservation_number).exists():
-                    self.reservation_number = reservation_number
-                    break
+        from .numbering import allocate_reservation_number
+
+        # توليد رقم الحجز الفريد إذا لم يكن موجودًا (دون استعلامات تحقق متكررة)
+        generated_number = not self.reservation_number
+        if generated_number:
+            self.reservation_number = allocate_reservation_number()
 
         # تأكد من أنه لا يمكن أن يكون كلا الحقلين 'تمت الموافقة' و 'تم الرفض' True في نفس الوقت
         if self.is_approved and self.is_rejected:
             raise ValueError("لا يمكن أن يكون كلا الحقلين 'تمت الموافقة' و 'تم الرفض' True في نفس الوقت.")
 
+        # الحقول المشتقة والحالة، مع التحقق من أن انتقال الحالة مسموح
+        self.apply_derived_fields()
+        if not self._state.adding:
+            self.ensure_stored_state()
+            check_status_transition(getattr(self, '_loaded_status', None), self.status)
+
+        # الحفظ وتحديث ملخص الدفتر (عبر إشارة post_save) في معاملة واحدة
+        for attempt in range(LEGACY_NUMBER_RETRIES):
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                self._loaded_status = self.status
+                return
+            except IntegrityError:
+                # تصادم مع رقم قديم لم يُرحّل بعد (manage.py register_legacy_numbers): ننتقل إلى الرقم التالي
+                if not generated_number or not Reservation.objects.filter(reservation_number=self.reservation_number).exists():
+                    raise
+                self.reservation_number = allocate_reservation_number()
+        raise IntegrityError("تعذر توليد رقم حجز فريد.")
+
+    # الحقول المشتقة من بقية القيم (تُستدعى في save() وقبل الإدخال الجماعي الذي لا يستدعي save())
+    def apply_derived_fields(self):
         # تعيين تاريخ الحجز إلى اليوم إذا لم يكن محددًا
         if not self.reservation_date:
             self.reservation_date = date.today()
@@ -96,6 +208,10 @@ class Reservation(models.Model):
             # المتبقي = التكلفة الإجمالية - الخصم - المدفوعات
             self.remaining_balance = self.total_cost - (self.discount or Decimal(0)) - self.payments
 
+        # الحجز المكتمل مؤكد دائمًا (حتى تبقى الحالات المؤكدة هي نفسها الحجوزات في ملخص الدفتر)
+        if self.is_completed:
+            self.is_confirmed = True
+
         # إذا كان الحجز مكتملًا ولم يتم تحديد تاريخ اكتمال الحجز، حدد التاريخ إلى اليوم الحالي
         if self.is_completed and not self.completion_date:
             self.completion_date = date.today()
@@ -105,16 +221,339 @@ class Reservation(models.Model):
             self.completion_date = None
 
         # تحديث حالة الحجز بناءً على الحقول الحالية
-        if self.is_approved and not self.is_rejected and not self.is_confirmed and not self.is_completed:
-            self.status = 'مقبول'
-        elif self.is_completed:
-            self.status = 'مكتمل'
-        elif self.is_rejected:
-            self.status = 'مرفوض'
-        else:
-            self.status = 'معلق'
+        self.status = derive_status(self.is_approved, self.is_rejected, self.is_confirmed, self.is_completed)
 
-        super().save(*args, **kwargs)
+    # الحجز المسعّر الذي سُدد مبلغه بالكامل: يكتمل عند التأكيد أو عند تسجيل آخر دفعة
+    # (نفس الشرط في SQL للتأكيد الجماعي: bulk.FULLY_PAID)
+    def is_fully_paid(self):
+        return self.remaining_balance is not None and self.remaining_balance <= 0
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # عند التحميل الجزئي (only/defer) تُقرأ الحالة المخزنة من قاعدة البيانات عند الحفظ فقط
+        # (حسابها هنا سيحمّل الحقول المؤجلة واحدًا تلو الآخر لكل صف)
+        if instance.get_deferred_fields().isdisjoint(STORED_STATE_FIELDS):
+            instance._remember_stored_state()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # القيم المخزنة تغيرت، لذلك يجب تحديث الحالة المحفوظة المستخدمة لحساب الفروقات
+        # (تحميل حقل مؤجل واحد لا يغير بقية القيم، فلا تُعاد قراءة الحالة المحفوظة)
+        if fields is None:
+            self._remember_stored_state()
+
+    # حجز محمّل جزئيًا: قراءة الحالة المخزنة قبل تغييره أو حذفه (استعلام واحد بدلاً من حقل مؤجل لكل قيمة)
+    def ensure_stored_state(self):
+        if not hasattr(self, '_ledger_state'):
+            stored = type(self)._base_manager.filter(pk=self.pk).values(*STORED_STATE_FIELDS).first() or {}
+            self._remember_stored_state(Reservation(**stored))
+
+    # الحالة المخزنة في قاعدة البيانات التي تُحسب منها الفروقات عند الحفظ (إشارات signals.py)
+    def _remember_stored_state(self, stored=None):
+        stored = stored or self
+        # الاحتفاظ بمساهمة الحجز في ملخص الدفتر كما هي في قاعدة البيانات لحساب الفرق عند الحفظ
+        self._ledger_state = stored.ledger_contribution()
+        # ومساهمته في الملخص اليومي للتقارير
+        self._report_state = stored.report_contribution()
+        # الحالة المخزنة للتحقق من الانتقال عند الحفظ
+        self._loaded_status = stored.__dict__.get('status')
+        # رقم الهاتف ورقم الحجز المخزنان لإبطال نتائج البحث القديمة عند تغييرهما
+        self._lookup_state = (stored.__dict__.get('phone_number'), stored.__dict__.get('reservation_number'))
+
+    # مساهمة الحجز في ملخص الدفتر (للحجوزات المؤكدة فقط)
+    def ledger_contribution(self):
+        if self.status not in CONFIRMED_STATUSES:
+            return None
+        gross_amount = (self.price_per_unit or Decimal(0)) * (self.concrete_quantity or Decimal(0))
+        discount = self.discount or Decimal(0)
+        payments = self.payments or Decimal(0)
+        return (self.status, self.concrete_type), {
+            'reservations_count': 1,
+            'gross_amount': gross_amount,
+            'discount': discount,
+            'payments': payments,
+            'remaining': gross_amount - discount - payments,
+        }
+
+    # مساهمة الحجز في الملخص اليومي للتقارير تحت (يوم الصب، نوع الخرسانة، الحالة)
+    # الحجز الذي لم يُحدد يوم صبه بعد يُحسب في تاريخ الحجز (نفس reporting.report_day_expression)
+    def report_contribution(self):
+        date_field = self._meta.get_field('pour_date')
+        day = date_field.to_python(self.pour_date) or date_field.to_python(self.reservation_date)
+        if day is None:
+            return None
+        quantity = self.concrete_quantity or Decimal(0)
+        gross_amount = (self.price_per_unit or Decimal(0)) * quantity
+        discount = self.discount or Decimal(0)
+        payments = self.payments or Decimal(0)
+        return (day, self.concrete_type, self.status), {
+            'reservations_count': 1,
+            'volume': quantity,
+            'gross_amount': gross_amount,
+            'discount': discount,
+            'payments': payments,
+            'remaining': gross_amount - discount - payments,
+        }
 
     def __str__(self):
         return f"{self.customer_name} - {self.reservation_number}"
+
+
+# سجل الدفعات (إضافة فقط): كل دفعة أو تعديل صف مستقل، وحقل Reservation.payments مجموعها المخزن
+class Payment(models.Model):
+    METHOD_CASH = 'cash'
+    METHOD_TRANSFER = 'transfer'
+    METHOD_CHEQUE = 'cheque'
+    METHOD_ADJUSTMENT = 'adjustment'
+    METHOD_OPENING = 'opening'
+
+    METHOD_CHOICES = [
+        (METHOD_CASH, 'نقدًا'),
+        (METHOD_TRANSFER, 'حوالة'),
+        (METHOD_CHEQUE, 'شيك'),
+        (METHOD_ADJUSTMENT, 'تعديل من المحاسب'),
+        (METHOD_OPENING, 'رصيد افتتاحي'),
+    ]
+
+    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, related_name='payment_entries', verbose_name="الحجز")
+    # نسخة من رقم هاتف الحجز لجلب كشف حساب العميل باستعلام واحد دون ربط الجداول
+    phone_number = models.CharField(max_length=15, verbose_name="رقم الهاتف")
+    amount = models.DecimalField(max_digits=15, decimal_places=2, verbose_name="المبلغ")
+    method = models.CharField(max_length=20, choices=METHOD_CHOICES, default=METHOD_CASH, verbose_name="طريقة الدفع")
+    note = models.CharField(max_length=255, blank=True, default='', verbose_name="ملاحظة")
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="سجلها")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="تاريخ التسجيل")
+
+    class Meta:
+        verbose_name = "دفعة"
+        verbose_name_plural = "الدفعات"
+        indexes = [
+            models.Index(fields=['reservation', 'created_at'], name='payment_res_created_idx'),
+            models.Index(fields=['phone_number', 'created_at'], name='payment_phone_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # السجل للإضافة فقط: التصحيح يتم بدفعة تعديل جديدة
+        if not self._state.adding:
+            raise ValueError("لا يمكن تعديل دفعة مسجلة، يجب إضافة دفعة تعديل بدلاً من ذلك.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.reservation_id} - {self.amount}"
+
+
+# عداد تسلسلي يُستخدم لتوليد أرقام الحجز على قواعد البيانات التي لا تدعم SEQUENCE (مثل SQLite)
+class NumberSequence(models.Model):
+    name = models.CharField(max_length=50, unique=True, verbose_name="اسم التسلسل")
+    next_value = models.BigIntegerField(default=0, verbose_name="القيمة التالية")
+
+    class Meta:
+        verbose_name = "تسلسل أرقام"
+        verbose_name_plural = "تسلسلات الأرقام"
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
+# فهارس التسلسل التي تقابل أرقام حجز قديمة (من قبل نظام الترقيم الحالي) ويجب تخطيها عند التوليد
+class LegacyNumberIndex(models.Model):
+    sequence_index = models.BigIntegerField(unique=True, verbose_name="فهرس التسلسل")
+
+    class Meta:
+        verbose_name = "رقم حجز قديم"
+        verbose_name_plural = "أرقام الحجز القديمة"
+
+    def __str__(self):
+        return str(self.sequence_index)
+
+
+# ملخص الدفتر: إجماليات تراكمية للحجوزات المؤكدة مقسمة حسب الحالة ونوع الخرسانة
+class LedgerSummary(models.Model):
+    status = models.PositiveSmallIntegerField(choices=Reservation.STATUS_CHOICES, verbose_name="حالة الحجز")
+    concrete_type = models.CharField(max_length=100, choices=Reservation.CONCRETE_CHOICES, verbose_name="نوع الخرسانة")
+    reservations_count = models.IntegerField(default=0, verbose_name="عدد الحجوزات")
+    gross_amount = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal(0), verbose_name="إجمالي التكلفة قبل الخصم")
+    discount = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal(0), verbose_name="إجمالي الخصومات")
+    payments = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal(0), verbose_name="إجمالي المدفوعات")
+    remaining = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal(0), verbose_name="إجمالي الرصيد المتبقي")
+
+    class Meta:
+        verbose_name = "ملخص الدفتر"
+        verbose_name_plural = "ملخصات الدفتر"
+        constraints = [
+            models.UniqueConstraint(fields=['status', 'concrete_type'], name='ledger_status_concrete_type_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.status} - {self.concrete_type}"
+
+
+# ملخص تقارير يومي: الكمية والمبالغ لكل يوم ونوع خرسانة وحالة (يُحدث بأمر refresh_reports)
+class DailyReportSummary(models.Model):
+    # يوم الصب، أو تاريخ الحجز للحجوزات التي لم يُحدد يوم صبها (Reservation.report_contribution)
+    day = models.DateField(verbose_name="يوم الصب")
+    concrete_type = models.CharField(max_length=100, choices=Reservation.CONCRETE_CHOICES, verbose_name="نوع الخرسانة")
+    status = models.PositiveSmallIntegerField(choices=Reservation.STATUS_CHOICES, verbose_name="حالة الحجز")
+    reservations_count = models.IntegerField(default=0, verbose_name="عدد الحجوزات")
+    volume = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal(0), verbose_name="الكمية (متر مكعب)")
+    gross_amount = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal(0), verbose_name="إجمالي التكلفة قبل الخصم")
+    discount = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal(0), verbose_name="إجمالي الخصومات")
+    payments = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal(0), verbose_name="إجمالي المدفوعات")
+    remaining = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal(0), verbose_name="إجمالي الرصيد المتبقي")
+    refreshed_at = models.DateTimeField(verbose_name="تاريخ آخر تحديث")
+
+    class Meta:
+        verbose_name = "ملخص تقرير يومي"
+        verbose_name_plural = "ملخصات التقارير اليومية"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'concrete_type', 'status'], name='daily_report_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.concrete_type} - {self.status}"
+
+
+# قائمة أسعار (إصدار من التعرفة) صالحة لفترة من التواريخ؛ عند تداخل الفترات تُستخدم القائمة الأحدث بدايةً
+class PriceList(models.Model):
+    name = models.CharField(max_length=100, verbose_name="اسم القائمة")
+    valid_from = models.DateField(verbose_name="سارية من")
+    valid_to = models.DateField(null=True, blank=True, verbose_name="سارية حتى")
+    is_active = models.BooleanField(default=True, verbose_name="مفعلة")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="آخر تعديل")
+
+    class Meta:
+        verbose_name = "قائمة أسعار"
+        verbose_name_plural = "قوائم الأسعار"
+        ordering = ['-valid_from', '-id']
+
+    def clean(self):
+        if self.valid_to and self.valid_from and self.valid_to < self.valid_from:
+            raise ValidationError("تاريخ نهاية القائمة قبل تاريخ بدايتها.")
+
+    def __str__(self):
+        return f"{self.name} ({self.valid_from} - {self.valid_to or '...'})"
+
+
+# سعر المتر المكعب لكل عيار خرسانة في قائمة الأسعار
+class PriceListRate(models.Model):
+    price_list = models.ForeignKey(PriceList, on_delete=models.CASCADE, related_name='rates', verbose_name="قائمة الأسعار")
+    concrete_type = models.CharField(max_length=100, choices=Reservation.CONCRETE_CHOICES, verbose_name="نوع الخرسانة")
+    price_per_unit = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="السعر للوحدة (دولار أمريكي)")
+
+    class Meta:
+        verbose_name = "سعر عيار"
+        verbose_name_plural = "أسعار العيارات"
+        constraints = [
+            models.UniqueConstraint(fields=['price_list', 'concrete_type'], name='price_rate_list_type_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.concrete_type}: {self.price_per_unit}"
+
+
+# إضافة على سعر المتر المكعب للمسافات من from_distance فما فوق (حتى بداية الشريحة التالية)
+class DistanceSurcharge(models.Model):
+    price_list = models.ForeignKey(PriceList, on_delete=models.CASCADE, related_name='surcharges', verbose_name="قائمة الأسعار")
+    from_distance = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="من مسافة (كم)")
+    surcharge_per_unit = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="الإضافة على سعر الوحدة (دولار أمريكي)")
+
+    class Meta:
+        verbose_name = "شريحة مسافة"
+        verbose_name_plural = "شرائح المسافات"
+        constraints = [
+            models.UniqueConstraint(fields=['price_list', 'from_distance'], name='surcharge_list_distance_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.from_distance}+ كم: {self.surcharge_per_unit}"
+
+
+# شاحنة خلاطة: سعتها هي أكبر كمية تنقلها في رحلة واحدة
+class Truck(models.Model):
+    name = models.CharField(max_length=50, unique=True, verbose_name="الشاحنة (الاسم أو رقم اللوحة)")
+    capacity = models.DecimalField(max_digits=6, decimal_places=2, verbose_name="السعة (متر مكعب)")
+    is_active = models.BooleanField(default=True, verbose_name="في الخدمة")
+
+    class Meta:
+        verbose_name = "شاحنة خلاطة"
+        verbose_name_plural = "الشاحنات الخلاطة"
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.capacity} م³)"
+
+
+# رحلة واحدة في جدول التسليم اليومي: حمولة من حجز على شاحنة مع أوقات الانطلاق والوصول والعودة
+class DeliveryTrip(models.Model):
+    day = models.DateField(verbose_name="يوم التسليم")
+    truck = models.ForeignKey(Truck, on_delete=models.CASCADE, related_name='trips', verbose_name="الشاحنة")
+    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, related_name='delivery_trips', verbose_name="الحجز")
+    load_number = models.PositiveSmallIntegerField(verbose_name="رقم الحمولة")
+    quantity = models.DecimalField(max_digits=6, decimal_places=2, verbose_name="الكمية (متر مكعب)")
+    departure = models.TimeField(verbose_name="الانطلاق من المجبل")
+    arrival = models.TimeField(verbose_name="الوصول إلى الموقع")
+    return_time = models.TimeField(verbose_name="العودة إلى المجبل")
+
+    class Meta:
+        verbose_name = "رحلة تسليم"
+        verbose_name_plural = "رحلات التسليم"
+        indexes = [
+            models.Index(fields=['day', 'truck', 'departure'], name='trip_day_truck_departure_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.departure} - {self.truck_id} - {self.reservation_id}"
+
+
+# مهام التصدير التي يمكن إعادة استخدامها لطلب بنفس البصمة: غير الفاشلة، وغير المنتهية التي حُذف ملفها
+# (مهمة واحدة فقط من هذه لكل صيغة وبصمة: export_jobs.request_export)
+REUSABLE_EXPORT_JOBS = ~Q(status='failed') & ~Q(status='done', file_path='')
+
+
+# مهمة تصدير تُنفذ في الخلفية بواسطة عامل محلي (manage.py run_export_worker)
+class ExportJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'في قائمة الانتظار'),
+        (STATUS_RUNNING, 'قيد التنفيذ'),
+        (STATUS_DONE, 'جاهز'),
+        (STATUS_FAILED, 'فشل'),
+    ]
+
+    FORMAT_CHOICES = [
+        ('xlsx', 'Excel'),
+        ('csv', 'CSV'),
+        ('jsonl', 'JSON Lines'),
+    ]
+
+    kind = models.CharField(max_length=50, default='reservations', verbose_name="نوع التصدير")
+    export_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='xlsx', verbose_name="صيغة الملف")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED, verbose_name="الحالة")
+    data_version = models.CharField(max_length=100, blank=True, verbose_name="إصدار البيانات")
+    fingerprint = models.CharField(max_length=64, db_index=True, verbose_name="بصمة التصدير")
+    file_path = models.CharField(max_length=500, blank=True, verbose_name="مسار الملف")
+    rows_count = models.PositiveIntegerField(default=0, verbose_name="عدد الصفوف")
+    error = models.TextField(blank=True, verbose_name="الخطأ")
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, verbose_name="طلب بواسطة")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ الطلب")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="بدء التنفيذ")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="انتهاء التنفيذ")
+
+    class Meta:
+        verbose_name = "مهمة تصدير"
+        verbose_name_plural = "مهام التصدير"
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='exportjob_status_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['export_format', 'fingerprint'], condition=REUSABLE_EXPORT_JOBS, name='exportjob_reusable_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}.{self.export_format} ({self.get_status_display()})"
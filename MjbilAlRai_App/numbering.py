@@ -0,0 +1,193 @@
+# MjbilAlRai_App/numbering.py
+
+import hashlib
+import hmac
+import logging
+from functools import lru_cache
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from .lookup_cache import bump, versioned_key
+from .models import LegacyNumberIndex, NumberSequence, Reservation
+
+logger = logging.getLogger(__name__)
+
+# أرقام الحجز من 100000 إلى 999999 (900 ألف رقم)
+NUMBER_MIN = 100000
+NUMBER_SPACE = 900000
+
+# شبكة Feistel على 20 بت (1,048,576 >= 900,000) مع تكرار التشفير حتى يقع الناتج داخل النطاق
+HALF_BITS = 10
+HALF_MASK = (1 << HALF_BITS) - 1
+FEISTEL_ROUNDS = 4
+
+# تحذير عند استهلاك هذه النسبة من الأرقام المتاحة
+EXHAUSTION_WARNING_RATIO = 0.9
+
+SEQUENCE_NAME = 'reservation_number_seq'
+
+# حجم دفعة التحقق من تصادم الأرقام الجديدة مع الأرقام القديمة
+COLLISION_CHECK_BATCH = 1000
+
+# مساحة مفاتيح فهارس الأرقام القديمة (تُحمّل مرة لكل عملية وتُبطل عند ترحيل أرقام جديدة)
+LEGACY_NAMESPACE = 'numbering:legacy_indexes'
+
+_legacy = {'key': None, 'indexes': frozenset()}
+
+
+class ReservationNumbersExhausted(Exception):
+    pass
+
+
+# مفاتيح الجولات مشتقة من مفتاح سري ثابت (يجب ألا يتغير بعد بدء التشغيل)
+@lru_cache(maxsize=1)
+def _round_keys():
+    secret = getattr(settings, 'RESERVATION_NUMBER_KEY', settings.SECRET_KEY).encode('utf-8')
+    return [hmac.new(secret, f"round-{i}".encode('utf-8'), hashlib.sha256).digest() for i in range(FEISTEL_ROUNDS)]
+
+
+def _round_function(key, value):
+    digest = hmac.new(key, value.to_bytes(2, 'big'), hashlib.sha256).digest()
+    return int.from_bytes(digest[:2], 'big') & HALF_MASK
+
+
+def _feistel(value):
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for key in _round_keys():
+        left, right = right, left ^ _round_function(key, right)
+    return (left << HALF_BITS) | right
+
+
+# تبديل تقابلي (bijective) لفهرس التسلسل داخل نطاق الأرقام: كل فهرس يعطي رقمًا مختلفًا غير قابل للتخمين
+def permute(index):
+    if not 0 <= index < NUMBER_SPACE:
+        raise ReservationNumbersExhausted("تم استهلاك جميع أرقام الحجز المتاحة.")
+    value = _feistel(index)
+    while value >= NUMBER_SPACE:
+        value = _feistel(value)
+    return value
+
+
+def number_for_index(index):
+    return str(NUMBER_MIN + permute(index))
+
+
+def _feistel_inverse(value):
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for key in reversed(_round_keys()):
+        left, right = right ^ _round_function(key, left), left
+    return (left << HALF_BITS) | right
+
+
+# الفهرس الذي يعطي رقم الحجز المعطى (عكس permute)، أو None للأرقام خارج النطاق
+def index_for_number(number):
+    try:
+        value = int(number) - NUMBER_MIN
+    except (TypeError, ValueError):
+        return None
+    if not 0 <= value < NUMBER_SPACE:
+        return None
+    index = _feistel_inverse(value)
+    while index >= NUMBER_SPACE:
+        index = _feistel_inverse(index)
+    return index
+
+
+# فهارس الأرقام القديمة التي لم يصل إليها التسلسل بعد
+def legacy_indexes():
+    key = versioned_key(LEGACY_NAMESPACE)
+    if _legacy['key'] != key:
+        _legacy.update(key=key, indexes=frozenset(LegacyNumberIndex.objects.values_list('sequence_index', flat=True)))
+    return _legacy['indexes']
+
+
+# حجز عدد من قيم التسلسل دفعة واحدة (SEQUENCE على Postgres، وعداد بقفل صف في غيرها)
+def _sequence_indexes(count):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)", [SEQUENCE_NAME, count])
+            return [row[0] for row in cursor.fetchall()]
+
+    with transaction.atomic():
+        sequence, _ = NumberSequence.objects.select_for_update().get_or_create(name=SEQUENCE_NAME)
+        NumberSequence.objects.filter(pk=sequence.pk).update(next_value=F('next_value') + count)
+        return list(range(sequence.next_value, sequence.next_value + count))
+
+
+# قيم تسلسل جديدة مع تخطي فهارس الأرقام القديمة المستخدمة
+def _next_indexes(count):
+    skipped = legacy_indexes()
+    indexes = []
+    while len(indexes) < count:
+        indexes.extend(index for index in _sequence_indexes(count - len(indexes)) if index not in skipped)
+    return indexes
+
+
+# القيمة التالية في التسلسل دون استهلاكها
+def _current_index():
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT last_value, is_called FROM {SEQUENCE_NAME}")
+            last_value, is_called = cursor.fetchone()
+            return last_value + 1 if is_called else last_value
+    sequence = NumberSequence.objects.filter(name=SEQUENCE_NAME).first()
+    return sequence.next_value if sequence else 0
+
+
+# ترحيل أرقام الحجز القديمة: تسجيل فهرس كل رقم مستخدم لم يصل إليه التسلسل بعد حتى لا يُولد مرة أخرى
+# (الأرقام التي تولدت من التسلسل نفسه فهارسها أقل من القيمة الحالية فلا تُسجل). يمكن تكراره بأمان.
+def register_legacy_numbers():
+    current = _current_index()
+    indexes = set()
+    for number in Reservation.objects.values_list('reservation_number', flat=True).iterator(chunk_size=COLLISION_CHECK_BATCH):
+        index = index_for_number(number)
+        if index is not None and index >= current:
+            indexes.add(index)
+    LegacyNumberIndex.objects.filter(sequence_index__lt=current).delete()
+    LegacyNumberIndex.objects.bulk_create(
+        [LegacyNumberIndex(sequence_index=index) for index in sorted(indexes)],
+        batch_size=COLLISION_CHECK_BATCH,
+        ignore_conflicts=True,
+    )
+    transaction.on_commit(lambda: bump(LEGACY_NAMESPACE))
+    return len(indexes)
+
+
+def _check_capacity(last_index):
+    if last_index >= NUMBER_SPACE * EXHAUSTION_WARNING_RATIO:
+        logger.warning(f"Reservation numbers are close to exhaustion: {last_index + 1}/{NUMBER_SPACE} used")
+
+
+# رقم حجز جديد في زمن ثابت دون استعلامات تحقق
+def allocate_reservation_number():
+    index = _next_indexes(1)[0]
+    _check_capacity(index)
+    return number_for_index(index)
+
+
+# مجموعة أرقام للإدخال الجماعي، مع استبدال أي رقم يتصادم مع أرقام قديمة (استعلام واحد لكل دفعة)
+def allocate_reservation_numbers(count):
+    numbers = []
+    while len(numbers) < count:
+        indexes = _next_indexes(count - len(numbers))
+        _check_capacity(indexes[-1])
+        candidates = [number_for_index(index) for index in indexes]
+        taken = set()
+        for start in range(0, len(candidates), COLLISION_CHECK_BATCH):
+            batch = candidates[start:start + COLLISION_CHECK_BATCH]
+            taken.update(Reservation.objects.filter(reservation_number__in=batch).values_list('reservation_number', flat=True))
+        numbers.extend(number for number in candidates if number not in taken)
+    return numbers
+
+
+# حالة استهلاك الأرقام: عدد الفهارس المستخدمة والسعة الكلية
+def allocator_status():
+    used = _current_index()
+    return {
+        'used': used,
+        'capacity': NUMBER_SPACE,
+        'remaining': max(NUMBER_SPACE - used, 0),
+        'ratio': used / NUMBER_SPACE,
+        'reservations': Reservation.objects.count(),
+        'legacy': LegacyNumberIndex.objects.filter(sequence_index__gte=used).count(),
+    }
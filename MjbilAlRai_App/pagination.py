@@ -0,0 +1,171 @@
+# MjbilAlRai_App/pagination.py
+
+from datetime import date
+from django.core.paginator import Paginator
+from django.db import connection, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# أحجام الصفحات المسموح بها
+PAGE_SIZES = (25, 50, 100, 200)
+DEFAULT_PAGE_SIZE = 50
+
+# معاملات الرابط الخاصة بالتصفح (يتم الحفاظ على بقية الفلاتر كما هي)
+AFTER_PARAM = 'after'
+BEFORE_PARAM = 'before'
+PAGE_SIZE_PARAM = 'per_page'
+
+# أقل عدد تقديري للصفوف يُستخدم عنده التقدير بدلاً من COUNT(*) (الجداول الأصغر تُعدّ بدقة)
+ESTIMATED_COUNT_THRESHOLD = 50000
+
+
+# صفحة نتائج بالتصفح المعتمد على المفتاح (reservation_date, id) بدلاً من OFFSET
+class KeysetPage:
+    def __init__(self, items, page_size, next_cursor, previous_cursor, params):
+        self.items = items
+        self.page_size = page_size
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.params = params
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def page_sizes(self):
+        return PAGE_SIZES
+
+    def _query(self, **extra):
+        params = self.params.copy()
+        for key in (AFTER_PARAM, BEFORE_PARAM):
+            params.pop(key, None)
+        for key, value in extra.items():
+            params[key] = value
+        return params.urlencode()
+
+    # روابط الصفحة التالية والسابقة مع الحفاظ على الفلاتر الحالية
+    @property
+    def next_query(self):
+        return self._query(**{AFTER_PARAM: self.next_cursor})
+
+    @property
+    def previous_query(self):
+        return self._query(**{BEFORE_PARAM: self.previous_cursor})
+
+    @property
+    def first_query(self):
+        return self._query()
+
+    # الفلاتر الحالية كحقول مخفية في نموذج اختيار حجم الصفحة
+    @property
+    def hidden_params(self):
+        return [
+            (key, value)
+            for key, values in self.params.lists()
+            if key not in (AFTER_PARAM, BEFORE_PARAM, PAGE_SIZE_PARAM)
+            for value in values
+        ]
+
+
+def encode_cursor(reservation_date, reservation_id):
+    return f"{reservation_date.isoformat() if reservation_date else ''}.{reservation_id}"
+
+
+def decode_cursor(value):
+    try:
+        date_part, id_part = value.split('.', 1)
+        return (date.fromisoformat(date_part) if date_part else None), int(id_part)
+    except (AttributeError, ValueError):
+        return None
+
+
+# الصفوف التي تأتي بعد المؤشر في الترتيب التنازلي (reservation_date DESC, id DESC)
+# مع مراعاة موضع القيم الفارغة حسب محرك قاعدة البيانات
+def _after(cursor_date, cursor_id):
+    nulls_first = connection.features.nulls_order_largest
+    if cursor_date is None:
+        condition = Q(reservation_date__isnull=True, id__lt=cursor_id)
+        if nulls_first:
+            condition |= Q(reservation_date__isnull=False)
+        return condition
+    condition = Q(reservation_date__lt=cursor_date) | Q(reservation_date=cursor_date, id__lt=cursor_id)
+    if not nulls_first:
+        condition |= Q(reservation_date__isnull=True)
+    return condition
+
+
+# الصفوف التي تأتي قبل المؤشر في الترتيب التنازلي
+def _before(cursor_date, cursor_id):
+    nulls_first = connection.features.nulls_order_largest
+    if cursor_date is None:
+        condition = Q(reservation_date__isnull=True, id__gt=cursor_id)
+        if not nulls_first:
+            condition |= Q(reservation_date__isnull=False)
+        return condition
+    condition = Q(reservation_date__gt=cursor_date) | Q(reservation_date=cursor_date, id__gt=cursor_id)
+    if nulls_first:
+        condition |= Q(reservation_date__isnull=True)
+    return condition
+
+
+def get_page_size(request):
+    try:
+        page_size = int(request.GET.get(PAGE_SIZE_PARAM, DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return DEFAULT_PAGE_SIZE
+    return page_size if page_size in PAGE_SIZES else DEFAULT_PAGE_SIZE
+
+
+# تقسيم مجموعة الحجوزات إلى صفحات بالاعتماد على المؤشر (seek) بدلاً من عدّ وتخطي الصفوف
+def keyset_paginate(request, queryset):
+    page_size = get_page_size(request)
+    after = decode_cursor(request.GET.get(AFTER_PARAM))
+    before = decode_cursor(request.GET.get(BEFORE_PARAM)) if after is None else None
+
+    if before is not None:
+        # قراءة الصفحة السابقة بالترتيب العكسي ثم قلبها
+        rows = list(queryset.filter(_before(*before)).order_by('reservation_date', 'id')[:page_size + 1])
+        has_more = len(rows) > page_size
+        items = list(reversed(rows[:page_size]))
+        has_next = True
+        has_previous = has_more
+    else:
+        if after is not None:
+            queryset = queryset.filter(_after(*after))
+        rows = list(queryset.order_by('-reservation_date', '-id')[:page_size + 1])
+        items = rows[:page_size]
+        has_next = len(rows) > page_size
+        has_previous = after is not None
+
+    next_cursor = encode_cursor(items[-1].reservation_date, items[-1].id) if has_next and items else None
+    previous_cursor = encode_cursor(items[0].reservation_date, items[0].id) if has_previous and items else None
+    return KeysetPage(items, page_size, next_cursor, previous_cursor, request.GET)
+
+
+# عدد الصفوف التقريبي من إحصاءات Postgres (يحدثه ANALYZE/autovacuum)، أو -1 إذا لم يتوفر
+def estimated_row_count(model, using='default'):
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return -1
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        row = cursor.fetchone()
+    return row[0] if row else -1
+
+
+# مقسم صفحات لوحة الإدارة: الجدول الكامل دون فلاتر يُعدّ تقديريًا بدلاً من مسح كامل بـ COUNT(*)
+# (مع الفلاتر يبقى العدّ دقيقًا لأنه يمر عبر فهارس الحالة والتاريخ)
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate >= ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
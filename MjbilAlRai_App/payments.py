@@ -0,0 +1,91 @@
+# MjbilAlRai_App/payments.py
+
+from datetime import date
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from .aggregates import ZERO
+from .forms import FinancialDetailsForm
+from .models import Payment, Reservation
+
+# الحقول التي تتغير عند تسجيل دفعة (تُكتب وحدها بدلاً من إعادة كتابة الصف كاملًا)
+PAYMENT_UPDATE_FIELDS = ['total_cost', 'payments', 'remaining_balance', 'is_confirmed', 'is_completed', 'completion_date', 'status', 'updated_at']
+
+
+class PaymentExceedsBalance(Exception):
+    pass
+
+
+def _add_entry(reservation, amount, method, user=None, note=''):
+    return Payment.objects.create(
+        reservation=reservation,
+        phone_number=reservation.phone_number,
+        amount=amount,
+        method=method,
+        note=note,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+# تسجيل دفعة لحجز بشكل ذري: قفل الصف حتى نهاية المعاملة يمنع ضياع دفعة عند التسجيل المتزامن
+# الدفعة تُضاف إلى سجل الدفعات، وحقلا payments و remaining_balance يُحدثان في نفس المعاملة
+def record_payment(reservation_id, amount, user=None, method=Payment.METHOD_CASH, note=''):
+    with transaction.atomic():
+        reservation = Reservation.objects.select_for_update().get(id=reservation_id)
+
+        # التحقق من الرصيد على القيمة المقفلة وليس على القيمة المعروضة في النموذج
+        if amount > (reservation.remaining_balance or Decimal(0)):
+            raise PaymentExceedsBalance("قيمة الدفعة لا يمكن أن تتجاوز الرصيد المتبقي.")
+
+        _add_entry(reservation, amount, method, user, note)
+        reservation.payments = (reservation.payments or Decimal(0)) + amount
+
+        # إعادة حساب الرصيد المتبقي (تتم أيضًا داخل save()) وتعيين الحجز كمكتمل عند السداد الكامل
+        # (للحجز المؤكد فقط؛ السداد المسبق لحجز معلق أو مقبول لا يغير حالته، ويكتمل عند تأكيده)
+        if reservation.total_cost is not None:
+            reservation.remaining_balance = reservation.total_cost - (reservation.discount or Decimal(0)) - reservation.payments
+        if reservation.is_fully_paid() and reservation.status == Reservation.STATUS_CONFIRMED:
+            reservation.is_completed = True
+            reservation.completion_date = date.today()
+
+        reservation.save(update_fields=PAYMENT_UPDATE_FIELDS)
+    return reservation
+
+
+# حفظ نموذج البيانات المالية مع قفل الحجز، وتسجيل أي تغيير يدوي في مجموع الدفعات كدفعة تعديل
+def save_financial_details(reservation_id, data, user=None):
+    with transaction.atomic():
+        reservation = Reservation.objects.select_for_update().get(id=reservation_id)
+        previous_payments = reservation.payments or Decimal(0)
+        form = FinancialDetailsForm(data, instance=reservation)
+        if form.is_valid():
+            reservation = form.save()
+            difference = (reservation.payments or Decimal(0)) - previous_payments
+            if difference:
+                _add_entry(reservation, difference, Payment.METHOD_ADJUSTMENT, user, "تعديل مجموع الدفعات من نموذج البيانات المالية")
+    return form
+
+
+# كشف حساب العميل: جميع دفعات رقم الهاتف عبر كل حجوزاته باستعلام واحد على الفهرس (phone_number, created_at)
+def customer_payment_history(phone_number):
+    return (
+        Payment.objects.filter(phone_number=phone_number)
+        .select_related('reservation', 'created_by')
+        .order_by('created_at', 'id')
+    )
+
+
+# الحجوزات التي لا يطابق فيها الحقل المخزن payments مجموع سجل الدفعات
+def payment_mismatches():
+    entries_total = (
+        Payment.objects.filter(reservation=OuterRef('pk'))
+        .order_by()
+        .values('reservation')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    return (
+        Reservation.objects.annotate(entries_total=Coalesce(Subquery(entries_total), ZERO))
+        .exclude(payments=F('entries_total'))
+    )
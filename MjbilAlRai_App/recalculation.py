@@ -0,0 +1,141 @@
+# MjbilAlRai_App/recalculation.py
+
+from datetime import date
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import BooleanField, Case, DateField, F, Q, Value, When
+from django.db.models.functions import Abs, Coalesce, Round
+from django.utils import timezone
+from .aggregates import CENT, MONEY_FIELD, gross_amount_expression, remaining_amount_expression
+from .ledger import GROUPS_BATCH_SIZE, apply_ledger_groups, ledger_groups
+from .lookup_cache import clear_lookup_cache, invalidate_lookups
+from .models import Reservation
+from .reporting import apply_report_groups, report_groups
+
+# الحقول المشتقة التي يعيد حسابها الأمر (نفس حقول Reservation.apply_derived_fields)
+DERIVED_FIELDS = ('reservation_date', 'total_cost', 'remaining_balance', 'is_confirmed', 'completion_date', 'status')
+
+# الحقول المالية تُقارن بتسامح نصف سنت: القيمة المحسوبة بأربع خانات عشرية على الأكثر، وقيم المنتصف
+# يقربها Django عند الحفظ (ROUND_HALF_EVEN) بعكس ROUND في قاعدة البيانات، وأي قيمة خاطئة تبعد 0.0051 على الأقل
+MONEY_FIELDS = ('total_cost', 'remaining_balance')
+ROUNDING_TOLERANCE = Decimal('0.00505')
+
+# أكثر من هذا العدد من الحجوزات المعدلة: مسح ذاكرة نتائج البحث بالكامل بدلاً من إبطال كل رقم على حدة
+INVALIDATE_LOOKUPS_LIMIT = 1000
+
+NULL_MONEY = Value(None, output_field=MONEY_FIELD)
+NULL_DATE = Value(None, output_field=DateField())
+
+
+# القيم الصحيحة لكل حقل مشتق كتعبيرات SQL (نفس منطق apply_derived_fields)
+# جميعها تعتمد على القيم المخزنة الأصلية فقط، لذلك لا يهم ترتيب الأعمدة في SET
+def derived_expressions(today=None, rounded=True):
+    today = today or date.today()
+    money = (lambda expression: Round(expression, 2)) if rounded else (lambda expression: expression)
+    # الحجز غير المسعّر ليس له تكلفة بعد (NULL كما يخزنه save())، وإلا فهي مطابقة لـ calculate_total_cost و calculate_remaining_balance
+    priced = Q(price_per_unit__isnull=False)
+    return {
+        'reservation_date': Coalesce(F('reservation_date'), Value(today), output_field=DateField()),
+        'total_cost': Case(When(priced, then=money(gross_amount_expression())), default=NULL_MONEY, output_field=MONEY_FIELD),
+        'remaining_balance': Case(When(priced, then=money(remaining_amount_expression())), default=NULL_MONEY, output_field=MONEY_FIELD),
+        # الحجز المكتمل مؤكد دائمًا
+        'is_confirmed': Case(When(is_completed=True, then=Value(True)), default=F('is_confirmed'), output_field=BooleanField()),
+        'completion_date': Case(
+            When(is_completed=False, then=NULL_DATE),
+            default=Coalesce(F('completion_date'), Value(today), output_field=DateField()),
+            output_field=DateField(),
+        ),
+        # نفس ترتيب derive_status (الاكتمال قبل التأكيد، لذلك لا حاجة إلى قيمة is_confirmed الجديدة)
+        'status': Case(
+            When(is_rejected=True, then=Value(Reservation.STATUS_REJECTED)),
+            When(is_completed=True, then=Value(Reservation.STATUS_COMPLETED)),
+            When(is_confirmed=True, then=Value(Reservation.STATUS_CONFIRMED)),
+            When(is_approved=True, then=Value(Reservation.STATUS_APPROVED)),
+            default=Value(Reservation.STATUS_PENDING),
+        ),
+    }
+
+
+def _expected(field):
+    return f'expected_{field}'
+
+
+def _error(field):
+    return f'{field}_error'
+
+
+# شرط اختلاف القيمة المخزنة عن المتوقعة مع مراعاة NULL في الطرفين
+def _differs(field):
+    expected = _expected(field)
+    if field in MONEY_FIELDS:
+        different = Q(**{f'{_error(field)}__gt': ROUNDING_TOLERANCE})
+    else:
+        different = ~Q(**{field: F(expected)})
+    return (
+        Q(**{f'{field}__isnull': True, f'{expected}__isnull': False})
+        | Q(**{f'{field}__isnull': False, f'{expected}__isnull': True})
+        | (Q(**{f'{field}__isnull': False, f'{expected}__isnull': False}) & different)
+    )
+
+
+# الحجوزات التي تختلف قيمها المخزنة عن القيم المحسوبة (مع القيم المتوقعة كحقول expected_*)
+def stale_reservations(queryset=None, today=None):
+    queryset = Reservation.objects.all() if queryset is None else queryset
+    mismatch = Q()
+    for field in DERIVED_FIELDS:
+        mismatch |= _differs(field)
+    expressions = derived_expressions(today, rounded=False)
+    errors = {_error(field): Abs(F(field) - F(_expected(field))) for field in MONEY_FIELDS}
+    return (
+        queryset.annotate(**{_expected(field): expressions[field] for field in DERIVED_FIELDS})
+        .annotate(**errors)
+        .filter(mismatch)
+    )
+
+
+# تفاصيل الاختلافات لكل حجز: (رقم الحجز، [(الحقل، المخزن، المتوقع)])
+def stale_report(queryset=None, limit=None, today=None):
+    fields = ['reservation_number']
+    for field in DERIVED_FIELDS:
+        fields += [field, _expected(field)]
+    rows = stale_reservations(queryset, today).order_by('id').values(*fields)
+    if limit is not None:
+        rows = rows[:limit]
+    for row in rows:
+        differences = []
+        for field in DERIVED_FIELDS:
+            stored, expected = row[field], row[_expected(field)]
+            if field in MONEY_FIELDS and stored is not None and expected is not None:
+                if abs(Decimal(stored) - Decimal(expected)) <= ROUNDING_TOLERANCE:
+                    continue
+                stored, expected = Decimal(stored).quantize(CENT), Decimal(expected).quantize(CENT)
+            if stored != expected:
+                differences.append((field, stored, expected))
+        yield row['reservation_number'], differences
+
+
+# إعادة حساب الحقول المشتقة لمجموعة حجوزات باستعلام UPDATE واحد (بدلاً من save() لكل صف)
+# تُحدّث الصفوف المختلفة فقط؛ ولأن UPDATE لا يرسل إشارات يُعدّل ملخص الدفتر بفرق مساهمات هذه الصفوف
+# والملخص اليومي بفرق مساهمات هذه الصفوف قبل التحديث وبعده (كما في bulk._apply)
+def recalculate_reservations(queryset=None, today=None):
+    today = today or date.today()
+    with transaction.atomic():
+        stale = stale_reservations(queryset, today)
+        rows = list(stale.select_for_update().order_by('id').values_list('id', 'phone_number', 'reservation_number'))
+        if not rows:
+            return 0
+        if len(rows) > INVALIDATE_LOOKUPS_LIMIT:
+            transaction.on_commit(clear_lookup_cache)
+        else:
+            invalidate_lookups(phones=(row[1] for row in rows), numbers=(row[2] for row in rows))
+        ids = [row[0] for row in rows]
+        before, reports_before = ledger_groups(ids), report_groups(ids)
+        # تحديث الصفوف المقفلة بمعرفاتها فقط: صف أصبح مختلفًا بعد القراءة لا يُحدّث دون فرق في الملخص وإبطال لنتائج البحث
+        updated = 0
+        now = timezone.now()
+        for start in range(0, len(ids), GROUPS_BATCH_SIZE):
+            batch = ids[start:start + GROUPS_BATCH_SIZE]
+            updated += Reservation.objects.filter(id__in=batch).update(updated_at=now, **derived_expressions(today))
+        apply_ledger_groups(before, ledger_groups(ids))
+        apply_report_groups(reports_before, report_groups(ids))
+    return updated
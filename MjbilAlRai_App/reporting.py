@@ -0,0 +1,169 @@
+# MjbilAlRai_App/reporting.py
+
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+from django.utils import timezone
+from .aggregates import CENT, gross_amount_expression, remaining_amount_expression
+from .models import DailyReportSummary, Reservation
+
+# فترات التجميع المتاحة في صفحة التقارير
+PERIODS = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+REPORT_FIELDS = ('reservations_count', 'volume', 'gross_amount', 'discount', 'payments', 'remaining')
+
+# عدد المعرفات في كل استعلام تجميع (نفس ledger.GROUPS_BATCH_SIZE)
+GROUPS_BATCH_SIZE = 500
+
+
+# يوم الحجز في التقارير: يوم الصب، أو تاريخ الحجز إذا لم يُحدد يوم الصب بعد (نفس Reservation.report_contribution)
+def report_day_expression():
+    return Coalesce(F('pour_date'), F('reservation_date'))
+
+
+# مجاميع الملخص اليومي لمجموعة حجوزات مجمعة حسب (اليوم، نوع الخرسانة، الحالة)
+def _summary_rows(reservations):
+    return (
+        reservations.order_by()
+        .annotate(report_day=report_day_expression())
+        .filter(report_day__isnull=False)
+        .values('report_day', 'concrete_type', 'status')
+        .annotate(
+            total_reservations_count=Count('id'),
+            total_volume=Sum('concrete_quantity'),
+            total_gross_amount=Sum(gross_amount_expression()),
+            total_discount=Sum('discount'),
+            total_payments=Sum('payments'),
+            total_remaining=Sum(remaining_amount_expression()),
+        )
+    )
+
+
+# إعادة حساب الملخص اليومي لنطاق أيام (أو لكامل الجدول) بحذف صفوف النطاق وإدراجها من جديد
+# (الحفظ والتحديثات الجماعية تعدّل الملخص مباشرة؛ إعادة الحساب للتصحيح وبعد الإدخال الجماعي)
+@transaction.atomic
+def refresh_daily_summary(start=None, end=None):
+    reservations = Reservation.objects.annotate(report_day=report_day_expression())
+    summaries = DailyReportSummary.objects.all()
+    if start:
+        reservations = reservations.filter(report_day__gte=start)
+        summaries = summaries.filter(day__gte=start)
+    if end:
+        reservations = reservations.filter(report_day__lte=end)
+        summaries = summaries.filter(day__lte=end)
+
+    rows = list(_summary_rows(reservations))
+    refreshed_at = timezone.now()
+    summaries.delete()
+    DailyReportSummary.objects.bulk_create([
+        DailyReportSummary(
+            day=row['report_day'],
+            concrete_type=row['concrete_type'],
+            status=row['status'],
+            refreshed_at=refreshed_at,
+            **{field: row[f'total_{field}'] or 0 for field in REPORT_FIELDS},
+        )
+        for row in rows
+    ], batch_size=1000)
+    return len(rows)
+
+
+# إضافة (أو طرح) قيم إلى صف الملخص الخاص باليوم ونوع الخرسانة والحالة بتحديث ذري F() (كما في ledger._add_to_ledger)
+def _add_to_summary(key, values, sign=1):
+    day, concrete_type, status = key
+    refreshed_at = timezone.now()
+    changes = {field: F(field) + sign * values[field] for field in REPORT_FIELDS}
+    rows = DailyReportSummary.objects.filter(day=day, concrete_type=concrete_type, status=status)
+    if rows.update(refreshed_at=refreshed_at, **changes):
+        return
+    try:
+        with transaction.atomic():
+            DailyReportSummary.objects.create(
+                day=day,
+                concrete_type=concrete_type,
+                status=status,
+                refreshed_at=refreshed_at,
+                **{field: sign * values[field] for field in REPORT_FIELDS},
+            )
+    except IntegrityError:
+        rows.update(refreshed_at=refreshed_at, **changes)
+
+
+# تطبيق الفرق بين المساهمة القديمة والجديدة لحجز واحد (تحديث واحد إذا بقي الحجز في نفس الصف)
+def apply_report_delta(old, new):
+    if old == new:
+        return
+    if old is not None and new is not None and old[0] == new[0]:
+        _add_to_summary(new[0], {field: new[1][field] - old[1][field] for field in REPORT_FIELDS})
+        return
+    if old is not None:
+        _add_to_summary(old[0], old[1], sign=-1)
+    if new is not None:
+        _add_to_summary(new[0], new[1])
+
+
+# مساهمات مجموعة حجوزات (بالمعرفات) في الملخص اليومي مجمعة حسب (اليوم، نوع الخرسانة، الحالة)
+def report_groups(ids):
+    groups = {}
+    for start in range(0, len(ids), GROUPS_BATCH_SIZE):
+        rows = _summary_rows(Reservation.objects.filter(id__in=ids[start:start + GROUPS_BATCH_SIZE]))
+        for row in rows:
+            values = groups.setdefault((row['report_day'], row['concrete_type'], row['status']), dict.fromkeys(REPORT_FIELDS, 0))
+            for field in REPORT_FIELDS:
+                values[field] += row[f'total_{field}'] or 0
+    return groups
+
+
+# تعديل الملخص اليومي بفرق مساهمات مجموعة حجوزات قبل تحديثها جماعيًا وبعده (UPDATE لا يرسل إشارات post_save)
+def apply_report_groups(before, after):
+    empty = dict.fromkeys(REPORT_FIELDS, 0)
+    for key in before.keys() | after.keys():
+        old, new = before.get(key, empty), after.get(key, empty)
+        delta = {field: new[field] - old[field] for field in REPORT_FIELDS}
+        if any(delta.values()):
+            _add_to_summary(key, delta)
+
+
+# صفوف التقرير من الملخص اليومي فقط، مجمعة حسب الفترة ونوع الخرسانة وحالة الحجز
+def report_rows(period='day', start=None, end=None, status=None):
+    # الصفوف التي انتقلت جميع حجوزاتها إلى يوم أو حالة أخرى تبقى بعدد صفر ولا تُعرض
+    summaries = DailyReportSummary.objects.filter(reservations_count__gt=0)
+    if start:
+        summaries = summaries.filter(day__gte=start)
+    if end:
+        summaries = summaries.filter(day__lte=end)
+    if status is not None:
+        summaries = summaries.filter(status=status)
+
+    truncate = PERIODS.get(period)
+    rows = list(
+        summaries.order_by()
+        .annotate(period=truncate('day') if truncate else F('day'))
+        .values('period', 'concrete_type', 'status')
+        .annotate(**{f'total_{field}': Sum(field) for field in REPORT_FIELDS})
+        .order_by('-period', 'concrete_type', 'status')
+    )
+    labels = dict(Reservation.STATUS_CHOICES)
+    for row in rows:
+        for field in REPORT_FIELDS[1:]:
+            row[f'total_{field}'] = Decimal(row[f'total_{field}'] or 0).quantize(CENT)
+        # الإيراد الصافي = التكلفة الإجمالية - الخصم
+        row['total_revenue'] = row['total_gross_amount'] - row['total_discount']
+        row['status_label'] = labels.get(row['status'], row['status'])
+    return rows
+
+
+# مجموع صفوف التقرير المعروضة
+def report_totals(rows):
+    fields = [f'total_{field}' for field in REPORT_FIELDS] + ['total_revenue']
+    return {field: sum((row[field] for row in rows), 0) for field in fields}
+
+
+# تاريخ آخر تحديث للملخص (لعرضه في صفحة التقارير)
+def last_refreshed_at():
+    return DailyReportSummary.objects.order_by('-refreshed_at').values_list('refreshed_at', flat=True).first()
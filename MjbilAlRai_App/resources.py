@@ -0,0 +1,204 @@
+# MjbilAlRai_App/resources.py
+
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from django.core.exceptions import ValidationError
+from import_export import fields, resources, widgets
+from .ledger import rebuild_ledger
+from .lookup_cache import clear_lookup_cache, normalize_phone, normalize_reservation_number
+from .models import Payment, Reservation
+from .numbering import COLLISION_CHECK_BATCH, allocate_reservation_numbers
+from .reporting import refresh_daily_summary
+
+# عدد الحجوزات في كل عملية bulk_create (وفي كل طلب أرقام حجز جديدة)
+IMPORT_BATCH_SIZE = 1000
+
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%d/%m/%Y')
+
+# حقول الحالة المنطقية لكل حالة مستوردة: (موافقة، رفض، تأكيد، اكتمال)
+STATUS_FLAGS = {
+    Reservation.STATUS_PENDING: (False, False, False, False),
+    Reservation.STATUS_APPROVED: (True, False, False, False),
+    Reservation.STATUS_CONFIRMED: (True, False, True, False),
+    Reservation.STATUS_COMPLETED: (True, False, True, True),
+    Reservation.STATUS_REJECTED: (False, True, False, False),
+}
+
+
+# الحالة باسمها العربي كما في ملفات التصدير، أو برمزها الرقمي
+class StatusWidget(widgets.Widget):
+    def clean(self, value, row=None, **kwargs):
+        if value in (None, ''):
+            return Reservation.STATUS_PENDING
+        value = str(value).strip()
+        for code, label in Reservation.STATUS_CHOICES:
+            if value in (label, str(code)):
+                return code
+        raise ValueError(f"حالة غير معروفة: {value}")
+
+    def render(self, value, obj=None, **kwargs):
+        return dict(Reservation.STATUS_CHOICES).get(value, '')
+
+
+# الخلايا الرقمية في Excel تصل كأعداد عشرية (123456.0)
+def cell_text(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value if value is not None else '')
+
+
+# نص الخلية دون مسافات زائدة (الخلايا الفارغة والأعمدة غير الموجودة تعطي نصًا فارغًا)
+class TextWidget(widgets.CharWidget):
+    def clean(self, value, row=None, **kwargs):
+        return cell_text(value).strip()
+
+
+# رقم الهاتف بعد توحيد الأرقام العربية وإزالة المسافات
+class PhoneWidget(widgets.CharWidget):
+    def clean(self, value, row=None, **kwargs):
+        return normalize_phone(cell_text(value))
+
+
+class ReservationNumberWidget(widgets.CharWidget):
+    def clean(self, value, row=None, **kwargs):
+        return normalize_reservation_number(cell_text(value))
+
+
+# قيمة رقمية غير صالحة تُعرض كخطأ في السطر نفسه بدلاً من إيقاف الاستيراد
+class ImportDecimalWidget(widgets.DecimalWidget):
+    def clean(self, value, row=None, **kwargs):
+        try:
+            return super().clean(cell_text(value).strip(), row, **kwargs)
+        except InvalidOperation:
+            raise ValueError(f"قيمة رقمية غير صحيحة: {value}")
+
+
+# التاريخ بصيغة ملفات التصدير أو بالصيغ الشائعة يدويًا (خلايا التاريخ في Excel تصل كـ datetime)
+class ImportDateWidget(widgets.DateWidget):
+    def __init__(self):
+        super().__init__()
+        self.formats = DATE_FORMATS
+
+    def clean(self, value, row=None, **kwargs):
+        if isinstance(value, datetime):
+            return value.date()
+        return super().clean(cell_text(value).strip(), row, **kwargs)
+
+
+def text_field(attribute, column_name):
+    return fields.Field(attribute=attribute, column_name=column_name, widget=TextWidget())
+
+
+def decimal_field(attribute, column_name, **kwargs):
+    return fields.Field(attribute=attribute, column_name=column_name, widget=ImportDecimalWidget(), **kwargs)
+
+
+def date_field(attribute, column_name):
+    return fields.Field(attribute=attribute, column_name=column_name, widget=ImportDateWidget())
+
+
+# استيراد الحجوزات التاريخية من ملفات Excel/CSV بعناوين ملفات التصدير نفسها
+# كل صف يُتحقق منه على حدة (الأخطاء تُعرض لكل سطر)، والإدخال بـ bulk_create على دفعات داخل معاملة واحدة
+class ReservationResource(resources.ModelResource):
+    reservation_number = fields.Field(attribute='reservation_number', column_name='رقم الحجز', widget=ReservationNumberWidget())
+    customer_name = text_field('customer_name', 'اسم العميل')
+    carpenter_name = text_field('carpenter_name', 'اسم النجار')
+    phone_number = fields.Field(attribute='phone_number', column_name='رقم الهاتف', widget=PhoneWidget())
+    concrete_type = text_field('concrete_type', 'نوع الخرسانة')
+    concrete_quantity = decimal_field('concrete_quantity', 'كمية الخرسانة')
+    site_location = text_field('site_location', 'موقع الصب')
+    estimated_distance = decimal_field('estimated_distance', 'المسافة التقديرية')
+    additional_notes = text_field('additional_notes', 'ملاحظات إضافية')
+    reservation_date = date_field('reservation_date', 'تاريخ الحجز')
+    approval_date = date_field('approval_date', 'تاريخ الموافقة')
+    approval_message = text_field('approval_message', 'رسالة الموافقة')
+    price_per_unit = decimal_field('price_per_unit', 'السعر للوحدة')
+    discount = decimal_field('discount', 'الخصم')
+    accountant_notes = text_field('accountant_notes', 'ملاحظات المحاسب')
+    payments = decimal_field('payments', 'مجموع الدفعات المدفوعة', default=Decimal(0))
+    completion_date = date_field('completion_date', 'تاريخ اكتمال الحجز')
+    status = fields.Field(attribute='status', column_name='الحالة', widget=StatusWidget())
+
+    class Meta:
+        model = Reservation
+        fields = (
+            'reservation_number', 'customer_name', 'carpenter_name', 'phone_number', 'concrete_type',
+            'concrete_quantity', 'site_location', 'estimated_distance', 'additional_notes', 'reservation_date',
+            'approval_date', 'approval_message', 'price_per_unit', 'discount', 'accountant_notes', 'payments',
+            'completion_date', 'status',
+        )
+        # إضافة فقط: لا بحث عن حجز موجود لكل صف (الأرقام المكررة تُرفض في التحقق)
+        force_init_instance = True
+        use_bulk = True
+        batch_size = IMPORT_BATCH_SIZE
+        skip_diff = True
+        # full_clean يُستدعى في validate_instance دون التحقق من التفرد (استعلام لكل صف)
+        clean_model_instances = False
+
+    # أرقام الحجز الموجودة في الملف تُفحص مقابل قاعدة البيانات على دفعات قبل بدء الاستيراد
+    def before_import(self, dataset, **kwargs):
+        self.taken_numbers = set()
+        self.file_numbers = set()
+        self.imported_dates = []
+        field = self.fields['reservation_number']
+        if field.column_name not in (dataset.headers or []):
+            return
+        numbers = sorted({field.widget.clean(value) for value in dataset[field.column_name]} - {''})
+        for start in range(0, len(numbers), COLLISION_CHECK_BATCH):
+            batch = numbers[start:start + COLLISION_CHECK_BATCH]
+            self.taken_numbers.update(Reservation.objects.filter(reservation_number__in=batch).values_list('reservation_number', flat=True))
+
+    # الحقول المنطقية والمشتقة من الحالة المستوردة (نفس منطق Reservation.save())
+    def import_instance(self, instance, row, **kwargs):
+        super().import_instance(instance, row, **kwargs)
+        instance.is_approved, instance.is_rejected, instance.is_confirmed, instance.is_completed = STATUS_FLAGS[instance.status]
+        instance.apply_derived_fields()
+
+    def validate_instance(self, instance, import_validation_errors=None, validate_unique=True):
+        errors = dict(import_validation_errors or {})
+        number = instance.reservation_number
+        if number:
+            if number in self.taken_numbers:
+                errors['reservation_number'] = [f"رقم الحجز {number} مستخدم مسبقًا."]
+            elif number in self.file_numbers:
+                errors['reservation_number'] = [f"رقم الحجز {number} مكرر في الملف."]
+            self.file_numbers.add(number)
+        try:
+            instance.full_clean(exclude=list(errors), validate_unique=False, validate_constraints=False)
+        except ValidationError as e:
+            errors = e.update_error_dict(errors)
+        if errors:
+            raise ValidationError(errors)
+
+    # أرقام الحجز الناقصة تُحجز دفعة واحدة لكل دفعة إدخال، ثم تُسجل دفعة افتتاحية لكل حجز مدفوع
+    # (التجربة dry-run لا تكتب شيئًا حتى لا تستهلك أرقامًا من التسلسل)
+    def bulk_create(self, using_transactions, dry_run, raise_errors, batch_size=None, result=None):
+        if dry_run:
+            self.create_instances.clear()
+            return
+        try:
+            instances = self.create_instances
+            missing = [instance for instance in instances if not instance.reservation_number]
+            for instance, number in zip(missing, allocate_reservation_numbers(len(missing))):
+                instance.reservation_number = number
+            Reservation.objects.bulk_create(instances, batch_size=batch_size)
+            Payment.objects.bulk_create([
+                Payment(reservation=instance, phone_number=instance.phone_number, amount=instance.payments, method=Payment.METHOD_OPENING)
+                for instance in instances
+                if instance.payments
+            ], batch_size=batch_size)
+            # أيام الحجوزات في التقارير (يوم الصب أو تاريخ الحجز) لتحديث الملخص اليومي لنطاقها
+            self.imported_dates.extend(instance.pour_date or instance.reservation_date for instance in instances)
+        except Exception as e:
+            self.handle_import_error(result, e, raise_errors)
+        finally:
+            self.create_instances.clear()
+
+    # bulk_create لا يرسل إشارات الحفظ: إعادة بناء ملخص الدفتر والتقارير وإبطال نتائج البحث مرة واحدة
+    def after_import(self, dataset, result, **kwargs):
+        super().after_import(dataset, result, **kwargs)
+        if self._is_dry_run(kwargs) or not self.imported_dates:
+            return
+        rebuild_ledger()
+        refresh_daily_summary(min(self.imported_dates), max(self.imported_dates))
+        clear_lookup_cache()
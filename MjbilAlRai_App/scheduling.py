@@ -0,0 +1,144 @@
+# MjbilAlRai_App/scheduling.py
+
+import heapq
+import math
+from datetime import time
+from decimal import Decimal
+from django.db import transaction
+from .models import DeliveryTrip, Reservation, Truck
+
+# الحجوزات التي تُجدول للتسليم: مقبولة أو مؤكدة ولم تكتمل بعد، في تاريخ الصب المحدد لها
+# (التأكيد يسجل الكميات النهائية بعد الصب، لذلك تبقى الحجوزات المقبولة ضمن الجدول؛ تاريخ القبول لا يُستخدم هنا)
+SCHEDULED_STATUSES = (Reservation.STATUS_APPROVED, Reservation.STATUS_CONFIRMED)
+
+# دوام المجبل: أول انطلاق بعد البداية، وكل رحلة تعود قبل النهاية
+WORKDAY_START = time(7, 0)
+WORKDAY_END = time(18, 0)
+
+# مدة التعبئة في المجبل والتفريغ في الموقع لكل حمولة، ومتوسط سرعة الشاحنة المحملة
+LOADING_MINUTES = 10
+UNLOADING_MINUTES = 25
+AVERAGE_SPEED_KMH = 40
+
+# أوقات الانطلاق تُقرب إلى فترات ثابتة (ربع ساعة)
+SLOT_MINUTES = 15
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+# مدة الطريق في اتجاه واحد بالدقائق
+def travel_minutes(distance):
+    return math.ceil(float(distance or 0) * 60 / AVERAGE_SPEED_KMH)
+
+
+# تخطيط يوم تسليم بخوارزمية جشعة: الصبّات الأطول عملًا أولًا (LPT)، وكل حمولة على أول شاحنة تصبح متاحة
+# pours: [(رقم الحجز، الكمية، المسافة)]، trucks: [(رقم الشاحنة، السعة)]
+# النتيجة: (الرحلات [(الحجز، الشاحنة، رقم الحمولة، الكمية، الانطلاق، الوصول، العودة)]، الحجوزات التي لم تتسع لها الشاحنات)
+# الصبّة تُجدول كاملة أو لا تُجدول (لا تُترك صبّة ناقصة)، والتعقيد O(عدد الحمولات × log عدد الشاحنات)
+def plan_day(pours, trucks, start=WORKDAY_START, end=WORKDAY_END):
+    trucks = [(truck_id, Decimal(capacity)) for truck_id, capacity in trucks if capacity and capacity > 0]
+    if not trucks:
+        return [], [reservation_id for reservation_id, quantity, distance in pours]
+    largest = max(capacity for truck_id, capacity in trucks)
+    start, end = _minutes(start), _minutes(end)
+
+    def work(pour):
+        reservation_id, quantity, distance = pour
+        loads = math.ceil(Decimal(quantity) / largest)
+        return loads * (LOADING_MINUTES + UNLOADING_MINUTES + 2 * travel_minutes(distance))
+
+    # الشاحنات في كومة حسب وقت توفرها، ثم السعة الأكبر أولًا عند التساوي
+    available = [(start, -capacity, index) for index, (truck_id, capacity) in enumerate(trucks)]
+    heapq.heapify(available)
+
+    trips, unscheduled = [], []
+    for pour in sorted(pours, key=work, reverse=True):
+        reservation_id, quantity, distance = pour
+        remaining = Decimal(quantity or 0)
+        if remaining <= 0:
+            continue
+        travel = travel_minutes(distance)
+        saved = list(available)
+        planned = []
+        while remaining > 0:
+            ready, negative_capacity, index = heapq.heappop(available)
+            departure = math.ceil((ready + LOADING_MINUTES) / SLOT_MINUTES) * SLOT_MINUTES
+            arrival = departure + travel
+            returned = arrival + UNLOADING_MINUTES + travel
+            if returned > end:
+                break
+            load = min(remaining, -negative_capacity)
+            remaining -= load
+            planned.append((reservation_id, trucks[index][0], len(planned) + 1, load, departure, arrival, returned))
+            heapq.heappush(available, (returned, negative_capacity, index))
+        if remaining > 0:
+            # لا يتسع الدوام للصبّة كاملة: إعادة الشاحنات إلى حالتها قبل هذه الصبّة
+            available = saved
+            unscheduled.append(reservation_id)
+        else:
+            trips.extend(planned)
+    return trips, unscheduled
+
+
+# الصبّات المطلوبة في يوم معين
+def day_pours(day):
+    return list(
+        Reservation.objects.filter(status__in=SCHEDULED_STATUSES, pour_date=day)
+        .order_by('id')
+        .values_list('id', 'concrete_quantity', 'estimated_distance')
+    )
+
+
+# إنشاء جدول التسليم ليوم (يستبدل الجدول السابق لنفس اليوم)
+@transaction.atomic
+def schedule_day(day):
+    trucks = list(Truck.objects.filter(is_active=True).order_by('id').values_list('id', 'capacity'))
+    trips, unscheduled = plan_day(day_pours(day), trucks)
+    DeliveryTrip.objects.filter(day=day).delete()
+    DeliveryTrip.objects.bulk_create([
+        DeliveryTrip(
+            day=day,
+            reservation_id=reservation_id,
+            truck_id=truck_id,
+            load_number=load_number,
+            quantity=quantity,
+            departure=_time(departure),
+            arrival=_time(arrival),
+            return_time=_time(returned),
+        )
+        for reservation_id, truck_id, load_number, quantity, departure, arrival, returned in trips
+    ], batch_size=1000)
+    return len(trips), unscheduled
+
+
+# جدول التسليم المحفوظ ليوم مجمعًا حسب الشاحنة، مع الصبّات غير المجدولة (الجديدة أو التي لم تتسع لها الشاحنات)
+def day_schedule(day):
+    trips = (
+        DeliveryTrip.objects.filter(day=day)
+        .select_related('truck', 'reservation')
+        .only(
+            'truck_id', 'load_number', 'quantity', 'departure', 'arrival', 'return_time',
+            'truck__name', 'truck__capacity',
+            'reservation__reservation_number', 'reservation__customer_name', 'reservation__site_location',
+            'reservation__concrete_type', 'reservation__concrete_quantity', 'reservation__phone_number',
+        )
+        .order_by('truck__name', 'departure')
+    )
+    schedule = {}
+    scheduled_ids = set()
+    for trip in trips:
+        schedule.setdefault(trip.truck, []).append(trip)
+        scheduled_ids.add(trip.reservation_id)
+    unscheduled = (
+        Reservation.objects.filter(status__in=SCHEDULED_STATUSES, pour_date=day)
+        .exclude(id__in=scheduled_ids)
+        .only('reservation_number', 'customer_name', 'site_location', 'concrete_quantity', 'estimated_distance')
+        .order_by('reservation_number')
+    )
+    return list(schedule.items()), list(unscheduled)
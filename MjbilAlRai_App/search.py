@@ -0,0 +1,120 @@
+# MjbilAlRai_App/search.py
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from .lookup_cache import DIGITS_TABLE, normalize_phone
+from .models import Reservation
+
+# الحقول النصية التي يشملها البحث (نفس ترتيب الفهرس في Postgres وجدول FTS5 في SQLite)
+SEARCH_TEXT_FIELDS = ('customer_name', 'carpenter_name', 'site_location')
+
+# إعدادات البحث النصي في Postgres: config بسيط دون تجذير (الأسماء العربية لا تحتاج إلى قاموس لغة)
+SEARCH_CONFIG = 'simple'
+
+# أقل عدد أرقام للبحث الجزئي في رقم الهاتف (فهرس trigram يحتاج إلى 3 أحرف على الأقل)
+MIN_PHONE_DIGITS = 3
+
+# جدول FTS5 في SQLite (محتوى خارجي من جدول الحجوزات مع مقسم trigram للبحث الجزئي)
+SQLITE_SEARCH_TABLE = 'reservation_search'
+SQLITE_SEARCH_FIELDS = SEARCH_TEXT_FIELDS + ('phone_number', 'reservation_number')
+
+
+def search_vector():
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector(*SEARCH_TEXT_FIELDS, config=SEARCH_CONFIG)
+
+
+# البحث في الحجوزات بالاسم أو النجار أو موقع الصب أو جزء من رقم الهاتف أو رقم الحجز
+# (Postgres: بحث نصي + تشابه trigram للأخطاء الإملائية، SQLite: جدول FTS5، غير ذلك: icontains)
+def search_reservations(queryset, query):
+    query = ' '.join((query or '').split())
+    if not query:
+        return queryset
+    if connection.vendor == 'postgresql':
+        return _postgres_search(queryset, query)
+    if connection.vendor == 'sqlite' and sqlite_search_installed():
+        return _sqlite_search(queryset, query)
+    return _fallback_search(queryset, query)
+
+
+def _number_filters(query):
+    filters = Q()
+    digits = normalize_phone(query).lstrip('+')
+    if len(digits) >= MIN_PHONE_DIGITS:
+        filters |= Q(phone_number__contains=digits)
+    number = query.translate(DIGITS_TABLE)
+    if number.isdigit():
+        filters |= Q(reservation_number__startswith=number)
+    return filters
+
+
+def _postgres_search(queryset, query):
+    from django.contrib.postgres.search import SearchQuery
+
+    # كل شرط يستخدم فهرس GIN خاص به (انظر 0014_reservation_search)، و OR بينها يُنفذ كـ BitmapOr
+    filters = Q(search_document=SearchQuery(query, config=SEARCH_CONFIG, search_type='plain'))
+    for field in SEARCH_TEXT_FIELDS:
+        filters |= Q(**{f'{field}__trigram_word_similar': query})
+    return queryset.annotate(search_document=search_vector()).filter(filters | _number_filters(query))
+
+
+# تحويل النص إلى استعلام FTS5: كل كلمة بين علامتي تنصيص (لا تُفسر كعوامل)، وجميع الكلمات مطلوبة
+def _fts5_query(query):
+    terms = [term for term in query.split() if len(term) >= MIN_PHONE_DIGITS]
+    return ' AND '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def _sqlite_search(queryset, query):
+    match = _fts5_query(query.translate(DIGITS_TABLE))
+    if not match:
+        # مقسم trigram لا يطابق الكلمات الأقصر من 3 أحرف
+        return _fallback_search(queryset, query)
+    matched_ids = RawSQL(f'SELECT rowid FROM {SQLITE_SEARCH_TABLE} WHERE {SQLITE_SEARCH_TABLE} MATCH %s', (match,))
+    return queryset.filter(id__in=matched_ids)
+
+
+def _fallback_search(queryset, query):
+    filters = Q()
+    for field in SEARCH_TEXT_FIELDS:
+        filters |= Q(**{f'{field}__icontains': query})
+    return queryset.filter(filters | _number_filters(query))
+
+
+def sqlite_search_installed():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SQLITE_SEARCH_TABLE])
+        return cursor.fetchone() is not None
+
+
+# إنشاء جدول FTS5 ومشغلات مزامنته مع جدول الحجوزات في SQLite (آمن للتكرار)
+# يُستدعى بعد كل migrate لأن SQLite يعيد إنشاء الجدول عند تعديل أعمدته فتُحذف المشغلات معه
+def install_sqlite_search(using=connection):
+    table = Reservation._meta.db_table
+    columns = ', '.join(SQLITE_SEARCH_FIELDS)
+    new_values = ', '.join(f'new.{field}' for field in SQLITE_SEARCH_FIELDS)
+    old_values = ', '.join(f'old.{field}' for field in SQLITE_SEARCH_FIELDS)
+    delete_old = (
+        f"INSERT INTO {SQLITE_SEARCH_TABLE}({SQLITE_SEARCH_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    )
+    insert_new = f"INSERT INTO {SQLITE_SEARCH_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});"
+    triggers = {
+        f'{SQLITE_SEARCH_TABLE}_ai': f'AFTER INSERT ON "{table}" BEGIN {insert_new} END',
+        f'{SQLITE_SEARCH_TABLE}_ad': f'AFTER DELETE ON "{table}" BEGIN {delete_old} END',
+        f'{SQLITE_SEARCH_TABLE}_au': f'AFTER UPDATE OF {columns} ON "{table}" BEGIN {delete_old} {insert_new} END',
+    }
+
+    with using.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)", list(triggers))
+        existing = {row[0] for row in cursor.fetchall()}
+        if len(existing) == len(triggers):
+            return False
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_SEARCH_TABLE} USING fts5("
+            f"{columns}, content='{table}', content_rowid='id', tokenize='trigram')"
+        )
+        for name, body in triggers.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+        # المشغلات كانت مفقودة، لذلك قد يكون الفهرس غير مطابق للجدول: إعادة بنائه بالكامل
+        cursor.execute(f"INSERT INTO {SQLITE_SEARCH_TABLE}({SQLITE_SEARCH_TABLE}) VALUES ('rebuild')")
+    return True
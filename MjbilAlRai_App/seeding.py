@@ -0,0 +1,107 @@
+# MjbilAlRai_App/seeding.py
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from .ledger import rebuild_ledger
+from .lookup_cache import clear_lookup_cache
+from .models import Payment, Reservation, derive_status
+from .numbering import allocate_reservation_numbers
+from .reporting import refresh_daily_summary
+
+CUSTOMER_NAMES = ['أحمد', 'محمد', 'خالد', 'سامر', 'رامي', 'ياسر', 'علي', 'حسن', 'عمر', 'فادي', 'مازن', 'وسيم']
+FAMILY_NAMES = ['الراعي', 'القصاص', 'الحسن', 'العلي', 'الخطيب', 'الشامي', 'النجار', 'الأحمد']
+SITE_LOCATIONS = ['حمص', 'حماة', 'دمشق', 'طرطوس', 'اللاذقية', 'حلب', 'القصير', 'تلكلخ']
+
+# توزيع الحالات: (نسبة، موافقة، رفض، تأكيد، اكتمال)
+STATUS_MIX = [
+    (0.25, False, False, False, False),  # معلق
+    (0.20, True, False, False, False),   # مقبول
+    (0.10, False, True, False, False),   # مرفوض
+    (0.15, True, False, True, False),    # مؤكد غير مكتمل
+    (0.30, True, False, True, True),     # مكتمل
+]
+
+SEED_BATCH_SIZE = 2000
+
+
+# أرقام هواتف بتوزيع منحرف: عدد قليل من العملاء يملك معظم الحجوزات
+def _phone_pool(rng, size):
+    return [f"09{rng.randint(10000000, 99999999)}" for _ in range(size)]
+
+
+def _pick_phone(rng, phones):
+    # توزيع باريتو: الفهرس الأصغر أكثر تكرارًا
+    index = min(int(rng.paretovariate(1.2)) - 1, len(phones) - 1)
+    return phones[index]
+
+
+def _pick_status(rng):
+    value = rng.random()
+    for weight, *flags in STATUS_MIX:
+        if value < weight:
+            return flags
+        value -= weight
+    return STATUS_MIX[-1][1:]
+
+
+def build_reservation(rng, phones, number, today):
+    is_approved, is_rejected, is_confirmed, is_completed = _pick_status(rng)
+    reservation_date = today - timedelta(days=rng.randint(0, 365))
+    quantity = Decimal(rng.randint(10, 4000)) / 10
+    reservation = Reservation(
+        customer_name=f"{rng.choice(CUSTOMER_NAMES)} {rng.choice(FAMILY_NAMES)}",
+        carpenter_name=f"{rng.choice(CUSTOMER_NAMES)} {rng.choice(FAMILY_NAMES)}",
+        concrete_type=rng.choice(Reservation.CONCRETE_CHOICES)[0],
+        concrete_quantity=quantity,
+        site_location=rng.choice(SITE_LOCATIONS),
+        estimated_distance=Decimal(rng.randint(10, 800)) / 10,
+        phone_number=_pick_phone(rng, phones),
+        reservation_number=number,
+        is_approved=is_approved,
+        is_rejected=is_rejected,
+        is_confirmed=is_confirmed,
+        is_completed=is_completed,
+        reservation_date=reservation_date,
+        approval_date=reservation_date + timedelta(days=rng.randint(0, 5)) if is_approved else None,
+    )
+
+    # القيم المالية للحجوزات المؤكدة
+    if is_confirmed:
+        reservation.price_per_unit = Decimal(rng.randint(4000, 9000)) / 100
+        reservation.discount = Decimal(rng.choice([0, 0, 0, 50, 100, 250]))
+        reservation.total_cost = reservation.price_per_unit * quantity
+        due = reservation.total_cost - reservation.discount
+        reservation.payments = due if is_completed else (due * Decimal(rng.choice([0, 25, 50, 75])) / 100).quantize(Decimal('0.01'))
+        reservation.remaining_balance = reservation.total_cost - reservation.discount - reservation.payments
+        if is_completed:
+            reservation.completion_date = reservation.approval_date + timedelta(days=rng.randint(0, 10))
+
+    # نفس منطق الحالة في Reservation.save()
+    reservation.status = derive_status(is_approved, is_rejected, is_confirmed, is_completed)
+    return reservation
+
+
+# إنشاء عدد كبير من الحجوزات الواقعية عبر bulk_create ثم إعادة بناء ملخص الدفتر والملخص اليومي
+def seed_reservations(count, seed=None, phones_count=None):
+    rng = random.Random(seed)
+    phones = _phone_pool(rng, phones_count or max(10, count // 5))
+    numbers = allocate_reservation_numbers(count)
+    today = date.today()
+
+    created = 0
+    for start in range(0, count, SEED_BATCH_SIZE):
+        batch = [build_reservation(rng, phones, number, today) for number in numbers[start:start + SEED_BATCH_SIZE]]
+        Reservation.objects.bulk_create(batch, batch_size=SEED_BATCH_SIZE)
+        # دفعة افتتاحية لكل حجز مدفوع حتى يطابق سجل الدفعات الحقل المخزن
+        Payment.objects.bulk_create([
+            Payment(reservation=reservation, phone_number=reservation.phone_number, amount=reservation.payments, method=Payment.METHOD_OPENING)
+            for reservation in batch
+            if reservation.payments
+        ], batch_size=SEED_BATCH_SIZE)
+        created += len(batch)
+
+    rebuild_ledger()
+    refresh_daily_summary()
+    clear_lookup_cache()
+    return created
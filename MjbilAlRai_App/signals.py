@@ -0,0 +1,77 @@
+# MjbilAlRai_App/signals.py
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from .ledger import apply_ledger_delta
+from .lookup_cache import invalidate_lookups
+from .models import DistanceSurcharge, Payment, PriceList, PriceListRate, Reservation
+from .reporting import apply_report_delta
+from .tariffs import invalidate_tariffs
+
+
+# تحديث ملخص الدفتر بالفرق بين الحالة المخزنة سابقًا والحالة الجديدة بعد الحفظ
+@receiver(post_save, sender=Reservation)
+def update_ledger_on_save(sender, instance, **kwargs):
+    new_state = instance.ledger_contribution()
+    apply_ledger_delta(getattr(instance, '_ledger_state', None), new_state)
+    instance._ledger_state = new_state
+
+
+# الحجوزات المحملة جزئيًا (مثل قائمة لوحة الإدارة) تقرأ حالتها المخزنة قبل حذف الصف
+@receiver(pre_delete, sender=Reservation)
+def load_stored_state_before_delete(sender, instance, **kwargs):
+    instance.ensure_stored_state()
+
+
+# طرح مساهمة الحجز من ملخص الدفتر عند حذفه
+@receiver(post_delete, sender=Reservation)
+def update_ledger_on_delete(sender, instance, **kwargs):
+    apply_ledger_delta(getattr(instance, '_ledger_state', None), None)
+
+
+# تحديث الملخص اليومي للتقارير بنفس الطريقة (الحجز قد ينتقل إلى يوم صب أو حالة أخرى)
+@receiver(post_save, sender=Reservation)
+def update_report_summary_on_save(sender, instance, **kwargs):
+    new_state = instance.report_contribution()
+    apply_report_delta(getattr(instance, '_report_state', None), new_state)
+    instance._report_state = new_state
+
+
+@receiver(post_delete, sender=Reservation)
+def update_report_summary_on_delete(sender, instance, **kwargs):
+    apply_report_delta(getattr(instance, '_report_state', None), None)
+
+
+# نسخة رقم الهاتف في سجل الدفعات تتبع رقم هاتف الحجز
+# (يجب أن يبقى قبل invalidate_lookup_cache لأنه يقرأ رقم الهاتف المخزن قبل تحديثه)
+@receiver(post_save, sender=Reservation)
+def sync_payment_phone_number(sender, instance, created, **kwargs):
+    old_phone = getattr(instance, '_lookup_state', (None, None))[0]
+    if not created and old_phone and old_phone != instance.__dict__.get('phone_number', old_phone):
+        Payment.objects.filter(reservation_id=instance.id).update(phone_number=instance.phone_number)
+
+
+# إبطال نتائج البحث العامة للقيم القديمة والجديدة لرقم الهاتف ورقم الحجز
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def invalidate_lookup_cache(sender, instance, **kwargs):
+    old_phone, old_number = getattr(instance, '_lookup_state', (None, None))
+    # الحقل المؤجل لم يتغير (ولا يمكن تحميله بعد حذف الصف)، لذلك قيمته هي القيمة المخزنة
+    phone_number = instance.__dict__.get('phone_number', old_phone)
+    reservation_number = instance.__dict__.get('reservation_number', old_number)
+    invalidate_lookups(
+        phones=(old_phone, phone_number),
+        numbers=(old_number, reservation_number),
+    )
+    instance._lookup_state = (phone_number, reservation_number)
+
+
+# أي تعديل على قوائم الأسعار يبطل التعرفة المحملة في ذاكرة جميع العمليات
+@receiver(post_save, sender=PriceList)
+@receiver(post_delete, sender=PriceList)
+@receiver(post_save, sender=PriceListRate)
+@receiver(post_delete, sender=PriceListRate)
+@receiver(post_save, sender=DistanceSurcharge)
+@receiver(post_delete, sender=DistanceSurcharge)
+def invalidate_tariff_cache(sender, **kwargs):
+    invalidate_tariffs()
@@ -0,0 +1,138 @@
+# MjbilAlRai_App/tariffs.py
+
+from datetime import date
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Q, Value, When
+from django.utils import timezone
+from .ledger import GROUPS_BATCH_SIZE
+from .lookup_cache import bump, versioned_key
+from .models import PriceList, Reservation
+from .recalculation import recalculate_reservations
+from .reporting import apply_report_groups, report_groups
+
+# نوع حقل السعر للوحدة (مطابق لـ Reservation.price_per_unit)
+PRICE_FIELD = DecimalField(max_digits=10, decimal_places=2)
+
+# مساحة مفاتيح التعرفة في ذاكرة البحث المشتركة بين العمليات (إصدارها يتغير عند أي تعديل على قوائم الأسعار)
+TARIFF_NAMESPACE = 'tariff:price_lists'
+
+# قوائم الأسعار المحملة في ذاكرة العملية مع مفتاح إصدارها: لا استعلامات عند التسعير ما دام الإصدار لم يتغير
+_loaded = {'key': None, 'price_lists': ()}
+
+
+# قوائم الأسعار المفعلة من قاعدة البيانات: (سارية من، سارية حتى، {العيار: السعر}، [(من مسافة، الإضافة)])
+# مرتبة من الأحدث إلى الأقدم، والشرائح من الأبعد إلى الأقرب (أول شريحة مطابقة هي الصحيحة)
+def load_price_lists():
+    price_lists = PriceList.objects.filter(is_active=True).prefetch_related('rates', 'surcharges').order_by('-valid_from', '-id')
+    return tuple(
+        (
+            price_list.valid_from,
+            price_list.valid_to,
+            {rate.concrete_type: rate.price_per_unit for rate in price_list.rates.all()},
+            sorted(((band.from_distance, band.surcharge_per_unit) for band in price_list.surcharges.all()), reverse=True),
+        )
+        for price_list in price_lists
+    )
+
+
+# يُقرأ الإصدار قبل تحميل القوائم، فالتعديل أثناء التحميل يغير الإصدار ويعيد التحميل في الطلب التالي
+# (والإصدار المفقود من الذاكرة المشتركة يُستبدل بإصدار جديد، فيعيد التحميل أيضًا)
+def price_lists():
+    key = versioned_key(TARIFF_NAMESPACE)
+    if _loaded['key'] != key:
+        _loaded.update(key=key, price_lists=load_price_lists())
+    return _loaded['price_lists']
+
+
+# إبطال قوائم الأسعار المحملة في جميع العمليات بعد نجاح المعاملة الحالية
+def invalidate_tariffs():
+    transaction.on_commit(lambda: bump(TARIFF_NAMESPACE))
+
+
+# قائمة الأسعار السارية في تاريخ معين (الأحدث بدايةً)
+def price_list_for(on_date=None):
+    on_date = on_date or date.today()
+    for price_list in price_lists():
+        valid_from, valid_to = price_list[:2]
+        if valid_from <= on_date and (valid_to is None or on_date <= valid_to):
+            return price_list
+    return None
+
+
+def _surcharge(bands, distance):
+    for from_distance, surcharge in bands:
+        if distance is not None and distance >= from_distance:
+            return surcharge
+    return Decimal(0)
+
+
+# السعر للوحدة حسب العيار والمسافة وتاريخ الحجز (None إذا لم تحدد التعرفة سعرًا لهذا العيار)
+def quote_price(concrete_type, distance, on_date=None):
+    price_list = price_list_for(on_date)
+    if price_list is None:
+        return None
+    rates, bands = price_list[2:]
+    price = rates.get(concrete_type)
+    if price is None:
+        return None
+    return price + _surcharge(bands, Decimal(distance) if distance is not None else None)
+
+
+# أسعار القائمة السارية اليوم لحساب السعر في المتصفح دون طلبات إضافية (صفحة الحجز الجديد)
+def tariff_table(on_date=None):
+    price_list = price_list_for(on_date)
+    if price_list is None:
+        return None
+    rates, bands = price_list[2:]
+    return {
+        'rates': {concrete_type: str(price) for concrete_type, price in rates.items()},
+        'bands': [[str(from_distance), str(surcharge)] for from_distance, surcharge in bands],
+    }
+
+
+# تعبير SQL يحسب سعر التعرفة لكل حجز من تاريخه وعياره ومسافته (NULL إذا لم تحدد التعرفة سعرًا)
+# نفس ترتيب quote_price: أحدث قائمة سارية في تاريخ الحجز، ثم أبعد شريحة لا تتجاوز مسافة الحجز
+def price_expression():
+    whens = []
+    for valid_from, valid_to, rates, bands in price_lists():
+        in_range = Q(reservation_date__gte=valid_from)
+        if valid_to is not None:
+            in_range &= Q(reservation_date__lte=valid_to)
+        for concrete_type, price in rates.items():
+            for from_distance, surcharge in bands:
+                whens.append(When(in_range & Q(concrete_type=concrete_type, estimated_distance__gte=from_distance), then=Value(price + surcharge)))
+            whens.append(When(in_range & Q(concrete_type=concrete_type), then=Value(price)))
+        # العيار غير موجود في القائمة السارية: لا سعر (دون الرجوع إلى قائمة أقدم)
+        whens.append(When(in_range, then=Value(None)))
+    if not whens:
+        return None
+    return Case(*whens, default=Value(None), output_field=PRICE_FIELD)
+
+
+# إعادة تسعير الحجوزات المعلقة حسب التعرفة باستعلام UPDATE لكل دفعة، ثم إعادة حساب التكلفة والمتبقي لها
+# (الحجوزات المعلقة خارج ملخص الدفتر، لكن الملخص اليومي للتقارير يُعدّل بفرق مساهماتها)
+def reprice_pending(queryset=None):
+    queryset = Reservation.objects.all() if queryset is None else queryset
+    pending = queryset.filter(status=Reservation.STATUS_PENDING)
+    price = price_expression()
+    if price is None:
+        return 0
+    with transaction.atomic():
+        changed = (
+            pending.annotate(tariff_price=price)
+            .filter(tariff_price__isnull=False)
+            .filter(Q(price_per_unit__isnull=True) | ~Q(price_per_unit=F('tariff_price')))
+        )
+        ids = list(changed.select_for_update().order_by('id').values_list('id', flat=True))
+        if not ids:
+            return 0
+        before = report_groups(ids)
+        repriced = 0
+        now = timezone.now()
+        for start in range(0, len(ids), GROUPS_BATCH_SIZE):
+            batch = ids[start:start + GROUPS_BATCH_SIZE]
+            repriced += Reservation.objects.filter(id__in=batch).update(price_per_unit=price, updated_at=now)
+        apply_report_groups(before, report_groups(ids))
+        recalculate_reservations(pending)
+    return repriced
@@ -1,3 +1,1194 @@
-from django.test import TestCase
+from datetime import date, time, timedelta
+from decimal import Decimal
+import csv
+from importlib import import_module
+import json
+import os
+import re
+import tempfile
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.core.management import call_command
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import AnonymousUser, User
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+from tablib import Dataset
+from . import async_views, views
+from .admin import ReservationAdmin
+from .bulk import bulk_approve, bulk_confirm, bulk_reject
+from .export_jobs import claim_next_job, purge_old_exports, request_export, requeue_stale_jobs, run_job
+from .exports import (
+    CSV_CONTENT_TYPE, JSONL_CONTENT_TYPE, RESERVATIONS_EXPORT, TOTAL_LABEL, XLSX_CONTENT_TYPE, Column, ExportSpec,
+    format_bool, format_date, format_status, iter_csv, iter_rows, write_export,
+)
+from .fragments import ROW_KEY_FIELDS, clear_fragment_cache, fragment_key, render_reservation_rows
+from .instrumentation import BudgetExceeded, PerformanceMiddleware
+from .ledger import LEDGER_FIELDS, delete_reservations, ledger_groups, rebuild_ledger
+from .lookup_cache import bump, clear_lookup_cache, lookup_cache, phone_lookup, reservation_number_lookup, versioned_key
+from .models import (
+    DailyReportSummary, ExportJob, InvalidStatusTransition, LedgerSummary, Payment, PriceList, PriceListRate, Reservation,
+)
+from .numbering import (
+    NUMBER_MIN, NUMBER_SPACE, allocate_reservation_number, allocate_reservation_numbers, allocator_status, index_for_number,
+    number_for_index, permute,
+)
+from .pagination import keyset_paginate
+from .payments import PaymentExceedsBalance, customer_payment_history, payment_mismatches, record_payment, save_financial_details
+from .recalculation import recalculate_reservations
+from .reporting import REPORT_FIELDS, refresh_daily_summary, report_rows, report_totals
+from .resources import ReservationResource
+from .scheduling import LOADING_MINUTES, WORKDAY_END, WORKDAY_START, day_pours, plan_day
+from .search import SQLITE_SEARCH_TABLE, install_sqlite_search, search_reservations, sqlite_search_installed
+from .tariffs import TARIFF_NAMESPACE, quote_price, reprice_pending
 
-# Create your tests here.
+
+# حجز تجريبي بسعر 50 وكمية 10 (إجمالي 500) مع إمكانية تغيير أي حقل
+def make_reservation(**fields):
+    values = {
+        'customer_name': 'عميل تجريبي',
+        'carpenter_name': 'نجار',
+        'concrete_type': '250',
+        'concrete_quantity': Decimal('10'),
+        'site_location': 'الموقع',
+        'estimated_distance': Decimal('12'),
+        'phone_number': '0791234567',
+        'price_per_unit': Decimal('50'),
+    }
+    values.update(fields)
+    return Reservation.objects.create(**values)
+
+
+class RecordPaymentTests(TestCase):
+    def test_overpayment_is_rejected(self):
+        reservation = make_reservation(is_approved=True)
+        with self.assertRaises(PaymentExceedsBalance):
+            record_payment(reservation.id, Decimal('500.01'))
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.payments, Decimal(0))
+        self.assertFalse(reservation.payment_entries.exists())
+
+    def test_full_payment_completes_confirmed_reservation(self):
+        reservation = make_reservation(is_approved=True, is_confirmed=True)
+        record_payment(reservation.id, Decimal('200'))
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, Reservation.STATUS_CONFIRMED)
+        self.assertEqual(reservation.remaining_balance, Decimal('300'))
+
+        record_payment(reservation.id, Decimal('300'))
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, Reservation.STATUS_COMPLETED)
+        self.assertIsNotNone(reservation.completion_date)
+        self.assertEqual(reservation.remaining_balance, Decimal(0))
+
+    # السداد الكامل لحجز معلق كان يحاول الانتقال من "معلق" إلى "مكتمل" ويسبب خطأ 500
+    def test_full_payment_keeps_pending_reservation_pending(self):
+        reservation = make_reservation()
+        record_payment(reservation.id, Decimal('500'))
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, Reservation.STATUS_PENDING)
+        self.assertEqual(reservation.remaining_balance, Decimal(0))
+        self.assertIsNone(reservation.completion_date)
+
+    # الحجز المقبول لم تُسجل كمياته النهائية بعد: السداد لا يكمله، ويكتمل عند تأكيده
+    def test_full_payment_keeps_approved_reservation_until_confirmed(self):
+        reservation = make_reservation(is_approved=True)
+        record_payment(reservation.id, Decimal('500'))
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, Reservation.STATUS_APPROVED)
+        self.assertFalse(reservation.is_confirmed)
+        self.assertEqual(ledger_rows(), {})
+
+        bulk_confirm([reservation.id])
+        self.assertEqual(Reservation.objects.get(id=reservation.id).status, Reservation.STATUS_COMPLETED)
+
+    def test_approved_reservation_cannot_be_completed_directly(self):
+        reservation = make_reservation(is_approved=True)
+        reservation.is_completed = True
+        with self.assertRaises(InvalidStatusTransition):
+            reservation.save()
+
+
+class PaymentLedgerTests(TestCase):
+    # كشف الحساب يجمع دفعات جميع حجوزات الرقم بترتيب التسجيل باستعلام واحد
+    def test_customer_payment_history_spans_reservations(self):
+        first = make_reservation(is_approved=True)
+        second = make_reservation(is_approved=True)
+        other = make_reservation(is_approved=True, phone_number='0780000000')
+        record_payment(first.id, Decimal('100'))
+        record_payment(second.id, Decimal('50'), method=Payment.METHOD_TRANSFER)
+        record_payment(other.id, Decimal('70'))
+        record_payment(first.id, Decimal('25'))
+
+        with self.assertNumQueries(1):
+            history = [(entry.reservation.reservation_number, entry.amount) for entry in customer_payment_history('0791234567')]
+        self.assertEqual(history, [
+            (first.reservation_number, Decimal('100')),
+            (second.reservation_number, Decimal('50')),
+            (first.reservation_number, Decimal('25')),
+        ])
+
+    # تغيير رقم هاتف الحجز ينقل دفعاته إلى كشف حساب الرقم الجديد
+    def test_history_follows_phone_change(self):
+        reservation = make_reservation(is_approved=True)
+        record_payment(reservation.id, Decimal('100'))
+        reservation.refresh_from_db()
+        reservation.phone_number = '0780000000'
+        reservation.save()
+        self.assertFalse(customer_payment_history('0791234567').exists())
+        self.assertEqual(customer_payment_history('0780000000').count(), 1)
+
+    def test_financial_form_records_adjustment_entry(self):
+        reservation = make_reservation(is_approved=True, is_confirmed=True)
+        form = save_financial_details(reservation.id, {
+            'price_per_unit': '50', 'discount': '0', 'payments': '120', 'concrete_quantity': '10', 'concrete_type': '250',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        entry = reservation.payment_entries.get()
+        self.assertEqual((entry.method, entry.amount), (Payment.METHOD_ADJUSTMENT, Decimal('120')))
+        self.assertFalse(payment_mismatches().exists())
+
+    def test_reconcile_payments_reports_and_fixes_mismatches(self):
+        reservation = make_reservation(is_approved=True)
+        record_payment(reservation.id, Decimal('100'))
+        Reservation.objects.filter(id=reservation.id).update(payments=Decimal('160'))
+
+        out = StringIO()
+        call_command('reconcile_payments', stdout=out)
+        self.assertIn(f"{reservation.reservation_number}: المخزن 160", out.getvalue())
+        self.assertEqual(reservation.payment_entries.count(), 1)
+
+        call_command('reconcile_payments', '--fix', stdout=StringIO())
+        adjustment = reservation.payment_entries.get(method=Payment.METHOD_ADJUSTMENT)
+        self.assertEqual(adjustment.amount, Decimal('60'))
+        self.assertFalse(payment_mismatches().exists())
+
+        out = StringIO()
+        call_command('reconcile_payments', stdout=out)
+        self.assertIn("سجل الدفعات مطابق لجميع الحجوزات", out.getvalue())
+
+    # ترحيل 0010: مجموع الدفعات المخزن لكل حجز يصبح دفعة "رصيد افتتاحي"، والتراجع يحذفها
+    def test_opening_balance_migration(self):
+        migration = import_module('MjbilAlRai_App.migrations.0010_payment')
+        paid = make_reservation(payments=Decimal('200'))
+        make_reservation()
+        migration.create_opening_balances(django_apps, None)
+        entry = Payment.objects.get()
+        self.assertEqual(
+            (entry.reservation_id, entry.phone_number, entry.amount, entry.method),
+            (paid.id, paid.phone_number, Decimal('200'), Payment.METHOD_OPENING),
+        )
+        self.assertFalse(payment_mismatches().exists())
+
+        migration.remove_opening_balances(django_apps, None)
+        self.assertFalse(Payment.objects.exists())
+
+
+# صفوف ملخص الدفتر غير الصفرية: {(الحالة، نوع الخرسانة): (العدد، الإجمالي، الخصم، الدفعات، المتبقي)}
+def ledger_rows():
+    return {
+        (row['status'], row['concrete_type']): tuple(row[field] for field in LEDGER_FIELDS)
+        for row in LedgerSummary.objects.values('status', 'concrete_type', *LEDGER_FIELDS)
+        if any(row[field] for field in LEDGER_FIELDS)
+    }
+
+
+class LedgerTests(TestCase):
+    # الملخص المحدث بالفروقات يجب أن يطابق إعادة البناء الكاملة من جدول الحجوزات
+    def assertLedgerConsistent(self):
+        incremental = ledger_rows()
+        rebuild_ledger()
+        self.assertEqual(incremental, ledger_rows())
+
+    def test_save_updates_ledger(self):
+        reservation = make_reservation(is_approved=True, is_confirmed=True, discount=Decimal('20'))
+        make_reservation(concrete_type='300', is_approved=True)
+        self.assertEqual(ledger_rows(), {
+            (Reservation.STATUS_CONFIRMED, '250'): (1, Decimal('500'), Decimal('20'), Decimal(0), Decimal('480')),
+        })
+
+        reservation.concrete_quantity = Decimal('12')
+        reservation.payments = Decimal('100')
+        reservation.save()
+        self.assertLedgerConsistent()
+
+        reservation.is_completed = True
+        reservation.save()
+        self.assertEqual(set(ledger_rows()), {(Reservation.STATUS_COMPLETED, '250')})
+        self.assertLedgerConsistent()
+
+    def test_delete_updates_ledger(self):
+        make_reservation(is_approved=True, is_confirmed=True)
+        second = make_reservation(is_approved=True, is_confirmed=True)
+        second.delete()
+        self.assertEqual(ledger_rows()[(Reservation.STATUS_CONFIRMED, '250')][0], 1)
+
+        # حجز محمّل جزئيًا (مثل قائمة لوحة الإدارة) يطرح مساهمته المخزنة أيضًا
+        Reservation.objects.only('id').get().delete()
+        self.assertEqual(ledger_rows(), {})
+
+    def test_admin_bulk_delete_uses_constant_queries(self):
+        def delete_selected(count):
+            ids = [make_reservation(concrete_type=concrete_type, is_approved=True, is_confirmed=True).id for concrete_type in ('250', '300') * count]
+            queryset = Reservation.objects.filter(id__in=ids).only('id', *ReservationAdmin.list_display)
+            with CaptureQueriesContext(connection) as queries:
+                ReservationAdmin(Reservation, admin.site).delete_queryset(None, queryset)
+            return len(queries)
+
+        # عدد الاستعلامات لا يزيد مع عدد الحجوزات المحذوفة
+        make_reservation(is_approved=True, is_confirmed=True)
+        self.assertEqual(delete_selected(1), delete_selected(4))
+        self.assertEqual(ledger_rows()[(Reservation.STATUS_CONFIRMED, '250')][0], 1)
+        self.assertLedgerConsistent()
+
+    def test_bulk_actions_update_ledger(self):
+        ids = [make_reservation(concrete_type=concrete_type).id for concrete_type in ('250', '250', '300', '350')]
+        bulk_reject(ids[3:])
+        bulk_approve(ids[:3])
+        self.assertEqual(ledger_rows(), {})
+
+        bulk_confirm(ids[:3])
+        self.assertEqual(sum(row[0] for row in ledger_rows().values()), 3)
+        self.assertLedgerConsistent()
+
+
+def report_summary_rows():
+    return {
+        (row['day'], row['concrete_type'], row['status']): tuple(row[field] for field in REPORT_FIELDS)
+        for row in DailyReportSummary.objects.values('day', 'concrete_type', 'status', *REPORT_FIELDS)
+        if row['reservations_count']
+    }
+
+
+class DailyReportTests(TestCase):
+    # الملخص اليومي المحدث بالفروقات يجب أن يطابق إعادة الحساب الكاملة من جدول الحجوزات
+    def assertSummaryConsistent(self):
+        incremental = report_summary_rows()
+        refresh_daily_summary()
+        self.assertEqual(incremental, report_summary_rows())
+
+    def test_reservations_are_reported_on_pour_day(self):
+        make_reservation(reservation_date=date(2024, 6, 1), pour_date=date(2024, 6, 10))
+        make_reservation(reservation_date=date(2024, 6, 1))
+        self.assertEqual(report_summary_rows(), {
+            (date(2024, 6, 10), '250', Reservation.STATUS_PENDING): (1, Decimal('10'), Decimal('500'), Decimal(0), Decimal(0), Decimal('500')),
+            (date(2024, 6, 1), '250', Reservation.STATUS_PENDING): (1, Decimal('10'), Decimal('500'), Decimal(0), Decimal(0), Decimal('500')),
+        })
+        self.assertSummaryConsistent()
+
+    def test_save_moves_reservation_to_new_day_and_status(self):
+        reservation = make_reservation(reservation_date=date(2024, 6, 1))
+        reservation.is_approved = True
+        reservation.pour_date = '2024-06-15'
+        reservation.save()
+        self.assertEqual(set(report_summary_rows()), {(date(2024, 6, 15), '250', Reservation.STATUS_APPROVED)})
+
+        reservation.is_confirmed = True
+        reservation.payments = Decimal('200')
+        reservation.save()
+        self.assertEqual(report_summary_rows()[(date(2024, 6, 15), '250', Reservation.STATUS_CONFIRMED)][4], Decimal('200'))
+        self.assertSummaryConsistent()
+
+        reservation.delete()
+        self.assertEqual(report_summary_rows(), {})
+
+    def test_bulk_paths_update_summary(self):
+        ids = [make_reservation(reservation_date=date(2024, 6, 1), concrete_type=concrete_type).id for concrete_type in ('250', '250', '300')]
+        bulk_approve(ids[:2], pour_date=date(2024, 6, 20))
+        bulk_reject(ids[2:])
+        self.assertEqual(report_summary_rows()[(date(2024, 6, 20), '250', Reservation.STATUS_APPROVED)][0], 2)
+        self.assertSummaryConsistent()
+
+        bulk_confirm(ids[:2])
+        delete_reservations(Reservation.objects.filter(id=ids[0]))
+        self.assertEqual(report_summary_rows()[(date(2024, 6, 20), '250', Reservation.STATUS_CONFIRMED)][0], 1)
+        self.assertSummaryConsistent()
+
+    # حالة مخزنة قديمة (علامات كُتبت مباشرة في قاعدة البيانات) تُصحح بالتحديث الجماعي وينتقل الحجز في الملخص
+    def test_recalculation_updates_summary(self):
+        reservation = make_reservation(reservation_date=date(2024, 6, 1), is_approved=True, is_confirmed=True)
+        Reservation.objects.filter(id=reservation.id).update(is_completed=True)
+        self.assertEqual(recalculate_reservations(), 1)
+        self.assertEqual(set(report_summary_rows()), {(date(2024, 6, 1), '250', Reservation.STATUS_COMPLETED)})
+        self.assertSummaryConsistent()
+
+    def test_repricing_updates_summary(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            price_list = PriceList.objects.create(name='قائمة', valid_from=date(2024, 1, 1))
+            PriceListRate.objects.create(price_list=price_list, concrete_type='250', price_per_unit=Decimal('60'))
+        make_reservation(reservation_date=date(2024, 6, 1))
+        self.assertEqual(reprice_pending(), 1)
+        self.assertEqual(report_summary_rows()[(date(2024, 6, 1), '250', Reservation.STATUS_PENDING)][2], Decimal('600'))
+        self.assertSummaryConsistent()
+
+    def test_refresh_range_keeps_other_days(self):
+        make_reservation(pour_date=date(2024, 6, 1))
+        make_reservation(pour_date=date(2024, 6, 5))
+        DailyReportSummary.objects.update(reservations_count=7)
+        self.assertEqual(refresh_daily_summary(date(2024, 6, 5), date(2024, 6, 5)), 1)
+        counts = dict(DailyReportSummary.objects.values_list('day', 'reservations_count'))
+        self.assertEqual(counts, {date(2024, 6, 1): 7, date(2024, 6, 5): 1})
+
+    def test_report_rows_group_by_period_and_filter_status(self):
+        make_reservation(pour_date=date(2024, 6, 3), discount=Decimal('50'))
+        make_reservation(pour_date=date(2024, 6, 20), concrete_quantity=Decimal('5'))
+        rejected = make_reservation(pour_date=date(2024, 6, 21))
+        rejected.is_rejected = True
+        rejected.save()
+
+        rows = report_rows('month', date(2024, 6, 1), date(2024, 6, 30), Reservation.STATUS_PENDING)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['total_reservations_count'], 2)
+        self.assertEqual(rows[0]['total_volume'], Decimal('15.00'))
+        self.assertEqual(rows[0]['total_revenue'], Decimal('700.00'))
+        self.assertEqual(rows[0]['status_label'], dict(Reservation.STATUS_CHOICES)[Reservation.STATUS_PENDING])
+
+        # الحجز الذي انتقل إلى حالة أخرى لا يترك صفًا بعدد صفر في التقرير اليومي
+        rows = report_rows('day', date(2024, 6, 1), date(2024, 6, 30))
+        self.assertEqual([(row['period'], row['status']) for row in rows], [
+            (date(2024, 6, 21), Reservation.STATUS_REJECTED),
+            (date(2024, 6, 20), Reservation.STATUS_PENDING),
+            (date(2024, 6, 3), Reservation.STATUS_PENDING),
+        ])
+        self.assertEqual(report_totals(rows)['total_reservations_count'], 3)
+
+
+class ConfirmationTests(TestCase):
+    def setUp(self):
+        self.paid = make_reservation(is_approved=True, payments=Decimal('500'))
+        self.unpaid = make_reservation(is_approved=True, payments=Decimal('100'))
+        self.unpriced = make_reservation(is_approved=True, price_per_unit=None)
+
+    def statuses(self):
+        return [Reservation.objects.get(id=reservation.id).status for reservation in (self.paid, self.unpaid, self.unpriced)]
+
+    # التأكيد الجماعي يطبق قاعدة الاكتمال لكل صف: المسدد بالكامل يكتمل والبقية تبقى مؤكدة
+    def test_bulk_confirm_completes_fully_paid_only(self):
+        bulk_confirm([self.paid.id, self.unpaid.id, self.unpriced.id])
+        self.assertEqual(self.statuses(), [Reservation.STATUS_COMPLETED, Reservation.STATUS_CONFIRMED, Reservation.STATUS_CONFIRMED])
+        self.assertIsNotNone(Reservation.objects.get(id=self.paid.id).completion_date)
+        self.assertIsNone(Reservation.objects.get(id=self.unpaid.id).completion_date)
+
+    def test_single_confirm_follows_the_same_rule(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='password'))
+        for reservation in (self.paid, self.unpaid, self.unpriced):
+            self.client.post(reverse('confirm_reservations'), {
+                'reservation_id': reservation.id,
+                'concrete_quantity': '10',
+                'concrete_type': '250',
+                'is_completed': 'true',
+            })
+        self.assertEqual(self.statuses(), [Reservation.STATUS_COMPLETED, Reservation.STATUS_CONFIRMED, Reservation.STATUS_CONFIRMED])
+
+        # السداد الكامل بعد التأكيد يكمل الحجز
+        record_payment(self.unpaid.id, Decimal('400'))
+        self.assertEqual(Reservation.objects.get(id=self.unpaid.id).status, Reservation.STATUS_COMPLETED)
+
+
+class XlsxExportTests(TestCase):
+    def setUp(self):
+        self.first = make_reservation(payments=Decimal('100'))
+        self.second = make_reservation(discount=Decimal('50'), reservation_date=date(2024, 6, 1))
+        self.client.force_login(User.objects.create_superuser('admin', password='password'))
+
+    def load_sheet(self, response):
+        workbook = load_workbook(BytesIO(b''.join(response.streaming_content)), read_only=True)
+        return workbook[RESERVATIONS_EXPORT.sheet_title]
+
+    def test_view_streams_workbook_with_totals_row(self):
+        response = self.client.get(reverse('export_reservations'))
+        self.assertEqual(response['Content-Type'], XLSX_CONTENT_TYPE)
+        rows = list(self.load_sheet(response).values)
+        headers = [column.header for column in RESERVATIONS_EXPORT.columns]
+        self.assertEqual(list(rows[0]), headers)
+        self.assertEqual([row[0] for row in rows[1:3]], [self.first.reservation_number, self.second.reservation_number])
+        self.assertEqual(rows[2][headers.index('تاريخ الحجز')], '2024-06-01')
+
+        # صف فارغ ثم صف الإجماليات: المدفوعات والمتبقي تحت أعمدتهما والعنوان تحت إجمالي التكلفة
+        self.assertTrue(all(value is None for value in rows[3]))
+        totals = rows[4]
+        self.assertEqual(totals[headers.index('إجمالي التكلفة')], TOTAL_LABEL)
+        self.assertEqual(Decimal(str(totals[headers.index('مجموع الدفعات المدفوعة')])), Decimal('100'))
+        self.assertEqual(Decimal(str(totals[headers.index('المبلغ المتبقي')])), Decimal('850'))
+
+    def test_admin_action_exports_selected_reservations(self):
+        request = RequestFactory().post('/')
+        queryset = Reservation.objects.filter(id=self.second.id)
+        response = ReservationAdmin(Reservation, admin.site).export_as_excel(request, queryset)
+        rows = list(self.load_sheet(response).values)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][0], self.second.reservation_number)
+
+    # الصفوف تُقرأ على دفعات: عدد الاستعلامات لا يزيد مع عدد الحجوزات
+    def test_query_count_does_not_grow_with_rows(self):
+        def export_queries():
+            with CaptureQueriesContext(connection) as queries:
+                write_export(Reservation.objects.all(), RESERVATIONS_EXPORT, 'xlsx', BytesIO())
+            return len(queries)
+
+        queries = export_queries()
+        for _ in range(20):
+            make_reservation()
+        self.assertEqual(export_queries(), queries)
+
+
+class ExportPipelineTests(TestCase):
+    def setUp(self):
+        self.reservation = make_reservation(
+            customer_name='عميل, "مقتبس"', payments=Decimal('100'), discount=Decimal('50'), reservation_date=date(2024, 6, 1),
+        )
+        self.client.force_login(User.objects.create_superuser('admin', password='password'))
+
+    # الأعمدة تقرأ القيم الخام، والمنسقات تُطبق على الملفات المنسقة فقط، والحقول المحسوبة تُحسب في قاعدة البيانات
+    def test_column_spec_formats_values(self):
+        spec = ExportSpec([
+            Column('التاريخ', 'reservation_date', format_date),
+            Column('مكتمل', 'is_completed', format_bool),
+            Column('الحالة', 'status', format_status),
+            Column('المتبقي', 'computed_remaining', total=True),
+        ], 'اختبار')
+        row = next(iter_rows(Reservation.objects.all(), spec))
+        self.assertEqual(row[:3], (date(2024, 6, 1), False, Reservation.STATUS_PENDING))
+        self.assertEqual(Decimal(row[3]), Decimal('350'))
+        content = b''.join(iter_csv(spec, iter_rows(Reservation.objects.all(), spec))).decode('utf-8-sig')
+        self.assertEqual(
+            list(csv.reader(StringIO(content)))[1][:3],
+            ['2024-06-01', 'لا', dict(Reservation.STATUS_CHOICES)[Reservation.STATUS_PENDING]],
+        )
+
+    def test_csv_streams_formatted_rows_without_totals(self):
+        response = self.client.get(reverse('export_reservations'), {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], CSV_CONTENT_TYPE)
+        self.assertIn('reservations.csv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(content.startswith('\ufeff'))
+        rows = list(csv.reader(StringIO(content.lstrip('\ufeff'))))
+        self.assertEqual(rows[0], [column.header for column in RESERVATIONS_EXPORT.columns])
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][:2], [self.reservation.reservation_number, 'عميل, "مقتبس"'])
+        self.assertIn('2024-06-01', rows[1])
+
+    def test_jsonl_streams_raw_values_by_field_name(self):
+        response = self.client.get(reverse('export_reservations'), {'format': 'jsonl'})
+        self.assertEqual(response['Content-Type'], JSONL_CONTENT_TYPE)
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 1)
+        record = json.loads(lines[0])
+        self.assertEqual(list(record), [column.field for column in RESERVATIONS_EXPORT.columns])
+        self.assertEqual(record['reservation_date'], '2024-06-01')
+        self.assertEqual(record['status'], Reservation.STATUS_PENDING)
+        self.assertEqual(Decimal(record['computed_remaining']), Decimal('350'))
+
+    def test_unknown_format_falls_back_to_xlsx(self):
+        response = self.client.get(reverse('export_reservations'), {'format': 'pdf'})
+        self.assertEqual(response['Content-Type'], XLSX_CONTENT_TYPE)
+
+    def test_write_export_counts_rows(self):
+        make_reservation()
+        for fmt in ('xlsx', 'csv', 'jsonl'):
+            self.assertEqual(write_export(Reservation.objects.all(), RESERVATIONS_EXPORT, fmt, BytesIO()), 2, fmt)
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(EXPORTS_ROOT=directory.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        make_reservation()
+
+    def test_same_data_reuses_job_until_it_changes(self):
+        job, created = request_export('reservations', 'csv')
+        self.assertTrue(created)
+        self.assertEqual(request_export('reservations', 'csv'), (job, False))
+        self.assertTrue(request_export('reservations', 'jsonl')[1])
+
+        make_reservation()
+        other, created = request_export('reservations', 'csv')
+        self.assertTrue(created)
+        self.assertNotEqual(other.id, job.id)
+
+    def test_one_reusable_job_per_format_and_fingerprint(self):
+        job, _ = request_export('reservations', 'csv')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ExportJob.objects.create(export_format='csv', fingerprint=job.fingerprint)
+        # المهام الفاشلة لا تمنع طلبًا جديدًا لنفس البيانات
+        ExportJob.objects.filter(id=job.id).update(status=ExportJob.STATUS_FAILED)
+        self.assertTrue(request_export('reservations', 'csv')[1])
+
+    # طلب متزامن أنشأ المهمة بعد البحث: الإدراج يفشل بسبب القيد ويُعاد استخدام مهمة الطلب الآخر
+    def test_concurrent_request_returns_the_other_job(self):
+        job, _ = request_export('reservations', 'csv')
+        with mock.patch('django.db.models.query.QuerySet.first', return_value=None):
+            self.assertEqual(request_export('reservations', 'csv'), (job, False))
+        self.assertEqual(ExportJob.objects.count(), 1)
+
+    def test_worker_claims_runs_and_reuses_file(self):
+        job, _ = request_export('reservations', 'csv')
+        claimed = claim_next_job()
+        self.assertEqual((claimed.id, claimed.status), (job.id, ExportJob.STATUS_RUNNING))
+        self.assertIsNone(claim_next_job())
+
+        done = run_job(claimed)
+        self.assertEqual((done.status, done.rows_count), (ExportJob.STATUS_DONE, 1))
+        with open(done.file_path, encoding='utf-8-sig') as output:
+            self.assertEqual(len(output.read().splitlines()), 2)
+        self.assertEqual(request_export('reservations', 'csv'), (done, False))
+
+        # الملف حُذف من القرص: مهمة جديدة لنفس البيانات
+        os.remove(done.file_path)
+        self.assertTrue(request_export('reservations', 'csv')[1])
+
+    # البيانات تغيرت أثناء الانتظار وطُلبت مهمة للإصدار الجديد: المهمة الأولى تحتفظ ببصمتها
+    def test_run_keeps_fingerprint_taken_by_newer_job(self):
+        job, _ = request_export('reservations', 'csv')
+        make_reservation()
+        newer, _ = request_export('reservations', 'csv')
+        done = run_job(claim_next_job())
+        self.assertEqual((done.id, done.status, done.fingerprint), (job.id, ExportJob.STATUS_DONE, job.fingerprint))
+        self.assertEqual(request_export('reservations', 'csv'), (newer, False))
+
+    def test_stale_running_jobs_are_requeued(self):
+        job, _ = request_export('reservations', 'csv')
+        claim_next_job()
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=30)), 0)
+        ExportJob.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=30)), 1)
+        self.assertEqual(claim_next_job().id, job.id)
+
+    def test_purge_removes_old_files_and_frees_fingerprint(self):
+        request_export('reservations', 'csv')
+        job = run_job(claim_next_job())
+        self.assertEqual(purge_old_exports(), 0)
+        ExportJob.objects.filter(id=job.id).update(finished_at=timezone.now() - timedelta(days=8))
+        self.assertEqual(purge_old_exports(), 1)
+        self.assertFalse(os.path.exists(job.file_path))
+        self.assertEqual(ExportJob.objects.get(id=job.id).file_path, '')
+        self.assertTrue(request_export('reservations', 'csv')[1])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        # تواريخ مكررة وفارغة حتى يعتمد الترتيب على (التاريخ، المعرف) معًا
+        start = date(2024, 1, 1)
+        Reservation.objects.bulk_create([
+            Reservation(
+                customer_name=f"عميل {index}",
+                carpenter_name='نجار',
+                concrete_type='250',
+                concrete_quantity=Decimal('5'),
+                site_location='الموقع',
+                estimated_distance=Decimal('5'),
+                phone_number='0791234567',
+                reservation_number=str(NUMBER_MIN + index),
+                reservation_date=None if index % 10 == 0 else start + timedelta(days=index // 3),
+            )
+            for index in range(60)
+        ])
+        self.queryset = Reservation.objects.all()
+        self.expected = list(self.queryset.order_by('-reservation_date', '-id').values_list('id', flat=True))
+
+    def page(self, **params):
+        return keyset_paginate(RequestFactory().get('/', {'per_page': 25, **params}), self.queryset)
+
+    def test_forward_and_backward(self):
+        pages = [self.page()]
+        while pages[-1].has_next:
+            pages.append(self.page(after=pages[-1].next_cursor))
+        self.assertEqual([[item.id for item in page.items] for page in pages], [self.expected[:25], self.expected[25:50], self.expected[50:]])
+        self.assertFalse(pages[0].has_previous)
+
+        # الرجوع من الصفحة الأخيرة يعيد نفس الصفحات بنفس الترتيب
+        previous = self.page(before=pages[2].previous_cursor)
+        self.assertEqual([item.id for item in previous.items], self.expected[25:50])
+        first = self.page(before=previous.previous_cursor)
+        self.assertEqual([item.id for item in first.items], self.expected[:25])
+        self.assertFalse(first.has_previous)
+        self.assertTrue(first.has_next)
+
+    def test_invalid_cursor_starts_from_first_page(self):
+        self.assertEqual([item.id for item in self.page(after='invalid').items], self.expected[:25])
+
+
+class NumberAllocationTests(TestCase):
+    def test_permutation_is_unique_and_in_range(self):
+        values = [permute(index) for index in range(20000)]
+        self.assertEqual(len(set(values)), len(values))
+        self.assertTrue(all(0 <= value < NUMBER_SPACE for value in values))
+
+    def test_allocated_numbers_skip_legacy_numbers(self):
+        make_reservation()
+        # رقم قديم يساوي الرقم التالي في التسلسل
+        following = number_for_index(allocator_status()['used'])
+        make_reservation(reservation_number=following)
+
+        numbers = allocate_reservation_numbers(20)
+        self.assertEqual(len(set(numbers)), 20)
+        self.assertNotIn(following, numbers)
+        self.assertTrue(all(len(number) == 6 for number in numbers))
+        self.assertEqual(len(set(numbers) | set(Reservation.objects.values_list('reservation_number', flat=True))), 22)
+
+    def test_index_for_number_inverts_permutation(self):
+        for index in (0, 1, 777, 123456, NUMBER_SPACE - 1):
+            self.assertEqual(index_for_number(number_for_index(index)), index)
+        self.assertIsNone(index_for_number('099999'))
+
+    @override_settings(CACHES={**settings.CACHES, 'lookups': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'numbering-tests'}})
+    def test_registered_legacy_numbers_are_skipped(self):
+        make_reservation()
+        current = allocator_status()['used']
+        legacy = [number_for_index(index) for index in (current, current + 2)]
+        for number in legacy:
+            make_reservation(reservation_number=number)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('register_legacy_numbers', stdout=StringIO())
+        self.assertEqual(allocator_status()['legacy'], 2)
+
+        # بعد الترحيل لا يحتاج التوليد إلى أي استعلام تحقق من التصادم
+        with CaptureQueriesContext(connection) as queries:
+            numbers = [allocate_reservation_number() for _ in range(3)]
+        self.assertFalse([query for query in queries if Reservation._meta.db_table in query['sql']])
+        self.assertEqual(numbers, [number_for_index(current + offset) for offset in (1, 3, 4)])
+
+
+class ReservationImportTests(TestCase):
+    def setUp(self):
+        clear_lookup_cache()
+
+    def dataset(self, *rows):
+        confirmed = dict(Reservation.STATUS_CHOICES)[Reservation.STATUS_CONFIRMED]
+        data = Dataset(headers=[
+            'رقم الحجز', 'اسم العميل', 'اسم النجار', 'رقم الهاتف', 'نوع الخرسانة', 'كمية الخرسانة', 'موقع الصب',
+            'المسافة التقديرية', 'تاريخ الحجز', 'السعر للوحدة', 'الخصم', 'مجموع الدفعات المدفوعة', 'الحالة',
+        ])
+        for number, phone, payments in rows:
+            data.append([number, 'عميل مستورد', 'نجار', phone, '250', '10', 'الموقع', '12', '2024-05-01', '50', '0', payments, confirmed])
+        return data
+
+    def test_dry_run_writes_nothing_and_allocates_no_numbers(self):
+        used = allocator_status()['used']
+        result = ReservationResource().import_data(self.dataset(('', '0791112223', '100'), ('123456', '0791112223', '')), dry_run=True)
+        self.assertFalse(result.has_errors() or result.has_validation_errors())
+        self.assertEqual(result.totals['new'], 2)
+        self.assertFalse(Reservation.objects.exists())
+        self.assertFalse(Payment.objects.exists())
+        self.assertEqual((ledger_rows(), report_summary_rows()), ({}, {}))
+        self.assertEqual(allocator_status()['used'], used)
+
+    # bulk_create لا يرسل إشارات الحفظ: الاستيراد الفعلي يعيد بناء الدفتر والملخص اليومي ويبطل نتائج البحث
+    def test_import_refreshes_ledger_summary_and_lookups(self):
+        make_reservation(phone_number='0791112223', is_approved=True, is_confirmed=True)
+        self.assertEqual(len(phone_lookup('0791112223')[0]), 1)
+
+        result = ReservationResource().import_data(self.dataset(('', '٠٧٩١١١٢٢٢٣', '100'), ('123456', '0791112223', '')))
+        self.assertFalse(result.has_errors() or result.has_validation_errors())
+
+        imported = Reservation.objects.filter(customer_name='عميل مستورد')
+        self.assertEqual(imported.count(), 2)
+        self.assertTrue(imported.filter(reservation_number='123456').exists())
+        self.assertEqual(allocator_status()['used'], 2)
+        self.assertEqual(Payment.objects.get().method, Payment.METHOD_OPENING)
+        self.assertEqual(ledger_rows()[(Reservation.STATUS_CONFIRMED, '250')][0], 3)
+        self.assertEqual(report_summary_rows()[(date(2024, 5, 1), '250', Reservation.STATUS_CONFIRMED)][0], 2)
+        self.assertEqual(len(phone_lookup('0791112223')[0]), 3)
+
+        incremental = (ledger_rows(), report_summary_rows())
+        rebuild_ledger()
+        refresh_daily_summary()
+        self.assertEqual(incremental, (ledger_rows(), report_summary_rows()))
+
+    # الأرقام المستخدمة أو المكررة تظهر كأخطاء في أسطرها عند المعاينة (dry-run) قبل تأكيد الاستيراد
+    def test_taken_and_repeated_numbers_are_row_errors(self):
+        existing = make_reservation()
+        result = ReservationResource().import_data(self.dataset(
+            (existing.reservation_number, '0791112223', ''), ('123456', '0791112223', ''), ('123456', '0791112223', ''),
+        ), dry_run=True)
+        self.assertEqual([row.number for row in result.invalid_rows], [1, 3])
+        self.assertIn('reservation_number', result.invalid_rows[1].error_dict)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+
+class RecalculationCommandTests(TestCase):
+    def test_verify_reports_without_changing(self):
+        reservation = make_reservation(is_approved=True, is_confirmed=True)
+        Reservation.objects.filter(id=reservation.id).update(total_cost=Decimal('1'), remaining_balance=Decimal('1'))
+
+        out = StringIO()
+        call_command('recalculate_reservations', '--verify', stdout=out)
+        self.assertIn(reservation.reservation_number, out.getvalue())
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.total_cost, Decimal('1'))
+
+        call_command('recalculate_reservations', stdout=StringIO())
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.total_cost, Decimal('500'))
+        self.assertEqual(reservation.remaining_balance, Decimal('500'))
+
+        out = StringIO()
+        call_command('recalculate_reservations', '--verify', stdout=out)
+        self.assertIn("مطابقة", out.getvalue())
+
+    # تغيير الحالة بإعادة الحساب ينقل مساهمة الحجز في ملخص الدفتر دون إعادة بنائه
+    def test_recalculation_moves_ledger_contributions(self):
+        completed = make_reservation(is_approved=True, is_confirmed=True)
+        unconfirmed = make_reservation(is_approved=True, is_confirmed=True, concrete_type='300')
+        untouched = make_reservation(is_approved=True, is_confirmed=True, concrete_type='350')
+        Reservation.objects.filter(id=completed.id).update(is_completed=True)
+        Reservation.objects.filter(id=unconfirmed.id).update(is_confirmed=False)
+
+        self.assertEqual(recalculate_reservations(), 2)
+        self.assertEqual(ledger_rows(), {
+            (Reservation.STATUS_COMPLETED, '250'): (1, Decimal('500'), Decimal(0), Decimal(0), Decimal('500')),
+            (Reservation.STATUS_CONFIRMED, '350'): (1, Decimal('500'), Decimal(0), Decimal(0), Decimal('500')),
+        })
+        untouched.refresh_from_db()
+        self.assertEqual(untouched.status, Reservation.STATUS_CONFIRMED)
+
+    # صف يصبح مختلفًا بعد قراءة الصفوف المقفلة لا يُحدّث في نفس التشغيل (ولا يختل الملخص)
+    def test_rows_that_become_stale_after_locking_are_left_alone(self):
+        stale = make_reservation(is_approved=True, is_confirmed=True)
+        late = make_reservation(is_approved=True, is_confirmed=True, concrete_type='300')
+        Reservation.objects.filter(id=stale.id).update(total_cost=Decimal('1'))
+
+        calls = []
+
+        # أول استدعاء يقع بين قراءة الصفوف المقفلة وتحديثها
+        def ledger_groups_after_lock(ids):
+            if not calls:
+                Reservation.objects.filter(id=late.id).update(is_completed=True)
+            calls.append(ids)
+            return ledger_groups(ids)
+
+        with mock.patch('MjbilAlRai_App.recalculation.ledger_groups', side_effect=ledger_groups_after_lock):
+            self.assertEqual(recalculate_reservations(), 1)
+        late.refresh_from_db()
+        self.assertEqual(late.status, Reservation.STATUS_CONFIRMED)
+        self.assertEqual(set(ledger_rows()), {(Reservation.STATUS_CONFIRMED, '250'), (Reservation.STATUS_CONFIRMED, '300')})
+
+        # التشغيل التالي يعالج الصف وينقل مساهمته في الملخص
+        self.assertEqual(recalculate_reservations(), 1)
+        self.assertEqual(set(ledger_rows()), {(Reservation.STATUS_CONFIRMED, '250'), (Reservation.STATUS_COMPLETED, '300')})
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.khaled = make_reservation(customer_name='خالد الراعي', carpenter_name='سامر', site_location='عمان - الجبيهة', phone_number='0791112223')
+        self.omar = make_reservation(customer_name='عمر النجار', carpenter_name='وسيم', site_location='الزرقاء', phone_number='0785556667')
+
+    def ids(self, query, queryset=None):
+        return sorted(search_reservations(Reservation.objects.all() if queryset is None else queryset, query).values_list('id', flat=True))
+
+    def test_matches_text_fields_phone_and_number(self):
+        self.assertEqual(self.ids('الراعي'), [self.khaled.id])
+        self.assertEqual(self.ids('وسيم'), [self.omar.id])
+        self.assertEqual(self.ids('الجبيهة'), [self.khaled.id])
+        self.assertEqual(self.ids('5556'), [self.omar.id])
+        # الأرقام العربية تُحول إلى أرقام لاتينية
+        self.assertEqual(self.ids('٥٥٥٦'), [self.omar.id])
+        self.assertEqual(self.ids(self.khaled.reservation_number), [self.khaled.id])
+
+    def test_all_terms_are_required(self):
+        self.assertEqual(self.ids('خالد سامر'), [self.khaled.id])
+        self.assertEqual(self.ids('خالد وسيم'), [])
+        self.assertEqual(self.ids('   '), [self.khaled.id, self.omar.id])
+
+    # علامات التنصيص والكلمات المحجوزة في FTS5 لا تُفسر كعوامل
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.ids('"خالد OR'), [])
+        self.assertEqual(self.ids('NEAR(خالد'), [])
+
+    # البديل يطابق العبارة كاملة، لذا تُقارن الاستعلامات ذات الكلمة الواحدة فقط
+    def test_sqlite_index_and_fallback_agree(self):
+        queries = ('الراعي', 'النجار', 'الزرقاء', 'الجبيهة', '0791', 'عم')
+        expected = {query: self.ids(query) for query in queries}
+        with mock.patch('MjbilAlRai_App.search.sqlite_search_installed', return_value=False):
+            for query in queries:
+                self.assertEqual(self.ids(query), expected[query], query)
+
+    def test_manage_reservations_filters_by_query(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='password'))
+        response = self.client.get(reverse('manage_reservations'), {'q': 'الزرقاء'})
+        self.assertEqual([reservation.id for reservation in response.context['reservations']], [self.omar.id])
+
+
+@skipUnless(connection.vendor == 'sqlite', "جدول FTS5 ومشغلاته في SQLite فقط")
+class SqliteSearchIndexTests(TestCase):
+    def test_triggers_follow_insert_update_and_delete(self):
+        self.assertTrue(sqlite_search_installed())
+        reservation = make_reservation(customer_name='خالد الراعي')
+        self.assertEqual(list(search_reservations(Reservation.objects.all(), 'الراعي')), [reservation])
+
+        reservation.customer_name = 'سامر القصاص'
+        reservation.save()
+        Reservation.objects.filter(id=reservation.id).update(site_location='مادبا')
+        self.assertFalse(search_reservations(Reservation.objects.all(), 'الراعي').exists())
+        self.assertTrue(search_reservations(Reservation.objects.all(), 'القصاص').exists())
+        self.assertTrue(search_reservations(Reservation.objects.all(), 'مادبا').exists())
+
+        reservation.delete()
+        self.assertFalse(search_reservations(Reservation.objects.all(), 'القصاص').exists())
+
+    # المشغلات المفقودة (بعد إعادة إنشاء الجدول في migrate) تُعاد ويُعاد بناء الفهرس
+    def test_install_restores_missing_triggers_and_rebuilds(self):
+        self.assertFalse(install_sqlite_search(connection))
+        reservation = make_reservation(customer_name='خالد الراعي')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {SQLITE_SEARCH_TABLE}_au')
+        Reservation.objects.filter(id=reservation.id).update(customer_name='مازن الشامي')
+        self.assertFalse(search_reservations(Reservation.objects.all(), 'الشامي').exists())
+
+        self.assertTrue(install_sqlite_search(connection))
+        self.assertTrue(search_reservations(Reservation.objects.all(), 'الشامي').exists())
+        self.assertFalse(search_reservations(Reservation.objects.all(), 'الراعي').exists())
+
+
+class PlanDayTests(TestCase):
+    def minutes(self, value):
+        return value.hour * 60 + value.minute
+
+    def test_trips_fit_workday_without_overlap(self):
+        pours = [(1, Decimal('30'), Decimal('20')), (2, Decimal('8'), Decimal('5')), (3, Decimal('17.5'), Decimal('60')), (4, Decimal('4'), None)]
+        trucks = [(10, Decimal('8')), (11, Decimal('10')), (12, Decimal('6'))]
+        trips, unscheduled = plan_day(pours, trucks)
+        self.assertEqual(unscheduled, [])
+
+        start, end = self.minutes(WORKDAY_START), self.minutes(WORKDAY_END)
+        for reservation_id, quantity, distance in pours:
+            delivered = sum(trip[3] for trip in trips if trip[0] == reservation_id)
+            self.assertEqual(delivered, quantity)
+        for truck_id, capacity in trucks:
+            truck_trips = sorted((trip for trip in trips if trip[1] == truck_id), key=lambda trip: trip[4])
+            ready = start
+            for trip in truck_trips:
+                self.assertLessEqual(trip[3], capacity)
+                self.assertGreaterEqual(trip[4], ready + LOADING_MINUTES)
+                self.assertLessEqual(trip[6], end)
+                ready = trip[6]
+
+    def test_pour_that_does_not_fit_is_not_split(self):
+        trips, unscheduled = plan_day([(1, Decimal('500'), Decimal('30')), (2, Decimal('8'), Decimal('5'))], [(10, Decimal('8'))], time(7, 0), time(12, 0))
+        self.assertEqual(unscheduled, [1])
+        self.assertEqual({trip[0] for trip in trips}, {2})
+        # الشاحنة أعيدت إلى بداية الدوام بعد إلغاء الصبّة الكبيرة
+        self.assertEqual(trips[0][4], self.minutes(time(7, 15)))
+
+    def test_only_reservations_with_pour_date_are_planned(self):
+        today = date.today()
+        planned = make_reservation()
+        unplanned = make_reservation()
+        pending = make_reservation(pour_date=today)
+        bulk_approve([planned.id], pour_date=today)
+        bulk_approve([unplanned.id])
+        # تاريخ القبول يصبح اليوم افتراضيًا لكنه لا يُعد تاريخ صب
+        self.assertEqual(Reservation.objects.get(id=unplanned.id).approval_date, today)
+        self.assertEqual([pour[0] for pour in day_pours(today)], [planned.id])
+        self.assertNotIn(pending.id, [pour[0] for pour in day_pours(today)])
+
+
+# ذاكرة بحث مستقلة في الاختبارات بدلاً من مجلد الملفات المشترك
+class FragmentCacheTests(TestCase):
+    template_name = 'MjbilAlRai_App/_accountant_row.html'
+
+    def setUp(self):
+        clear_fragment_cache()
+        self.addCleanup(clear_fragment_cache)
+        self.reservation = make_reservation(customer_name='خالد الراعي', is_approved=True, is_confirmed=True)
+
+    def render(self, reservation=None):
+        rows = list(Reservation.objects.filter(id=(reservation or self.reservation).id).only(*ROW_KEY_FIELDS))
+        render_reservation_rows(rows, self.template_name, views.ACCOUNTANT_ROW_FIELDS)
+        return rows[0]
+
+    def test_unchanged_row_is_served_from_cache(self):
+        first = self.render()
+        self.assertIn('خالد الراعي', first.fragment)
+        with self.assertNumQueries(1):
+            second = self.render()
+        self.assertEqual(second.fragment, first.fragment)
+
+    # كل مسار تعديل يغير updated_at فينتج مفتاحًا جديدًا ويُعاد عرض الصف دون إبطال صريح
+    def test_save_changes_key_and_refreshes_row(self):
+        before = self.render()
+        self.reservation.refresh_from_db()
+        self.reservation.customer_name = 'سامر القصاص'
+        self.reservation.save()
+        after = self.render()
+        self.assertNotEqual(fragment_key(self.template_name, after), fragment_key(self.template_name, before))
+        self.assertIn('سامر القصاص', after.fragment)
+        self.assertNotIn('خالد الراعي', after.fragment)
+
+    def test_payment_refreshes_row(self):
+        self.render()
+        save_financial_details(self.reservation.id, {
+            'price_per_unit': '50', 'discount': '0', 'payments': '120', 'concrete_quantity': '10', 'concrete_type': '250',
+        })
+        self.assertIn('متبقي 380', self.render().fragment)
+
+    def test_bulk_update_refreshes_row(self):
+        pending = make_reservation()
+        self.assertIn('قيد الانتظار', self.render(pending).fragment)
+        bulk_reject([pending.id])
+        self.assertIn('bg-danger', self.render(pending).fragment)
+
+    def test_recalculation_refreshes_row(self):
+        self.render()
+        Reservation.objects.filter(id=self.reservation.id).update(price_per_unit=Decimal('60'))
+        self.assertIn('متبقي 500', self.render().fragment)
+        recalculate_reservations()
+        self.assertIn('متبقي 600', self.render().fragment)
+
+
+@override_settings(CACHES={**settings.CACHES, 'lookups': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-lookups'}})
+class TariffCacheTests(TestCase):
+    def setUp(self):
+        clear_lookup_cache()
+        price_list = PriceList.objects.create(name='قائمة', valid_from=date(2024, 1, 1))
+        self.rate = PriceListRate.objects.create(price_list=price_list, concrete_type='250', price_per_unit=Decimal('50'))
+
+    def test_bump_changes_versioned_key(self):
+        key = versioned_key('test')
+        self.assertEqual(versioned_key('test'), key)
+        bump('test')
+        self.assertNotEqual(versioned_key('test'), key)
+
+    def test_quotes_reload_after_bump(self):
+        self.assertEqual(quote_price('250', None, date(2024, 6, 1)), Decimal('50'))
+        PriceListRate.objects.filter(id=self.rate.id).update(price_per_unit=Decimal('60'))
+        self.assertEqual(quote_price('250', None, date(2024, 6, 1)), Decimal('50'))
+        bump(TARIFF_NAMESPACE)
+        self.assertEqual(quote_price('250', None, date(2024, 6, 1)), Decimal('60'))
+
+    # إصدار مفقود من الذاكرة المشتركة (مسح أو إزالة عند الامتلاء) يعيد قراءة الأسعار ولا يعيد القائمة القديمة
+    def test_missing_version_reloads_price_lists(self):
+        self.assertEqual(quote_price('250', None, date(2024, 6, 1)), Decimal('50'))
+        PriceListRate.objects.filter(id=self.rate.id).update(price_per_unit=Decimal('70'))
+        clear_lookup_cache()
+        self.assertEqual(quote_price('250', None, date(2024, 6, 1)), Decimal('70'))
+        lookup_cache().delete(f"{TARIFF_NAMESPACE}:version")
+        PriceListRate.objects.filter(id=self.rate.id).update(price_per_unit=Decimal('80'))
+        self.assertEqual(quote_price('250', None, date(2024, 6, 1)), Decimal('80'))
+
+
+class LookupCacheTests(TestCase):
+    def setUp(self):
+        clear_lookup_cache()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reservation = make_reservation()
+
+    def test_repeated_lookup_is_served_from_cache(self):
+        reservations, totals = phone_lookup('0791234567')
+        self.assertEqual([r.id for r in reservations], [self.reservation.id])
+        self.assertEqual(totals['reservations_count'], 1)
+        self.assertEqual(reservation_number_lookup(self.reservation.reservation_number).id, self.reservation.id)
+        with self.assertNumQueries(0):
+            phone_lookup('0791234567')
+            reservation_number_lookup(self.reservation.reservation_number)
+
+    def test_save_invalidates_old_and_new_phone(self):
+        self.assertEqual(len(phone_lookup('0791234567')[0]), 1)
+        self.assertEqual(phone_lookup('0780000000')[0], [])
+        self.reservation.phone_number = '0780000000'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reservation.save()
+        self.assertEqual(phone_lookup('0791234567')[0], [])
+        self.assertEqual([r.id for r in phone_lookup('0780000000')[0]], [self.reservation.id])
+
+    def test_bulk_update_invalidates_lookups(self):
+        number = self.reservation.reservation_number
+        self.assertEqual(reservation_number_lookup(number).status, Reservation.STATUS_PENDING)
+        self.assertEqual(phone_lookup('0791234567')[0][0].status, Reservation.STATUS_PENDING)
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_approve([self.reservation.id])
+        self.assertEqual(reservation_number_lookup(number).status, Reservation.STATUS_APPROVED)
+        self.assertEqual(phone_lookup('0791234567')[0][0].status, Reservation.STATUS_APPROVED)
+
+    def test_delete_invalidates_lookups(self):
+        number = self.reservation.reservation_number
+        self.assertIsNotNone(reservation_number_lookup(number))
+        self.assertEqual(len(phone_lookup('0791234567')[0]), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_reservations(Reservation.objects.filter(id=self.reservation.id))
+        self.assertIsNone(reservation_number_lookup(number))
+        reservations, totals = phone_lookup('0791234567')
+        self.assertEqual(reservations, [])
+        self.assertEqual(totals['reservations_count'], 0)
+
+    # النسخ المحفوظة ببنية نموذج أخرى لا تُقرأ بعد النشر
+    def test_namespace_includes_model_schema(self):
+        reservation_number_lookup(self.reservation.reservation_number)
+        with mock.patch('MjbilAlRai_App.lookup_cache.LOOKUP_SCHEMA', 'oldschema'):
+            with self.assertNumQueries(1):
+                reservation_number_lookup(self.reservation.reservation_number)
+
+
+class AsyncLookupViewTests(TestCase):
+    def setUp(self):
+        clear_lookup_cache()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reservation = make_reservation(customer_name='عميل غير متزامن')
+
+    def request(self, data, factory=AsyncRequestFactory):
+        request = factory().post('/', data)
+        request.user = AnonymousUser()
+        return request
+
+    # نفس الصفحة التي يعرضها العرض المتزامن (عدا رمز CSRF العشوائي)
+    def assertSamePage(self, response, expected):
+        def page(response):
+            return re.sub(r'name="csrfmiddlewaretoken" value="[^"]+"', '', response.content.decode())
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(page(response), page(expected))
+
+    def test_pages_match_sync_views(self):
+        for name, data in (
+            ('home', {'phone_number': '079 123 4567'}),
+            ('home', {'reservation_number': self.reservation.reservation_number}),
+            ('home', {'phone_number': '0780000000'}),
+            ('home', {'reservation_number': '999999'}),
+            ('home', {}),
+            ('customer_reservations', {'phone_number': '0791234567'}),
+            ('customer_reservations', {}),
+        ):
+            with self.subTest(name, **data):
+                response = async_to_sync(getattr(async_views, name))(self.request(data))
+                self.assertSamePage(response, getattr(views, name)(self.request(data, RequestFactory)))
+
+    def test_phone_lookup_lists_reservations(self):
+        response = async_to_sync(async_views.home)(self.request({'phone_number': '0791234567'}))
+        self.assertContains(response, 'عميل غير متزامن')
+        self.assertContains(response, self.reservation.reservation_number)
+
+    # البحث غير المتزامن يخزن النتيجة تحت نفس المفتاح ويُبطل بنفس الإشارات
+    def test_async_lookup_shares_cache_with_sync_views(self):
+        async_to_sync(async_views.customer_reservations)(self.request({'phone_number': '0791234567'}))
+        with self.assertNumQueries(0):
+            reservations, totals = phone_lookup('0791234567')
+        self.assertEqual([r.id for r in reservations], [self.reservation.id])
+
+        self.reservation.concrete_quantity = Decimal('12')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reservation.save()
+        response = async_to_sync(async_views.customer_reservations)(self.request({'phone_number': '0791234567'}))
+        self.assertContains(response, '600')
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def request(self, method='get', user=None, url_name='probe'):
+        request = getattr(RequestFactory(), method)('/probe/')
+        request.user = user or AnonymousUser()
+        request.resolver_match = SimpleNamespace(url_name=url_name)
+        return request
+
+    # عرض تجريبي ينفذ استعلامين داخل نقطة حفظ
+    def view(self, request):
+        with transaction.atomic():
+            Reservation.objects.count()
+            Reservation.objects.exists()
+        return HttpResponse('ok')
+
+    def run_middleware(self, request):
+        with self.assertLogs('MjbilAlRai_App.performance', 'INFO') as logs:
+            response = PerformanceMiddleware(self.view)(request)
+        return response, json.loads(logs.records[0].getMessage()), logs
+
+    def test_record_counts_queries_without_savepoints(self):
+        response, record, logs = self.run_middleware(self.request())
+        self.assertEqual((record['queries'], record['savepoints']), (2, 2))
+        self.assertEqual(record['url_name'], 'probe')
+        self.assertEqual(record['response_bytes'], 2)
+
+    def test_server_timing_only_for_staff_or_debug(self):
+        response, record, logs = self.run_middleware(self.request())
+        self.assertNotIn('Server-Timing', response)
+
+        staff = User.objects.create_user('staff', password='password', is_staff=True)
+        response, record, logs = self.run_middleware(self.request(user=staff))
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+
+        with self.settings(DEBUG=True):
+            response, record, logs = self.run_middleware(self.request())
+        self.assertIn('Server-Timing', response)
+
+    @override_settings(PERFORMANCE_BUDGET_MODE='warn', PERFORMANCE_BUDGETS={'probe': {'queries': 5}, 'probe:POST': {'queries': 1}})
+    def test_budget_warns_or_raises(self):
+        response, record, logs = self.run_middleware(self.request())
+        self.assertEqual(len(logs.records), 1)
+
+        # حدود POST تسبق حدود اسم المسار
+        response, record, logs = self.run_middleware(self.request('post'))
+        self.assertIn('queries=2 > 1', logs.records[-1].getMessage())
+
+        with self.settings(PERFORMANCE_BUDGET_MODE='raise'):
+            with self.assertRaises(BudgetExceeded):
+                self.run_middleware(self.request('post'))
+
+    def test_async_path_counts_queries(self):
+        async def view(request):
+            await Reservation.objects.acount()
+            return HttpResponse('ok')
+
+        middleware = PerformanceMiddleware(view)
+        with self.assertLogs('MjbilAlRai_App.performance', 'INFO') as logs:
+            response = async_to_sync(middleware)(self.request())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(logs.records[0].getMessage())['queries'], 1)
+
+
+# كل صفحة لها حدود تبقى ضمنها في وضع raise (عدد الاستعلامات فقط، الزمن يختلف بين الأجهزة)
+@override_settings(
+    PERFORMANCE_BUDGET_MODE='raise',
+    PERFORMANCE_BUDGETS={name: {'queries': budget['queries']} for name, budget in settings.PERFORMANCE_BUDGETS.items()},
+)
+class PerformanceBudgetTests(TestCase):
+    def setUp(self):
+        clear_lookup_cache()
+        self.approved = make_reservation(is_approved=True)
+        self.confirmed = make_reservation(is_approved=True, is_confirmed=True)
+        self.client.force_login(User.objects.create_superuser('admin', password='password'))
+
+    def test_pages_stay_within_budgets(self):
+        phone = {'phone_number': self.approved.phone_number}
+        for url, data in (
+            (reverse('home'), None),
+            (reverse('new_reservation'), None),
+            (reverse('manage_reservations'), None),
+            (reverse('confirm_reservations'), None),
+            (reverse('accountant_dashboard'), None),
+            (reverse('update_financial_details', args=[self.confirmed.id]), None),
+            (reverse('customer_statement'), phone),
+            (reverse('reports'), None),
+        ):
+            self.assertEqual(self.client.get(url, data).status_code, 200, url)
+        self.assertEqual(self.client.post(reverse('home'), phone).status_code, 200)
+        self.assertEqual(self.client.post(reverse('customer_reservations'), phone).status_code, 200)
+        b''.join(self.client.get(reverse('export_reservations'), {'format': 'csv'}).streaming_content)
+
+    def test_saves_stay_within_budgets(self):
+        self.client.post(reverse('new_reservation'), {
+            'customer_name': 'عميل', 'carpenter_name': 'نجار', 'concrete_type': '250', 'concrete_quantity': '10',
+            'site_location': 'الموقع', 'estimated_distance': '5', 'phone_number': '0791234567',
+        })
+        # نوع خرسانة جديد: ينشئ صفًا جديدًا في ملخص الدفتر
+        self.client.post(reverse('confirm_reservations'), {
+            'reservation_id': self.approved.id, 'concrete_quantity': '12', 'concrete_type': '300', 'is_completed': 'true',
+        })
+        url = reverse('update_financial_details', args=[self.confirmed.id])
+        self.client.post(url, {'record_payment': '1', 'payment_amount': '100', 'method': 'cash'})
+        self.client.post(url, {
+            'update_financial': '1', 'price_per_unit': '55', 'discount': '10', 'payments': '150',
+            'concrete_quantity': '10', 'concrete_type': '350',
+        })
+        self.assertEqual(Reservation.objects.get(id=self.confirmed.id).payments, Decimal('150'))
+        self.assertEqual(Reservation.objects.get(id=self.approved.id).status, Reservation.STATUS_CONFIRMED)
@@ -1,27 +1,42 @@
 # MjbilAlRai_App/urls.py
 
+from django.conf import settings
 from django.urls import path
-from . import views  # استيراد جميع العروض من ملف views.py
+from . import async_views, views  # استيراد جميع العروض من ملف views.py
+
+# صفحات البحث العامة: النسخ غير المتزامنة عند التشغيل تحت ASGI (ASYNC_PUBLIC_VIEWS)
+lookup_views = async_views if settings.ASYNC_PUBLIC_VIEWS else views
 
 urlpatterns = [
     # المسارات الأساسية للحجوزات
-    path('', views.home, name='home'),  # الصفحة الرئيسية للبحث عن الحجوزات باستخدام رقم الهاتف أو رقم الحجز
+    path('', lookup_views.home, name='home'),  # الصفحة الرئيسية للبحث عن الحجوزات باستخدام رقم الهاتف أو رقم الحجز
     path('new/', views.new_reservation, name='new_reservation'),  # إنشاء حجز جديد
     path('manage/', views.manage_reservations, name='manage_reservations'),  # إدارة الحجوزات (للمسؤولين)
     path('confirm/', views.confirm_reservations, name='confirm_reservations'),  # تأكيد الحجوزات (للمسؤولين)
     path('approve/<int:reservation_id>/', views.approve_reservation, name='approve_reservation'),  # قبول حجز معين
     path('reject/<int:reservation_id>/', views.reject_reservation, name='reject_reservation'),  # رفض حجز معين
+    path('manage/bulk/', views.bulk_manage_reservations, name='bulk_manage_reservations'),  # قبول أو رفض مجموعة حجوزات
+    path('confirm/bulk/', views.bulk_confirm_reservations, name='bulk_confirm_reservations'),  # تأكيد مجموعة حجوزات
+    path('confirm/schedule/', views.delivery_schedule, name='delivery_schedule'),  # جدول التسليم اليومي للشاحنات
 
     # مسارات تسجيل الدخول والخروج
     path('login/', views.login_user, name='login'),  # تسجيل الدخول
     path('logout/', views.logout_user, name='logout'),  # تسجيل الخروج
 
     # مسارات لعرض حجوزات العملاء
-    path('customer_reservations/', views.customer_reservations, name='customer_reservations'),  # عرض الحجوزات للعميل بناءً على رقم الهاتف
+    path('customer_reservations/', lookup_views.customer_reservations, name='customer_reservations'),  # عرض الحجوزات للعميل بناءً على رقم الهاتف
     path('export_customer_reservations/', views.export_customer_reservations, name='export_customer_reservations'),  # تصدير حجوزات العميل إلى ملف Excel
     path('export_reservations/', views.export_reservations, name='export_reservations'),  # تصدير قائمة الحجوزات إلى ملف Excel
 
+    # مسارات التصدير في الخلفية
+    path('exports/request/', views.request_export_job, name='request_export_job'),  # طلب تصدير كامل في الخلفية
+    path('exports/<int:job_id>/', views.export_job_detail, name='export_job_detail'),  # متابعة مهمة التصدير
+    path('exports/<int:job_id>/status/', views.export_job_status, name='export_job_status'),  # حالة المهمة بصيغة JSON
+    path('exports/<int:job_id>/download/', views.download_export, name='download_export'),  # تحميل الملف الجاهز
+
     # المسارات المتعلقة بالبيانات المالية
     path('accountant_dashboard/', views.accountant_dashboard, name='accountant_dashboard'),  # لوحة المحاسب لعرض الحجوزات المكتملة وإدخال البيانات المالية
     path('update_financial_details/<int:reservation_id>/', views.update_financial_details, name='update_financial_details'),  # تحديث بيانات مالية لحجز
+    path('customer_statement/', views.customer_statement, name='customer_statement'),  # كشف حساب العميل من سجل الدفعات
+    path('reports/', views.reports, name='reports'),  # تقارير الكميات والإيرادات من الملخص اليومي
 ]
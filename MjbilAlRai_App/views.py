@@ -1,19 +1,35 @@
 # MjbilAlRai_App/views.py
 
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth import login, authenticate, logout
 from django.contrib import messages
 from django.contrib.auth.forms import AuthenticationForm
-from django.http import HttpResponse
-from django.db.models import Q, Sum
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from django.db import transaction
+from django.db.models import Q
+from django.http import FileResponse, Http404, JsonResponse
+from django.views.decorators.http import require_POST
 from decimal import Decimal
-from datetime import date
+from datetime import date, timedelta
+from django.utils.dateparse import parse_date
 from .forms import ReservationForm, FinancialDetailsForm, PaymentForm
-from .models import Reservation
+from .models import CONFIRMED_STATUSES, ExportJob, InvalidStatusTransition, Reservation
+from .aggregates import financial_totals, empty_totals
+from .bulk import bulk_approve, bulk_confirm, bulk_reject
+from .exports import CUSTOMER_EXPORT, EXPORT_FORMATS, RESERVATIONS_EXPORT, export_response
+from .export_jobs import request_export
+from .fragments import ROW_KEY_FIELDS, render_reservation_rows
+from .ledger import ledger_totals
+from .lookup_cache import normalize_phone, normalize_reservation_number, phone_lookup, reservation_number_lookup
+from .pagination import keyset_paginate
+from .payments import PaymentExceedsBalance, customer_payment_history, record_payment, save_financial_details
+from .reporting import PERIODS, last_refreshed_at, report_rows, report_totals
+from .scheduling import day_schedule, schedule_day
+from .search import search_reservations
+from .tariffs import quote_price, tariff_table
 import logging
+import os
 
 # إعداد السجلات (Logging)
 logger = logging.getLogger(__name__)
@@ -22,6 +38,20 @@ logger = logging.getLogger(__name__)
 SUCCESS_LOGIN_MSG = 'لقد تم الدخول بنجاح!'
 ERROR_LOGIN_MSG = 'اسم المستخدم أو كلمة المرور غير صحيحة.'
 
+# الفترة الافتراضية لصفحة التقارير (بالأيام)
+REPORT_DEFAULT_DAYS = 30
+
+# الحقول التي تعرضها صفوف الجداول المخزنة مؤقتًا (_manage_row.html و _accountant_row.html)
+MANAGE_ROW_FIELDS = (
+    'id', 'reservation_number', 'customer_name', 'carpenter_name', 'concrete_type', 'concrete_quantity',
+    'site_location', 'estimated_distance', 'additional_notes', 'phone_number', 'approval_date',
+    'approval_message', 'pour_date', 'is_completed', 'completion_date', 'reservation_date', 'status',
+)
+ACCOUNTANT_ROW_FIELDS = (
+    'id', 'reservation_number', 'customer_name', 'carpenter_name', 'concrete_type', 'concrete_quantity',
+    'price_per_unit', 'discount', 'payments', 'remaining_balance', 'status',
+)
+
 # ديكورات مخصصة للصلاحيات
 def has_permission(user, perm):
     return user.has_perm(perm)
@@ -33,6 +63,10 @@ confirm_permission_required = permission_required('MjbilAlRai_App.can_confirm_re
 manage_accountant_permission_required = permission_required('MjbilAlRai_App.can_manage_accountant', raise_exception=True)
 
 # Helper Functions
+# أرقام الحجوزات المحددة في نموذج الإجراءات الجماعية (يتم تجاهل القيم غير الصحيحة)
+def selected_ids(request):
+    return [int(value) for value in request.POST.getlist('reservation_ids') if value.isdigit()]
+
 def calculate_total_cost(reservation):
     return (reservation.price_per_unit or Decimal(0)) * (reservation.concrete_quantity or Decimal(0))
 
@@ -42,6 +76,21 @@ def calculate_remaining_balance(reservation):
     remaining = discounted_cost - (reservation.payments or Decimal(0))
     return remaining
 
+# رمز الحالة من معاملات الرابط (None إذا كان فارغًا أو غير معروف)
+def parse_status(value):
+    try:
+        status = int(value)
+    except (TypeError, ValueError):
+        return None
+    return status if status in dict(Reservation.STATUS_CHOICES) else None
+
+# تاريخ من معاملات الرابط (None إذا كان فارغًا أو غير صحيح)
+def parse_report_date(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
 # العروض (Views)
 
 # الصفحة الرئيسية
@@ -49,24 +98,20 @@ def calculate_remaining_balance(reservation):
 # الصفحة الرئيسية
 def home(request):
     reservations = []
-    total_gross_amount_sum = total_discount_sum = total_payments_sum = total_remaining_sum = 0
+    totals = empty_totals()
     error = None
 
     if request.method == 'POST':
-        phone_number = request.POST.get('phone_number')
-        reservation_number = request.POST.get('reservation_number')
+        phone_number = normalize_phone(request.POST.get('phone_number'))
+        reservation_number = normalize_reservation_number(request.POST.get('reservation_number'))
 
         if phone_number:
-            reservations = Reservation.objects.filter(phone_number=phone_number)
-            if reservations.exists():
-                total_gross_amount_sum = sum(calculate_total_cost(r) for r in reservations)
-                total_discount_sum = sum(r.discount or Decimal(0) for r in reservations)
-                total_payments_sum = reservations.aggregate(Sum('payments'))['payments__sum'] or Decimal(0)
-                total_remaining_sum = sum(calculate_remaining_balance(r) for r in reservations)
-            else:
+            # الحجوزات وإجمالياتها من ذاكرة التخزين المؤقت (تُبطل تلقائيًا عند تعديل أي حجز لهذا الرقم)
+            reservations, totals = phone_lookup(phone_number)
+            if not totals['reservations_count']:
                 error = "لا توجد حجوزات مسجلة لهذا الرقم."
         elif reservation_number:
-            reservation = Reservation.objects.filter(reservation_number=reservation_number).first()
+            reservation = reservation_number_lookup(reservation_number)
             if reservation:
                 return render(request, 'MjbilAlRai_App/reservation_status.html', {'reservation': reservation})
             else:
@@ -76,11 +121,8 @@ def home(request):
 
     context = {
         'reservations': reservations,
-        'total_gross_amount_sum': total_gross_amount_sum,
-        'total_discount_sum': total_discount_sum,
-        'total_payments_sum': total_payments_sum,
-        'total_remaining_sum': total_remaining_sum,
-        'error': error
+        'error': error,
+        **totals,
     }
     return render(request, 'MjbilAlRai_App/home.html', context)
 
@@ -91,30 +133,33 @@ def home(request):
 @login_required
 @manage_permission_required
 def manage_reservations(request):
-    status = request.GET.get('status')
+    status = parse_status(request.GET.get('status'))
     reservation_date = request.GET.get('reservation_date')
+    query = request.GET.get('q', '').strip()
 
-    # إنشاء فلتر ديناميكي
+    # إنشاء فلتر ديناميكي (الحالة عمود واحد مفهرس مع تاريخ الحجز)
     filters = Q()
-    if status:
-        if status == 'معلق':
-            filters &= Q(is_approved=False, is_rejected=False, is_confirmed=False)
-        elif status == 'مقبول':
-            filters &= Q(is_approved=True, is_confirmed=False)
-        elif status == 'مرفوض':
-            filters &= Q(is_rejected=True)
-        elif status == 'مكتمل':
-            filters &= Q(is_completed=True)
+    if status is not None:
+        filters &= Q(status=status)
 
     # فلترة حسب تاريخ الحجز إذا تم إدخال التاريخ
     if reservation_date:
         filters &= Q(reservation_date=reservation_date)
 
-    # تطبيق الفلاتر على الحجوزات
-    reservations = Reservation.objects.filter(filters)
+    # تطبيق الفلاتر والبحث (الاسم، النجار، الموقع، الهاتف) وعرض صفحة واحدة من النتائج فقط
+    # الصفحة تُقرأ بحقول المفاتيح فقط، وبقية الحقول للصفوف غير المخزنة مؤقتًا فقط
+    reservations = search_reservations(Reservation.objects.filter(filters), query)
+    page = keyset_paginate(request, reservations.only(*ROW_KEY_FIELDS))
+    render_reservation_rows(page.items, 'MjbilAlRai_App/_manage_row.html', MANAGE_ROW_FIELDS)
 
     # عرض الصفحة مع الحجوزات المفلترة
-    return render(request, 'MjbilAlRai_App/manage_reservations.html', {'reservations': reservations})
+    return render(request, 'MjbilAlRai_App/manage_reservations.html', {
+        'reservations': page.items,
+        'page': page,
+        'status': status,
+        'status_choices': Reservation.STATUS_CHOICES,
+        'query': query,
+    })
 
 
 # تأكيد الحجوزات
@@ -127,73 +172,148 @@ def confirm_reservations(request):
         concrete_type = request.POST.get('concrete_type')
         is_completed = request.POST.get('is_completed') == 'true'
 
-        reservation = get_object_or_404(Reservation, id=reservation_id)
-
-        try:
-            concrete_quantity = Decimal(concrete_quantity)
+        # قفل الحجز حتى تُحسب فروق ملخص الدفتر من القيم الحالية وليس من نسخة قديمة عند تعديلين متزامنين
+        with transaction.atomic():
+            reservation = get_object_or_404(Reservation.objects.select_for_update(), id=reservation_id)
 
-            reservation.concrete_quantity = concrete_quantity
-            reservation.concrete_type = concrete_type
-            reservation.is_confirmed = True
+            try:
+                concrete_quantity = Decimal(concrete_quantity)
 
-            # تحديث حالة الحجز بناءً على التأكيد
-            if is_completed:
-                reservation.is_completed = True
-                reservation.status = 'مكتمل'
-                reservation.completion_date = date.today()
-            else:
+                reservation.concrete_quantity = concrete_quantity
+                reservation.concrete_type = concrete_type
+                reservation.is_confirmed = True
                 reservation.is_completed = False
-                reservation.status = 'مقبول'
-                reservation.completion_date = None
+                # المبلغ المتبقي حسب الكمية النهائية قبل تطبيق قاعدة الاكتمال
+                reservation.apply_derived_fields()
 
-            reservation.save()
+                reservation.save()
+
+                # الاكتمال بعد التأكيد (لا انتقال مباشر من مقبول إلى مكتمل): الحجز يكتمل إذا كان مسددًا بالكامل
+                # (نفس قاعدة التأكيد الجماعي)، وإلا يبقى مؤكدًا حتى تسجيل آخر دفعة
+                if is_completed and reservation.is_fully_paid():
+                    reservation.is_completed = True
+                    reservation.completion_date = date.today()
+                    reservation.save()
 
-            messages.success(request, f"تم تأكيد الحجز رقم {reservation.reservation_number} بنجاح.")
-        except Exception as e:
-            messages.error(request, f"حدث خطأ أثناء تأكيد الحجز: {e}")
+                if is_completed and not reservation.is_completed:
+                    messages.success(request, f"تم تأكيد الحجز رقم {reservation.reservation_number}، وسيكتمل عند سداد المبلغ المتبقي.")
+                else:
+                    messages.success(request, f"تم تأكيد الحجز رقم {reservation.reservation_number} بنجاح.")
+            except Exception as e:
+                messages.error(request, f"حدث خطأ أثناء تأكيد الحجز: {e}")
 
         return redirect('confirm_reservations')
 
     # عرض الحجوزات التي تحتاج إلى تأكيد فقط (مقبولة ولكن غير مكتملة)
-    reservations = Reservation.objects.filter(is_approved=True, is_rejected=False, is_confirmed=False)
+    page = keyset_paginate(request, Reservation.objects.filter(status=Reservation.STATUS_APPROVED))
     return render(request, 'MjbilAlRai_App/confirm_reservations.html', {
-        'reservations': reservations,
+        'reservations': page.items,
+        'page': page,
+    })
+
+# جدول التسليم اليومي: توزيع الصبّات المقبولة على الشاحنات وأوقات الانطلاق (إعادة التخطيط عند الطلب)
+@login_required
+@confirm_permission_required
+def delivery_schedule(request):
+    day = parse_report_date(request.POST.get('day') or request.GET.get('day')) or date.today()
+    if request.method == 'POST':
+        trips, unscheduled = schedule_day(day)
+        messages.success(request, f"تم إعداد جدول يوم {day:%Y/%m/%d}: {trips} رحلة.")
+        if unscheduled:
+            messages.warning(request, f"{len(unscheduled)} حجز لم يتسع له دوام الشاحنات.")
+        return redirect(f"{reverse('delivery_schedule')}?day={day.isoformat()}")
+
+    schedule, unscheduled = day_schedule(day)
+    return render(request, 'MjbilAlRai_App/delivery_schedule.html', {
+        'day': day,
+        'schedule': schedule,
+        'unscheduled': unscheduled,
+        'trips_count': sum(len(trips) for truck, trips in schedule),
+        'scheduled_volume': sum(trip.quantity for truck, trips in schedule for trip in trips),
     })
 
 # قبول الحجز
 @login_required
 @manage_permission_required
 def approve_reservation(request, reservation_id):
-    reservation = get_object_or_404(Reservation, id=reservation_id)
-    if request.method == 'POST':
-        approval_date = request.POST.get('approval_date')
-        approval_message = request.POST.get('approval_message', '')
+    if request.method != 'POST':
+        get_object_or_404(Reservation, id=reservation_id)
+        return redirect('manage_reservations')
 
+    approval_date = request.POST.get('approval_date')
+    approval_message = request.POST.get('approval_message', '')
+    pour_date = request.POST.get('pour_date') or None
+
+    # الحالة السابقة تُقرأ تحت قفل الصف (مثل تسجيل الدفعات)
+    with transaction.atomic():
+        reservation = get_object_or_404(Reservation.objects.select_for_update(), id=reservation_id)
         reservation.is_approved = True
         reservation.is_rejected = False
         reservation.approval_date = approval_date
         reservation.approval_message = approval_message
-        reservation.save()
-
-        # تحديث حالة الحجز
-        reservation.status = 'مقبول'
-        reservation.save()
-
-        messages.success(request, f"تم قبول الحجز رقم {reservation.reservation_number} بنجاح.")
+        reservation.pour_date = pour_date
+        # الحالة تُشتق داخل save() لذلك يكفي حفظ واحد
+        try:
+            reservation.save()
+        except InvalidStatusTransition as e:
+            messages.error(request, str(e))
+        else:
+            messages.success(request, f"تم قبول الحجز رقم {reservation.reservation_number} بنجاح.")
     return redirect('manage_reservations')
 
 # رفض الحجز
 @login_required
 @manage_permission_required
 def reject_reservation(request, reservation_id):
-    reservation = get_object_or_404(Reservation, id=reservation_id)
-    reservation.is_approved = False
-    reservation.is_rejected = True
-    reservation.status = 'مرفوض'
-    reservation.save()
-    messages.success(request, f"تم رفض الحجز رقم {reservation.reservation_number}.")
+    with transaction.atomic():
+        reservation = get_object_or_404(Reservation.objects.select_for_update(), id=reservation_id)
+        reservation.is_approved = False
+        reservation.is_rejected = True
+        try:
+            reservation.save()
+        except InvalidStatusTransition as e:
+            messages.error(request, str(e))
+        else:
+            messages.success(request, f"تم رفض الحجز رقم {reservation.reservation_number}.")
+    return redirect('manage_reservations')
+
+# قبول أو رفض مجموعة حجوزات في عملية واحدة
+@login_required
+@manage_permission_required
+@require_POST
+def bulk_manage_reservations(request):
+    ids = selected_ids(request)
+    action = request.POST.get('action')
+    if not ids:
+        messages.error(request, "يرجى تحديد حجز واحد على الأقل.")
+    elif action == 'approve':
+        updated = bulk_approve(
+            ids,
+            request.POST.get('approval_date') or None,
+            request.POST.get('approval_message', ''),
+            request.POST.get('pour_date') or None,
+        )
+        messages.success(request, f"تم قبول {len(updated)} حجز بنجاح.")
+    elif action == 'reject':
+        updated = bulk_reject(ids)
+        messages.success(request, f"تم رفض {len(updated)} حجز.")
+    else:
+        messages.error(request, "الإجراء المطلوب غير معروف.")
     return redirect('manage_reservations')
 
+# تأكيد مجموعة حجوزات في عملية واحدة (المسددة بالكامل تكتمل فورًا)
+@login_required
+@confirm_permission_required
+@require_POST
+def bulk_confirm_reservations(request):
+    ids = selected_ids(request)
+    if ids:
+        updated = bulk_confirm(ids)
+        messages.success(request, f"تم تأكيد {len(updated)} حجز بنجاح. الحجوزات غير المسددة بالكامل تكتمل عند سداد المبلغ المتبقي.")
+    else:
+        messages.error(request, "يرجى تحديد حجز واحد على الأقل.")
+    return redirect('confirm_reservations')
+
 # تسجيل الدخول
 def login_user(request):
     if request.method == 'POST':
@@ -235,178 +355,77 @@ def new_reservation(request):
     if request.method == 'POST':
         form = ReservationForm(request.POST)
         if form.is_valid():
-            reservation = form.save()
+            # السعر للوحدة من التعرفة السارية اليوم (المحاسب يمكنه تعديله لاحقًا)
+            reservation = form.save(commit=False)
+            reservation.price_per_unit = quote_price(reservation.concrete_type, reservation.estimated_distance)
+            reservation.save()
             return render(request, 'MjbilAlRai_App/reservation_success.html', {'reservation': reservation})
         else:
             messages.error(request, "حدث خطأ أثناء إدخال الحجز. يرجى التحقق من البيانات المدخلة.")
     else:
         form = ReservationForm()
-    return render(request, 'MjbilAlRai_App/new_reservation.html', {'form': form})
+    # جدول الأسعار من ذاكرة العملية لحساب السعر التقديري في المتصفح (دون استعلامات)
+    return render(request, 'MjbilAlRai_App/new_reservation.html', {'form': form, 'tariff': tariff_table()})
 
-# تصدير الحجوزات إلى ملف Excel (عام)
+# تصدير الحجوزات إلى ملف (Excel افتراضيًا، أو CSV / JSON Lines عبر ?format=)
 @login_required
 @manage_permission_required
 def export_reservations(request):
-    workbook = Workbook()
-    worksheet = workbook.active
-    worksheet.title = "الحجوزات"
-
-    headers = [
-        'رقم الحجز', 'اسم العميل', 'اسم النجار', 'نوع الخرسانة',
-        'كمية الخرسانة', 'موقع الصب', 'المسافة التقديرية',
-        'تاريخ الحجز', 'تاريخ الموافقة', 'رسالة الموافقة',
-        'السعر للوحدة', 'الخصم', 'إجمالي التكلفة', 'ملاحظات المحاسب',
-        'مجموع الدفعات المدفوعة', 'المبلغ المتبقي', 'اكتمال الحجز', 'تاريخ اكتمال الحجز', 'الحالة'
-    ]
-    worksheet.append(headers)
-
-    reservations = Reservation.objects.all()
-    total_payments = Decimal(0)
-    total_remaining = Decimal(0)
-
-    for reservation in reservations:
-        total_cost = calculate_total_cost(reservation)
-        remaining_balance = calculate_remaining_balance(reservation)
-
-        worksheet.append([
-            reservation.reservation_number,
-            reservation.customer_name,
-            reservation.carpenter_name,
-            reservation.concrete_type,
-            reservation.concrete_quantity,
-            reservation.site_location,
-            reservation.estimated_distance,
-            reservation.reservation_date.strftime('%Y-%m-%d') if reservation.reservation_date else '',
-            reservation.approval_date.strftime('%Y-%m-%d') if reservation.approval_date else '',
-            reservation.approval_message,
-            reservation.price_per_unit,
-            reservation.discount,
-            reservation.total_cost,
-            reservation.accountant_notes,
-            reservation.payments,
-            remaining_balance,
-            'نعم' if reservation.is_completed else 'لا',
-            reservation.completion_date.strftime('%Y-%m-%d') if reservation.completion_date else '',
-            reservation.status,  # إضافة الحقل الجديد للحالة
-        ])
-
-        total_payments += reservation.payments or Decimal(0)
-        total_remaining += remaining_balance
-
-    # إضافة صف الإجماليات في نهاية الجدول
-    worksheet.append([])
-    worksheet.append(['', '', '', '', '', '', '', '', '', '', '', '', 'إجمالي:', '', total_payments, total_remaining, '', '', ''])
-
-    # تنسيق الصفوف
-    for row in worksheet.iter_rows(min_row=2, max_row=worksheet.max_row, min_col=1, max_col=19):
-        for cell in row:
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-            thin_border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-            cell.border = thin_border
-
-    # إعداد الاستجابة وإرسال الملف للمستخدم
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="reservations.xlsx"'
-
-    workbook.save(response)
-    return response
+    fmt = request.GET.get('format', 'xlsx')
+    return export_response(Reservation.objects.all(), RESERVATIONS_EXPORT, fmt, 'reservations')
+
+# طلب تصدير كامل في الخلفية (يُعاد استخدام الملف الجاهز إذا لم تتغير البيانات)
+@login_required
+@manage_permission_required
+@require_POST
+def request_export_job(request):
+    fmt = request.POST.get('format', 'xlsx')
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'xlsx'
+    job, created = request_export('reservations', fmt, user=request.user)
+    if not created and job.status == ExportJob.STATUS_DONE:
+        messages.success(request, "الملف جاهز للتحميل (لم تتغير البيانات منذ آخر تصدير).")
+    return redirect('export_job_detail', job_id=job.id)
+
+# صفحة متابعة مهمة التصدير
+@login_required
+@manage_permission_required
+def export_job_detail(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id)
+    return render(request, 'MjbilAlRai_App/export_job.html', {'job': job})
+
+# حالة مهمة التصدير بصيغة JSON (للاستعلام الدوري من الصفحة)
+@login_required
+@manage_permission_required
+def export_job_status(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id)
+    return JsonResponse({
+        'id': job.id,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'rows_count': job.rows_count,
+        'error': job.error,
+    })
+
+# تحميل ملف التصدير الجاهز
+@login_required
+@manage_permission_required
+def download_export(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id, status=ExportJob.STATUS_DONE)
+    if not job.file_path or not os.path.exists(job.file_path):
+        raise Http404("ملف التصدير غير موجود.")
+    return FileResponse(open(job.file_path, 'rb'), as_attachment=True, filename=os.path.basename(job.file_path))
 
 # تصدير حجوزات العملاء إلى ملف Excel
 def export_customer_reservations(request):
     if request.method == 'POST':
-        phone_number = request.POST.get('phone_number')
+        phone_number = normalize_phone(request.POST.get('phone_number'))
         logger.debug(f"Exporting reservations for phone number: {phone_number}")
         if phone_number:
             reservations = Reservation.objects.filter(phone_number=phone_number)
             if reservations.exists():
-                workbook = Workbook()
-                worksheet = workbook.active
-                worksheet.title = "حجوزات العميل"
-
-                # إعداد نمط العناوين
-                header_font = Font(bold=True, color="FFFFFF")
-                header_alignment = Alignment(horizontal='center', vertical='center')
-                header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-
-                # إعداد العناوين للجدول
-                headers = [
-                    'رقم الحجز', 'اسم العميل', 'اسم النجار', 'عيار الخرسانة',
-                    'كمية الخرسانة', 'السعر للوحدة', 'الخصم', 'إجمالي التكلفة',
-                    'ملاحظات المحاسب', 'مجموع الدفعات المدفوعة', 'المبلغ المتبقي',
-                    'اكتمال الحجز', 'تاريخ اكتمال الحجز', 'الحالة'
-                ]
-                worksheet.append(headers)
-
-                # تنسيق العناوين
-                for cell in worksheet[1]:
-                    cell.font = header_font
-                    cell.alignment = header_alignment
-                    cell.fill = header_fill
-
-                # إعداد حدود الخلايا
-                thin_border = Border(
-                    left=Side(style='thin'),
-                    right=Side(style='thin'),
-                    top=Side(style='thin'),
-                    bottom=Side(style='thin')
-                )
-
-                # حساب البيانات وإضافتها للجدول
-                total_remaining = Decimal(0)
-
-                for idx, reservation in enumerate(reservations, start=2):
-                    total_cost = calculate_total_cost(reservation)
-                    remaining_balance = calculate_remaining_balance(reservation)
-
-                    row_data = [
-                        reservation.reservation_number,
-                        reservation.customer_name,
-                        reservation.carpenter_name,
-                        reservation.concrete_type,
-                        reservation.concrete_quantity,
-                        reservation.price_per_unit,
-                        reservation.discount,
-                        reservation.total_cost,
-                        reservation.accountant_notes,
-                        reservation.payments,
-                        remaining_balance,
-                        'نعم' if reservation.is_completed else 'لا',
-                        reservation.completion_date.strftime('%Y-%m-%d') if reservation.completion_date else '',
-                        reservation.status,  # إضافة الحقل الجديد للحالة
-                    ]
-                    worksheet.append(row_data)
-
-                    # تنسيق الصفوف
-                    for cell in worksheet[idx]:
-                        cell.alignment = Alignment(horizontal='center', vertical='center')
-                        cell.border = thin_border
-
-                    total_remaining += remaining_balance
-
-                # إضافة صف الإجماليات في نهاية الجدول
-                worksheet.append([])
-                worksheet.append(['', '', '', '', '', '', '', 'إجمالي:', '', '', total_remaining, '', '', ''])
-
-                # تنسيق صف الإجماليات
-                total_row_idx = len(reservations) + 3
-                for idx, cell in enumerate(worksheet[total_row_idx], start=1):
-                    if idx == 8 or idx == 11:
-                        cell.font = Font(bold=True, color="FF0000")
-                        cell.alignment = Alignment(horizontal='center', vertical='center')
-                        cell.fill = PatternFill(start_color="D9EAD3", end_color="D9EAD3", fill_type="solid")
-                        cell.border = thin_border
-
-                # إعداد الاستجابة وإرسال الملف للمستخدم
-                response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-                response['Content-Disposition'] = f'attachment; filename="customer_reservations_{phone_number}.xlsx"'
-
-                workbook.save(response)
-                return response
+                fmt = request.POST.get('format', 'xlsx')
+                return export_response(reservations, CUSTOMER_EXPORT, fmt, f"customer_reservations_{phone_number}")
             else:
                 messages.error(request, "لا توجد حجوزات مسجلة بهذا الرقم لتصديرها.")
                 return redirect('customer_reservations')
@@ -420,31 +439,23 @@ def export_customer_reservations(request):
 # عرض حجوزات العملاء بناءً على رقم الهاتف
 def customer_reservations(request):
     reservations = []
-    total_gross_amount_sum = total_discount_sum = total_payments_sum = total_remaining_sum = 0
+    totals = empty_totals()
     error = None
 
     if request.method == 'POST':
-        phone_number = request.POST.get('phone_number')
+        phone_number = normalize_phone(request.POST.get('phone_number'))
 
         if phone_number:
-            reservations = Reservation.objects.filter(phone_number=phone_number)
-            if reservations.exists():
-                total_gross_amount_sum = sum(calculate_total_cost(r) for r in reservations)
-                total_discount_sum = sum(r.discount or Decimal(0) for r in reservations)
-                total_payments_sum = reservations.aggregate(Sum('payments'))['payments__sum'] or Decimal(0)
-                total_remaining_sum = sum(calculate_remaining_balance(r) for r in reservations)
-            else:
+            reservations, totals = phone_lookup(phone_number)
+            if not totals['reservations_count']:
                 error = "لا توجد حجوزات بهذا الرقم."
         else:
             error = "يرجى إدخال رقم الهاتف."
 
     context = {
         'reservations': reservations,
-        'total_gross_amount_sum': total_gross_amount_sum,
-        'total_discount_sum': total_discount_sum,
-        'total_payments_sum': total_payments_sum,
-        'total_remaining_sum': total_remaining_sum,
-        'error': error
+        'error': error,
+        **totals,
     }
     return render(request, 'MjbilAlRai_App/customer_reservations.html', context)
 
@@ -456,7 +467,7 @@ def accountant_dashboard(request):
     financial_status = request.GET.get('financial_status')
 
     # تصفية الحجوزات بناءً على الحالة المالية المحددة
-    reservations = Reservation.objects.filter(is_confirmed=True)
+    reservations = Reservation.objects.filter(status__in=CONFIRMED_STATUSES)
 
     if financial_status == 'remaining':
         reservations = reservations.filter(remaining_balance__gt=0)
@@ -465,20 +476,22 @@ def accountant_dashboard(request):
     elif financial_status == 'pending':
         reservations = reservations.filter(remaining_balance__lt=0)
 
-    # حساب الإجماليات
-    total_gross_amount_sum = sum(calculate_total_cost(r) for r in reservations)
-    total_discount_sum = sum(r.discount or Decimal(0) for r in reservations)
-    total_payments_sum = reservations.aggregate(Sum('payments'))['payments__sum'] or Decimal(0)
-    total_remaining_sum = sum(calculate_remaining_balance(r) for r in reservations)
+    # حساب الإجماليات: من ملخص الدفتر عند عدم وجود فلتر، وإلا باستعلام تجميعي واحد
+    if financial_status in ('remaining', 'paid', 'pending'):
+        totals = financial_totals(reservations)
+    else:
+        totals = ledger_totals()
+
+    # عرض صفحة واحدة فقط مع إبقاء الإجماليات محسوبة على كامل الفلتر (صفوف الجدول من الذاكرة المؤقتة)
+    page = keyset_paginate(request, reservations.only(*ROW_KEY_FIELDS))
+    render_reservation_rows(page.items, 'MjbilAlRai_App/_accountant_row.html', ACCOUNTANT_ROW_FIELDS)
 
     # تمرير البيانات إلى القالب
     context = {
-        'reservations': reservations,
-        'total_gross_amount_sum': total_gross_amount_sum,
-        'total_discount_sum': total_discount_sum,
-        'total_payments_sum': total_payments_sum,
-        'total_remaining_sum': total_remaining_sum,
+        'reservations': page.items,
+        'page': page,
         'financial_status': financial_status,
+        **totals,
     }
 
     return render(request, 'MjbilAlRai_App/accountant_dashboard.html', context)
@@ -499,19 +512,15 @@ def update_financial_details(request, reservation_id):
     # حساب الرصيد المتبقي
     remaining_balance = calculate_remaining_balance(reservation)
 
-    # حساب إجماليات الحجوزات المؤكدة
-    reservations = Reservation.objects.filter(is_confirmed=True)
-    total_gross_amount_sum = sum(calculate_total_cost(r) for r in reservations)
-    total_discount_sum = sum(r.discount or Decimal(0) for r in reservations)
-    total_payments_sum = reservations.aggregate(Sum('payments'))['payments__sum'] or Decimal(0)
-    total_remaining_sum = sum(calculate_remaining_balance(r) for r in reservations)
+    # إجماليات الحجوزات المؤكدة من ملخص الدفتر بدلاً من مسح جدول الحجوزات
+    totals = ledger_totals()
 
     if request.method == 'POST':
         if 'update_financial' in request.POST:
             logger.debug("Received POST request for updating financial details.")
-            financial_form = FinancialDetailsForm(request.POST, instance=reservation)
+            # الحفظ مع قفل الحجز وتسجيل أي تعديل على مجموع الدفعات في سجل الدفعات
+            financial_form = save_financial_details(reservation.id, request.POST, user=request.user)
             if financial_form.is_valid():
-                financial_form.save()
                 logger.debug("Financial details updated successfully.")
                 messages.success(request, f"تم تحديث البيانات المالية للحجز رقم {reservation.reservation_number} بنجاح.")
                 return redirect('accountant_dashboard')
@@ -524,23 +533,16 @@ def update_financial_details(request, reservation_id):
             payment_form = PaymentForm(request.POST, remaining_balance=reservation.remaining_balance or Decimal(0))
             if payment_form.is_valid():
                 payment_amount = payment_form.cleaned_data.get('payment_amount') or Decimal(0)
-                reservation.payments += payment_amount
-
-                # إعادة حساب الرصيد المتبقي بعد تحديث المدفوعات
-                remaining_balance = calculate_remaining_balance(reservation)
-                reservation.remaining_balance = remaining_balance
-
-                # إذا أصبح الرصيد المتبقي صفرًا أو أقل، نقوم بتعيين الحجز كمكتمل
-                if reservation.remaining_balance <= 0 and not reservation.is_completed:
-                    reservation.is_completed = True
-                    reservation.status = 'مكتمل'  # تحديث الحالة إلى مكتمل
-                    reservation.completion_date = date.today()
-
-                reservation.save()
-                logger.debug(f"Payment of {payment_amount} recorded successfully.")
-                messages.success(request, f"تم تسجيل الدفعة بقيمة {payment_amount} دولار أمريكي للحجز رقم {reservation.reservation_number} بنجاح.")
-                return redirect('accountant_dashboard')
-            else:
+                try:
+                    # إضافة الدفعة إلى السجل وتحديث المدفوعات والرصيد وحالة الاكتمال مع قفل صف الحجز
+                    reservation = record_payment(reservation.id, payment_amount, user=request.user, method=payment_form.cleaned_data['method'])
+                except PaymentExceedsBalance as e:
+                    payment_form.add_error('payment_amount', str(e))
+                else:
+                    logger.debug(f"Payment of {payment_amount} recorded successfully.")
+                    messages.success(request, f"تم تسجيل الدفعة بقيمة {payment_amount} دولار أمريكي للحجز رقم {reservation.reservation_number} بنجاح.")
+                    return redirect('accountant_dashboard')
+            if payment_form.errors:
                 logger.debug(f"Payment form errors: {payment_form.errors}")
                 messages.error(request, "حدث خطأ أثناء تسجيل الدفعة. يرجى التحقق من البيانات المدخلة.")
                 financial_form = FinancialDetailsForm(instance=reservation)
@@ -558,9 +560,42 @@ def update_financial_details(request, reservation_id):
         'reservation': reservation,
         'total_cost': total_cost,
         'remaining_balance': remaining_balance,
-        'total_gross_amount_sum': total_gross_amount_sum,
-        'total_discount_sum': total_discount_sum,
-        'total_payments_sum': total_payments_sum,
-        'total_remaining_sum': total_remaining_sum
+        'payment_entries': reservation.payment_entries.select_related('created_by').order_by('created_at', 'id'),
+        **totals,
+    })
+
+# كشف حساب العميل: جميع الدفعات المسجلة لرقم الهاتف عبر كل حجوزاته
+@login_required
+@manage_accountant_permission_required
+def customer_statement(request):
+    phone_number = normalize_phone(request.GET.get('phone_number'))
+    payment_entries = list(customer_payment_history(phone_number)) if phone_number else []
+    total_paid = sum((entry.amount for entry in payment_entries), Decimal(0))
+    return render(request, 'MjbilAlRai_App/customer_statement.html', {
+        'phone_number': phone_number,
+        'payment_entries': payment_entries,
+        'total_paid': total_paid,
     })
 
+# تقارير الكميات والإيرادات حسب الفترة ونوع الخرسانة (من الملخص اليومي فقط دون مسح جدول الحجوزات)
+@login_required
+@manage_accountant_permission_required
+def reports(request):
+    period = request.GET.get('period', 'day')
+    if period not in PERIODS:
+        period = 'day'
+    start = parse_report_date(request.GET.get('start')) or date.today() - timedelta(days=REPORT_DEFAULT_DAYS)
+    end = parse_report_date(request.GET.get('end')) or date.today()
+    status = parse_status(request.GET.get('status'))
+
+    rows = report_rows(period, start, end, status)
+    return render(request, 'MjbilAlRai_App/reports.html', {
+        'rows': rows,
+        'totals': report_totals(rows),
+        'period': period,
+        'start': start,
+        'end': end,
+        'status': status,
+        'status_choices': Reservation.STATUS_CHOICES,
+        'refreshed_at': last_refreshed_at(),
+    })